@@ -9,13 +9,74 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Pool sizing and server-side timeouts per DB_PROFILE (see db_engine.py)
+    from .db_engine import configure_engine, init_engine_events
+    configure_engine(app)
     db.init_app(app)
+    init_engine_events(app)
     migrate.init_app(app, db)
 
+    # Server-Timing header and JSON access log per request (see request_timing.py)
+    from .request_timing import init_request_timing
+    init_request_timing(app)
+
+    # Slow statements and sampled EXPLAIN ANALYZE plans (see slow_queries.py)
+    from .slow_queries import init_slow_query_log
+    init_slow_query_log(app)
+
+    # Replica reads for @read_replica routes, when a replica is configured (see db_routing.py)
+    from .db_routing import init_read_replica
+    init_read_replica(app)
+
+    # Live sidebar badge updates (see tradeflow_events.py)
+    from .tradeflow_events import init_tradeflow_events
+    init_tradeflow_events(app)
+
+    # Cross-worker membership cache for authorization checks (see membership_cache.py)
+    from .membership_cache import init_membership_cache
+    init_membership_cache(app)
+
+    # Login/register hashing policy and its bounded pool (see passwords.py)
+    from .passwords import init_password_hashing
+    init_password_hashing(app)
+
     # Load blueprints (shared main object and all domain modules)
     from .blueprints import main  # noqa: F401
     from . import routes  # noqa: F401
 
     app.register_blueprint(main)
 
+    # Prometheus /metrics endpoint and request/transition metrics (see metrics.py)
+    from .metrics import init_metrics
+    init_metrics(app)
+
+    # Offline maintenance commands (flask --app run <group> <command>)
+    from .recommendations import recommendations_cli
+    app.cli.add_command(recommendations_cli)
+    from .sweeper import sweeper_cli
+    app.cli.add_command(sweeper_cli)
+    from .trade_stats import trade_stats_cli
+    app.cli.add_command(trade_stats_cli)
+
+    # Expiry sweeper and EXPLAIN sampler threads, when enabled. A preloading gunicorn master
+    # leaves them to its workers (post_worker_init in gunicorn.conf.py)
+    if app.config['START_BACKGROUND_THREADS']:
+        start_background_threads(app)
+
+    check_production_config(app)
     return app
+
+
+def start_background_threads(app):
+    """Start this process's optional background threads (each is a no-op when disabled)."""
+    from .slow_queries import start_slow_query_explainer
+    from .sweeper import start_sweeper
+    start_sweeper(app)
+    start_slow_query_explainer()
+
+
+def check_production_config(app, debug=None):
+    """Refuse to serve with the debugger on when APP_ENV is production."""
+    debug = app.debug if debug is None else debug
+    if app.config.get('APP_ENV') == 'production' and debug:
+        raise RuntimeError('Debug mode is on with APP_ENV=production; unset FLASK_DEBUG')
@@ -1,20 +1,130 @@
 import datetime
 import uuid
+from collections import Counter
+from dataclasses import dataclass, field
 from functools import wraps
-from flask import request, session, redirect, url_for, flash
-from ..models import User, Company, CompanyMember, Service, DealProposal, ActiveDeal, TradeRequest, TradeflowView, db
+from typing import Dict, List, Optional
+from flask import g, request, session, redirect, url_for, flash
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager, joinedload
+from ..db_routing import primary
+from ..models import User, Company, CompanyMember, Service, DealProposal, ActiveDeal, Review, TradeRequest, TradeflowCounter, TradeflowView, db, insert_on_conflict
+from ..membership_cache import cached_roles
+from ..tradeflow_events import announce_badge_deltas
+
+REVIEW_PAGE_SIZE = 10  # reviews per keyset page on service detail pages
+ARCHIVED_PAGE_SIZE = 30  # archived trade requests per keyset page
+
+# Sidebar badge sections, in the order of ck_tradeflow_view_section
+TRADEFLOW_SECTIONS = (
+    'incoming', 'you_requested', 'archived', 'matches',
+    'awaiting_signature', 'awaiting_other_party', 'ongoing', 'completed',
+)
+
+@dataclass
+class RequestIdentity:
+    """The session user and all of their memberships (each with its company loaded)."""
+    user: Optional[User] = None
+    memberships: Dict[uuid.UUID, CompanyMember] = field(default_factory=dict)
+
+    @property
+    def user_id(self) -> Optional[uuid.UUID]:
+        return self.user.user_id if self.user else None
+
+    def membership(self, company_id) -> Optional[CompanyMember]:
+        try:
+            return self.memberships.get(uuid.UUID(str(company_id)))
+        except ValueError:
+            return None
+
+    @property
+    def username(self) -> str:
+        return self.user.username if self.user else ''
+
+    @property
+    def companies(self) -> List[Company]:
+        return [membership.company for membership in self.memberships.values()]
+
+
+def _load_identity(user_id) -> RequestIdentity:
+    rows = (
+        db.session.query(User, CompanyMember)
+        .outerjoin(CompanyMember, CompanyMember.user_id == User.user_id)
+        .outerjoin(Company, Company.company_id == CompanyMember.company_id)
+        .options(contains_eager(CompanyMember.company))
+        .filter(User.user_id == user_id)
+        .order_by(CompanyMember.created_at)
+        .all()
+    )
+    if not rows:
+        return RequestIdentity()
+    # membership.company is populated here, and Company.query.get() then hits the identity map
+    return RequestIdentity(
+        user=rows[0][0],
+        memberships={membership.company_id: membership for _, membership in rows if membership and membership.company},
+    )
 
-def get_current_user():
-    """Helper to load current user from session; returns None when invalid."""
-    if 'user_id' not in session:
+
+def current_identity() -> RequestIdentity:
+    """Identity for this request, loaded with one query on first use and kept in g."""
+    user_id = session.get('user_id')
+    cached = g.get('identity')
+    if cached is None or cached[0] != user_id:
+        identity = RequestIdentity()
+        if user_id:
+            try:
+                identity = _load_identity(uuid.UUID(user_id))
+            except ValueError:
+                pass
+        cached = g.identity = (user_id, identity)
+    return cached[1]
+
+
+def _current_roles() -> Optional[Dict[uuid.UUID, bool]]:
+    """{company_id: is_admin} for the session user from the membership cache; None when logged out.
+
+    Kept in g for the rest of the request, so a read-through cache (no NOTIFY) queries once.
+    """
+    user_id = session.get('user_id')
+    if not user_id:
         return None
+    cached = g.get('roles')
+    if cached is None or cached[0] != user_id:
+        try:
+            roles = cached_roles(user_id)
+        except ValueError:
+            roles = None
+        cached = g.roles = (user_id, roles)
+    return cached[1]
+
+
+def _current_role(company_id) -> Optional[bool]:
+    """is_admin for the session user's membership of a company, or None when not a member."""
     try:
-        user_id = uuid.UUID(session['user_id'])
-        return User.query.get(user_id)
-    except Exception:
+        return (_current_roles() or {}).get(uuid.UUID(str(company_id)))
+    except ValueError:
         return None
 
 
+def _current_membership(company_id, require_admin=False) -> Optional[CompanyMember]:
+    """The session user's membership of a company (an admin one when require_admin), or None.
+
+    Refusals are answered from the membership cache; only members load the identity.
+    """
+    is_admin = _current_role(company_id)
+    if is_admin is None or (require_admin and not is_admin):
+        return None
+    membership = current_identity().membership(company_id)
+    if membership and require_admin and not membership.is_admin:
+        return None
+    return membership
+
+
+def get_current_user():
+    """Helper to load current user from session; returns None when invalid."""
+    return current_identity().user
+
+
 def require_valid_user():
     """Redirect to login when session user is missing/invalid; returns response or None."""
     user = get_current_user()
@@ -26,9 +136,12 @@ def require_valid_user():
 
 
 def _require_login():
-    """Redirect to login when no active session."""
+    """Redirect to login when no active session (or its user no longer exists)."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
+    if _current_roles() is None:
+        session.pop('user_id', None)
+        return redirect(url_for('main.login'))
     return None
 
 
@@ -44,12 +157,11 @@ def login_required(view):
 
 def _require_company_member(company_id):
     """Return (company, None) when user is member; otherwise (None, redirect)."""
+    is_admin = _current_role(company_id)
     company = Company.query.get_or_404(company_id)
-    user_id = session.get('user_id')
-    if not user_id:
+    if not session.get('user_id'):
         return None, redirect(url_for('main.login'))
-    member = CompanyMember.query.filter_by(company_id=company_id, user_id=uuid.UUID(user_id)).first()
-    if not member:
+    if is_admin is None:
         flash('Access denied', 'error')
         return None, redirect(url_for('main.my_companies'))
     # Store selected company in session for navigation
@@ -58,14 +170,14 @@ def _require_company_member(company_id):
 
 
 def _member_or_403(company_id, require_admin=False):
-    """Lightweight membership check for actions; returns (user_id, membership, response)."""
+    """Membership check for actions, answered from the membership cache; returns (user_id, is_admin, response)."""
     if (resp := _require_login()):
         return None, None, resp
     user_id = uuid.UUID(session['user_id'])
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=user_id).first()
-    if not membership or (require_admin and not membership.is_admin):
-        return user_id, membership, ('Forbidden', 403)
-    return user_id, membership, None
+    is_admin = _current_role(company_id)
+    if is_admin is None or (require_admin and not is_admin):
+        return user_id, is_admin, ('Forbidden', 403)
+    return user_id, is_admin, None
 
 
 def company_member_required(require_admin=False, company_kw='company_id'):
@@ -76,11 +188,11 @@ def company_member_required(require_admin=False, company_kw='company_id'):
             if company_kw not in kwargs:
                 return ('Company id missing', 400)
             company_id = kwargs[company_kw]
-            user_id, membership, resp = _member_or_403(company_id, require_admin=require_admin)
+            user_id, is_admin, resp = _member_or_403(company_id, require_admin=require_admin)
             if resp:
                 return resp
-            # Attach membership for downstream use
-            kwargs['membership'] = membership
+            # Attach the caller's role for downstream use
+            kwargs['is_admin'] = is_admin
             kwargs['current_user_id'] = user_id
             return view(*args, **kwargs)
         return wrapper
@@ -89,7 +201,7 @@ def company_member_required(require_admin=False, company_kw='company_id'):
 
 def _ensure_request_for_company(trade_request, company_id):
     """Redirect when a trade request does not target the given company."""
-    if trade_request.requested_service.company_id != company_id:
+    if trade_request.requested_company_id != company_id:
         flash('Access denied', 'error')
         return redirect(url_for('main.my_companies'))
     return None
@@ -110,53 +222,197 @@ def _parse_int(value, default=0):
         return default
 
 
-def _create_active_deal_from_proposal(proposal_id):
-    return ActiveDeal(
-        active_deal_id=uuid.uuid4(),
-        proposal_id=proposal_id,
-        from_company_completed=False,
-        to_company_completed=False,
-        status='in_progress',
-        created_at=datetime.datetime.now(datetime.timezone.utc)
-    )
+def _parse_uuid(value):
+    """UUID from a form/query value, or None when it is missing or malformed."""
+    try:
+        return uuid.UUID(value) if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def _review_page(service_id, cursor=None, per_page=REVIEW_PAGE_SIZE):
+    """Newest-first keyset page of a service's reviews; returns (reviews, next_cursor).
+
+    The cursor is "<created_at iso>_<review_id>" of the last review shown, so each page is
+    one range scan on ix_review_service_created regardless of how many reviews exist.
+    """
+    query = Review.query.options(joinedload(Review.reviewer)).filter(Review.reviewed_service_id == service_id)
+    if cursor:
+        try:
+            created_str, _, review_id_str = cursor.rpartition('_')
+            after = (datetime.datetime.fromisoformat(created_str), uuid.UUID(review_id_str))
+            query = query.filter(db.tuple_(Review.created_at, Review.review_id) < after)
+        except ValueError:
+            pass  # Malformed cursor → first page
+    reviews = query.order_by(Review.created_at.desc(), Review.review_id.desc()).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(reviews) > per_page:
+        reviews = reviews[:per_page]
+        last = reviews[-1]
+        if last.created_at:
+            next_cursor = f"{last.created_at.isoformat()}_{last.review_id}"
+    return reviews, next_cursor
+
+
+def _archived_requests_page(company_id, cursor=None, per_page=ARCHIVED_PAGE_SIZE):
+    """Most recently archived first keyset page of requests a company sent or received.
+
+    Same "<archived_at iso>_<request_id>" cursor as _review_page. Sent and received requests are
+    two branches, each a range scan on its own partial index of archived rows, merged by a UNION.
+    """
+    after = None
+    if cursor:
+        try:
+            archived_str, _, request_id_str = cursor.rpartition('_')
+            after = (datetime.datetime.fromisoformat(archived_str), uuid.UUID(request_id_str))
+        except ValueError:
+            pass  # Malformed cursor → first page
 
+    def branch(condition):
+        q = db.select(TradeRequest.request_id, TradeRequest.archived_at).where(
+            TradeRequest.status == 'archived', condition
+        )
+        if after:
+            q = q.where(db.tuple_(TradeRequest.archived_at, TradeRequest.request_id) < after)
+        q = q.order_by(TradeRequest.archived_at.desc(), TradeRequest.request_id.desc()).limit(per_page + 1)
+        return db.select(q.subquery())
+
+    merged = db.union(
+        branch(TradeRequest.requesting_company_id == company_id),
+        branch(TradeRequest.requested_company_id == company_id),
+    ).subquery()
+    page = (
+        db.select(merged.c.request_id, merged.c.archived_at)
+        .order_by(merged.c.archived_at.desc(), merged.c.request_id.desc())
+        .limit(per_page + 1)
+        .subquery()
+    )
+    requests = (
+        TradeRequest.query
+        .join(page, page.c.request_id == TradeRequest.request_id)
+        .options(
+            joinedload(TradeRequest.requesting_company),
+            joinedload(TradeRequest.requested_service).joinedload(Service.company),
+        )
+        .order_by(page.c.archived_at.desc(), page.c.request_id.desc())
+        .all()
+    )
 
-def _sidebar_companies(user_id, selected_company_id=None, include_counts=True):
-    memberships = CompanyMember.query.filter_by(user_id=user_id).all()
-    companies = []
-    for m in memberships:
-        comp = Company.query.get(m.company_id)
-        if not comp:
-            continue
-        member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count() if include_counts else None
-        service_count = Service.query.filter_by(company_id=comp.company_id).count() if include_counts else None
-        companies.append({
-            'company_id': comp.company_id,
-            'name': comp.name,
-            'description': getattr(comp, 'description', None),
-            'role': 'Admin' if m.is_admin else 'Member',
-            'is_admin': m.is_admin,
-            'member_count': member_count,
-            'service_count': service_count,
-            'is_selected': comp.company_id == selected_company_id
-        })
-    return companies
+    next_cursor = None
+    if len(requests) > per_page:
+        requests = requests[:per_page]
+        last = requests[-1]
+        if last.archived_at:
+            next_cursor = f"{last.archived_at.isoformat()}_{last.request_id}"
+    return requests, next_cursor
+
+
+def _review_summary(service_id):
+    """Star histogram, total and average for a service in one grouped query."""
+    rows = (
+        db.session.query(Review.rating, func.count(Review.review_id))
+        .filter(Review.reviewed_service_id == service_id)
+        .group_by(Review.rating)
+        .all()
+    )
+    histogram = {stars: 0 for stars in range(5, 0, -1)}
+    for rating, count in rows:
+        histogram[rating] = count
+    total = sum(histogram.values())
+    avg = sum(stars * count for stars, count in histogram.items()) / total if total else 0
+    return {'histogram': histogram, 'total': total, 'avg': avg}
+
+
+def _pending_proposals_by_pair(proposals):
+    """Map pair_key -> a pending proposal on the same service pair (either direction), in one query."""
+    pair_keys = {p.pair_key for p in proposals}
+    if not pair_keys:
+        return {}
+    pending = DealProposal.query.filter(
+        DealProposal.pair_key.in_(pair_keys),
+        DealProposal.status == 'pending',
+    ).all()
+    by_pair = {}
+    for p in pending:
+        by_pair.setdefault(p.pair_key, p)
+    return by_pair
+
+
+def _sidebar_company_rows(user_id):
+    """The user's companies with role and member/service counts: one grouped query, memoized in g."""
+    cache = g.setdefault('sidebar_companies', {})
+    user_id = uuid.UUID(str(user_id))
+    if user_id not in cache:
+        user_company_ids = db.select(CompanyMember.company_id).where(CompanyMember.user_id == user_id)
+        member_counts = (
+            db.session.query(CompanyMember.company_id, func.count(CompanyMember.member_id).label('n'))
+            .filter(CompanyMember.company_id.in_(user_company_ids))
+            .group_by(CompanyMember.company_id)
+            .subquery()
+        )
+        service_counts = (
+            db.session.query(Service.company_id, func.count(Service.service_id).label('n'))
+            .filter(Service.company_id.in_(user_company_ids))
+            .group_by(Service.company_id)
+            .subquery()
+        )
+        rows = (
+            db.session.query(
+                Company.company_id,
+                Company.name,
+                Company.description,
+                CompanyMember.is_admin,
+                func.coalesce(member_counts.c.n, 0).label('member_count'),
+                func.coalesce(service_counts.c.n, 0).label('service_count'),
+            )
+            .join(CompanyMember, CompanyMember.company_id == Company.company_id)
+            .outerjoin(member_counts, member_counts.c.company_id == Company.company_id)
+            .outerjoin(service_counts, service_counts.c.company_id == Company.company_id)
+            .filter(CompanyMember.user_id == user_id)
+            .order_by(CompanyMember.created_at, Company.name)
+            .all()
+        )
+        cache[user_id] = rows
+    return cache[user_id]
+
+
+def _sidebar_companies(user_id, selected_company_id=None):
+    """Sidebar/company-list entries for the user; repeat calls in a request reuse one query."""
+    if selected_company_id is not None:
+        selected_company_id = uuid.UUID(str(selected_company_id))
+    return [
+        {
+            'company_id': row.company_id,
+            'name': row.name,
+            'description': row.description,
+            'role': 'Admin' if row.is_admin else 'Member',
+            'is_admin': row.is_admin,
+            'member_count': row.member_count,
+            'service_count': row.service_count,
+            'is_selected': row.company_id == selected_company_id,
+        }
+        for row in _sidebar_company_rows(user_id)
+    ]
 
 
 def _workspace_context(company_id, require_admin=False):
     """Common load for workspace pages; returns (user, membership, company, companies, member_count, service_count) or a response."""
     if (resp := _require_login()):
         return None, None, None, None, None, None, resp
-    user_id = uuid.UUID(session['user_id'])
-    user = User.query.get(user_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=user_id).first()
+    identity = current_identity()
+    user, user_id = identity.user, identity.user_id
+    membership = identity.membership(company_id)
     if not membership or (require_admin and not membership.is_admin):
         return None, None, None, None, None, None, ('Forbidden', 403)
-    company = Company.query.get_or_404(company_id)
+    company = membership.company
     companies = _sidebar_companies(user_id, company_id)
-    member_count = CompanyMember.query.filter_by(company_id=company_id).count()
-    service_count = Service.query.filter_by(company_id=company_id).count()
-    return user, membership, company, companies, member_count, service_count, None
+    selected = next((c for c in companies if c['is_selected']), None)
+    if selected is None:
+        # The cached membership is gone from the database (left or removed since it was cached)
+        flash('You are not a member of this company', 'error')
+        return None, None, None, None, None, None, redirect(url_for('main.my_companies'))
+    return user, membership, company, companies, selected['member_count'], selected['service_count'], None
 
 
 def _marketplace_context(selected_company_id_str=None, redirect_missing=None, logged_in_uid=None, require_company=False):
@@ -171,8 +427,7 @@ def _marketplace_context(selected_company_id_str=None, redirect_missing=None, lo
             return None, None, None, None
 
     uid = logged_in_uid
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    user_companies = [membership.company for membership in memberships]
+    user_companies = current_identity().companies
     
     selected_company_id = None
     if selected_company_id_str:
@@ -229,30 +484,72 @@ def mark_tradeflow_section_viewed(company_id, section):
     except (ValueError, AttributeError):
         return
     
-    # Find existing view record or create new one
-    view = TradeflowView.query.filter_by(
-        company_id=company_uuid,
-        user_id=user_uuid,
-        section=section
-    ).first()
-    
-    if view:
-        view.last_viewed_at = datetime.datetime.now(datetime.timezone.utc)
-    else:
-        view = TradeflowView(
-            view_id=uuid.uuid4(),
+    # Markers are bookkeeping: read them fresh, and viewing a list shouldn't pin the user
+    with primary():
+        # Everything counted so far for this section is now "seen"
+        current_seq = func.coalesce(
+            db.select(TradeflowCounter.seq)
+            .where(TradeflowCounter.company_id == company_uuid, TradeflowCounter.section == section)
+            .scalar_subquery(),
+            0,
+        )
+
+        # Find existing view record or create new one
+        view = TradeflowView.query.filter_by(
             company_id=company_uuid,
             user_id=user_uuid,
-            section=section,
-            last_viewed_at=datetime.datetime.now(datetime.timezone.utc)
-        )
-        db.session.add(view)
-    
-    db.session.commit()
+            section=section
+        ).first()
+
+        if view:
+            view.last_viewed_at = datetime.datetime.now(datetime.timezone.utc)
+            view.last_seen_seq = current_seq
+        else:
+            view = TradeflowView(
+                view_id=uuid.uuid4(),
+                company_id=company_uuid,
+                user_id=user_uuid,
+                section=section,
+                last_viewed_at=datetime.datetime.now(datetime.timezone.utc),
+                last_seen_seq=current_seq,
+            )
+            db.session.add(view)
+
+        db.session.commit()
+
+
+def bump_tradeflow_counters(events, items=None):
+    """Increment badge counters for (company_id, section) pairs in one upsert.
+
+    Call from tradeflow write paths before their commit so the bump shares the transaction;
+    open sidebar streams receive the same deltas once it commits. items maps a section to the
+    (kind, item_id) that arrived in it, announced to every company bumped in that section.
+    """
+    increments = Counter((uuid.UUID(str(company_id)), section) for company_id, section in events)
+    if not increments:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = insert_on_conflict(TradeflowCounter).values([
+        {'company_id': company_id, 'section': section, 'seq': n, 'updated_at': now}
+        for (company_id, section), n in increments.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TradeflowCounter.company_id, TradeflowCounter.section],
+        set_={'seq': TradeflowCounter.seq + stmt.excluded.seq, 'updated_at': stmt.excluded.updated_at},
+    )
+    db.session.execute(stmt)
+    items = items or {}
+    announce_badge_deltas(increments, [
+        (company_id, section, *items[section]) for company_id, section in increments if section in items
+    ])
 
 
 def get_tradeflow_unread_counts(company_id):
-    """Get unread counts for all tradeflow sections."""
+    """Get unread counts for all tradeflow sections.
+
+    Reads the company's pushed counters (primary-key range on tradeflow_counter) joined with the
+    user's last seen sequence numbers, so the cost does not grow with tradeflow history.
+    """
     user_id = session.get('user_id')
     if not user_id:
         return {}
@@ -262,88 +559,26 @@ def get_tradeflow_unread_counts(company_id):
         company_uuid = uuid.UUID(str(company_id))
     except (ValueError, AttributeError):
         return {}
-    
-    counts = {}
-    
-    # Get last viewed timestamps for each section
-    views = TradeflowView.query.filter_by(
-        company_id=company_uuid,
-        user_id=user_uuid
-    ).all()
-    
-    last_viewed = {view.section: view.last_viewed_at for view in views}
-    
-    # Count incoming requests created after last view
-    incoming_cutoff = last_viewed.get('incoming', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['incoming'] = TradeRequest.query.filter(
-        TradeRequest.requested_service.has(company_id=company_uuid),
-        TradeRequest.status == 'active',
-        TradeRequest.created_at > incoming_cutoff
-    ).count()
-    
-    # Count you requested items created after last view
-    you_requested_cutoff = last_viewed.get('you_requested', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['you_requested'] = TradeRequest.query.filter(
-        TradeRequest.requesting_company_id == company_uuid,
-        TradeRequest.status == 'active',
-        TradeRequest.created_at > you_requested_cutoff
-    ).count()
-    
-    # Count archived requests using archived_at timestamp (fallback to created_at for old records)
-    archived_cutoff = last_viewed.get('archived', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    # For old records without archived_at, use created_at as a fallback
-    counts['archived'] = TradeRequest.query.filter(
-        ((TradeRequest.requesting_company_id == company_uuid) | 
-         (TradeRequest.requested_service.has(company_id=company_uuid))),
-        TradeRequest.status == 'archived',
-        db.or_(
-            db.and_(TradeRequest.archived_at != None, TradeRequest.archived_at > archived_cutoff),
-            db.and_(TradeRequest.archived_at == None, TradeRequest.created_at > archived_cutoff)
+
+    with primary():
+        rows = (
+            db.session.query(
+                TradeflowCounter.section,
+                TradeflowCounter.seq - func.coalesce(TradeflowView.last_seen_seq, 0),
+            )
+            .outerjoin(
+                TradeflowView,
+                db.and_(
+                    TradeflowView.company_id == TradeflowCounter.company_id,
+                    TradeflowView.section == TradeflowCounter.section,
+                    TradeflowView.user_id == user_uuid,
+                ),
+            )
+            .filter(TradeflowCounter.company_id == company_uuid)
+            .all()
         )
-    ).count()
-    
-    # Count matches
-    matches_cutoff = last_viewed.get('matches', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['matches'] = DealProposal.query.filter(
-        DealProposal.status == 'matched',
-        ((DealProposal.from_company_id == company_uuid) | 
-         (DealProposal.to_company_id == company_uuid)),
-        DealProposal.created_at > matches_cutoff
-    ).count()
-    
-    # Count awaiting signature
-    awaiting_signature_cutoff = last_viewed.get('awaiting_signature', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['awaiting_signature'] = DealProposal.query.filter(
-        DealProposal.to_company_id == company_uuid,
-        DealProposal.status == 'pending',
-        DealProposal.created_at > awaiting_signature_cutoff
-    ).count()
-    
-    # Count awaiting other party
-    awaiting_other_cutoff = last_viewed.get('awaiting_other_party', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['awaiting_other_party'] = DealProposal.query.filter(
-        DealProposal.from_company_id == company_uuid,
-        DealProposal.status == 'pending',
-        DealProposal.created_at > awaiting_other_cutoff
-    ).count()
-    
-    # Count ongoing deals
-    ongoing_cutoff = last_viewed.get('ongoing', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['ongoing'] = ActiveDeal.query.join(DealProposal).filter(
-        ((DealProposal.from_company_id == company_uuid) | 
-         (DealProposal.to_company_id == company_uuid)),
-        ActiveDeal.status == 'in_progress',
-        ActiveDeal.created_at > ongoing_cutoff
-    ).count()
-    
-    # Count completed deals
-    completed_cutoff = last_viewed.get('completed', datetime.datetime.min.replace(tzinfo=datetime.timezone.utc))
-    counts['completed'] = ActiveDeal.query.join(DealProposal).filter(
-        ((DealProposal.from_company_id == company_uuid) | 
-         (DealProposal.to_company_id == company_uuid)),
-        ActiveDeal.status == 'completed',
-        ActiveDeal.created_at > completed_cutoff
-    ).count()
-    
-    return counts
 
+    counts = dict.fromkeys(TRADEFLOW_SECTIONS, 0)
+    for section, unread in rows:
+        counts[section] = max(unread, 0)
+    return counts
@@ -3,16 +3,29 @@ import uuid
 
 from flask import request, redirect, url_for, render_template, session, flash
 from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
 
+from ..db_routing import read_replica
+from ..metrics import count_transition
 from ..fairness import record_service_view
 from ..models import db, Service, Review, TradeRequest, Company
+from ..recommendations import recommended_services
 from .core import main
-from .helpers import _marketplace_context, login_required
+from .helpers import (
+    _current_membership,
+    _marketplace_context,
+    _review_page,
+    _review_summary,
+    bump_tradeflow_counters,
+    current_identity,
+    login_required,
+)
 
 PAGE_LIMIT = 60  # cap result set to keep marketplace snappy
 
 
 @main.route('/marketplace')
+@read_replica
 def marketplace():
     """Main marketplace page with optional company selection via sidebar."""
     # Get user info and companies (no redirect if not logged in or no company)
@@ -23,9 +36,7 @@ def marketplace():
     if 'user_id' in session:
         try:
             uid = uuid.UUID(session['user_id'])
-            from ..models import CompanyMember
-            memberships = CompanyMember.query.filter_by(user_id=uid).all()
-            user_companies = [membership.company for membership in memberships]
+            user_companies = current_identity().companies
             
             # Check for selected company in session or query param
             selected_company_id_str = request.args.get('company_id') or session.get('marketplace_company_id')
@@ -51,7 +62,10 @@ def marketplace():
     page = max(page, 1)
 
     # Base query: active services
-    query = Service.query.join(Company, Service.company_id == Company.company_id).filter(
+    # Load each card's company from the join instead of one lookup per card
+    query = Service.query.join(Company, Service.company_id == Company.company_id).options(
+        contains_eager(Service.company)
+    ).filter(
         Service.is_active == True  # noqa: E712
     )
     
@@ -82,16 +96,25 @@ def marketplace():
     )
     services = pagination.items
 
+    # Recommendations only on the unfiltered first page, served from the precomputed co-request index
+    recommended = []
+    if selected_company and page == 1 and not search_query and not category_filter:
+        recommended = recommended_services(
+            selected_company.company_id,
+            exclude_company_ids=[c.company_id for c in user_companies],
+        )
+
     # Aggregate ratings in one query to avoid N+1 lookups
     service_ratings = {}
-    if services:
+    rated_ids = {s.service_id for s in services} | {s.service_id for s in recommended}
+    if rated_ids:
         rating_rows = (
             db.session.query(
                 Review.reviewed_service_id.label('service_id'),
                 func.avg(Review.rating).label('avg_rating'),
                 func.count(Review.review_id).label('count_rating'),
             )
-            .filter(Review.reviewed_service_id.in_([s.service_id for s in services]))
+            .filter(Review.reviewed_service_id.in_(rated_ids))
             .group_by(Review.reviewed_service_id)
             .all()
         )
@@ -104,6 +127,7 @@ def marketplace():
     return render_template(
         'marketplace.html',
         services=services,
+        recommended_services=recommended,
         pagination=pagination,
         selected_company=selected_company,
         user_companies=user_companies,
@@ -115,6 +139,7 @@ def marketplace():
 
 
 @main.route('/marketplace/public')
+@read_replica
 def marketplace_public():
     """Public marketplace page for non-logged-in users and logged-in users without a company."""
     # Check if user is logged in
@@ -130,7 +155,9 @@ def marketplace_public():
     page = max(page, 1)
 
     # Base query
-    query = Service.query.join(Company, Service.company_id == Company.company_id).filter(Service.is_active == True)  # noqa: E712
+    query = Service.query.join(Company, Service.company_id == Company.company_id).options(
+        contains_eager(Service.company)
+    ).filter(Service.is_active == True)  # noqa: E712
 
     # Apply search filter (including company name)
     if search_query:
@@ -184,16 +211,14 @@ def marketplace_public():
 
 
 @main.route('/marketplace/service/<uuid:service_id>/trade')
+@read_replica
 def marketplace_service_view(service_id):
     """Service detail page for logged-in users with trade request form."""
     if 'user_id' not in session:
         return redirect(url_for('main.marketplace_service_detail_view', service_id=service_id))
-    uid = uuid.UUID(session['user_id'])
     
     # Get company info without redirecting
-    from ..models import CompanyMember
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    user_companies = [membership.company for membership in memberships]
+    user_companies = current_identity().companies
     
     # Try to get selected company from query param or session
     selected_company = None
@@ -217,8 +242,8 @@ def marketplace_service_view(service_id):
 
     record_service_view(service.service_id)
 
-    reviews = Review.query.filter_by(reviewed_service_id=service_id).order_by(Review.created_at.desc()).all()
-    avg_rating = sum(r.rating for r in reviews) / len(reviews) if reviews else 0
+    reviews, next_cursor = _review_page(service_id, request.args.get('reviews_before'))
+    review_summary = _review_summary(service_id)
 
     return render_template(
         'marketplace-trade-request.html',
@@ -226,7 +251,9 @@ def marketplace_service_view(service_id):
         selected_company=selected_company,
         user_companies=user_companies,
         reviews=reviews,
-        avg_rating=avg_rating,
+        review_summary=review_summary,
+        avg_rating=review_summary['avg'],
+        next_reviews_cursor=next_cursor,
     )
 
 
@@ -258,6 +285,7 @@ def marketplace_request_service(service_id):
         request_id=uuid.uuid4(),
         requesting_company_id=company_id,
         requested_service_id=service_id,
+        requested_company_id=service.company_id,
         validity_days=validity_days,
         status='active',
         created_at=now,
@@ -265,6 +293,11 @@ def marketplace_request_service(service_id):
     )
 
     db.session.add(trade_request)
+    bump_tradeflow_counters(
+        [(service.company_id, 'incoming'), (company_id, 'you_requested')],
+        items=dict.fromkeys(('incoming', 'you_requested'), ('request', trade_request.request_id)),
+    )
+    count_transition('request_sent')
     db.session.commit()
 
     flash('Trade request sent successfully!', 'success')
@@ -275,11 +308,8 @@ def marketplace_request_service(service_id):
 @login_required
 def marketplace_select_company(company_id):
     """Select a company for marketplace browsing."""
-    uid = uuid.UUID(session['user_id'])
-    from ..models import CompanyMember
-    
     # Verify user is member of this company
-    membership = CompanyMember.query.filter_by(user_id=uid, company_id=company_id).first()
+    membership = _current_membership(company_id)
     if not membership:
         flash('You are not a member of that company', 'error')
         return redirect(url_for('main.marketplace'))
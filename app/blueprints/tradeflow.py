@@ -1,25 +1,46 @@
 import datetime
 import uuid
 
-from flask import request, redirect, url_for, render_template, session, flash
+from flask import Response, abort, current_app, request, redirect, url_for, render_template, session, flash
+from sqlalchemy.orm import contains_eager, joinedload
 
+from ..db_routing import read_replica
+from ..deals import OPEN_STATUSES, SupersedeScope, accept_proposal
 from ..fairness import compute_fairness
+from ..metrics import count_transition
 from ..models import db, Service, TradeRequest, DealProposal, ActiveDeal, Review
+from ..sweeper import MATCH_TTL
+from ..trade_stats import record_completion, record_match, record_offer_decision, record_review
+from ..tradeflow_events import FULL_RETRY_SECONDS, broker
 from .core import main
 from .helpers import (
-    _create_active_deal_from_proposal,
+    _archived_requests_page,
     _ensure_proposal_involves_company,
     _ensure_request_for_company,
+    _member_or_403,
     _parse_int,
+    _parse_uuid,
+    _pending_proposals_by_pair,
     _require_company_member,
     _require_login,
     mark_tradeflow_section_viewed,
     get_tradeflow_unread_counts,
     _sidebar_companies,
+    bump_tradeflow_counters,
 )
 
 
+def _money_terms(form):
+    """(money_direction, money_amount) from an offer form, or (None, None) when no money is added."""
+    direction = form.get('money_type')
+    amount = _parse_int(form.get('money_amount'), 0)
+    if direction in ('receive', 'give') and 0 < amount < 2**31:
+        return direction, amount
+    return None, None
+
+
 @main.route('/tradeflow/<uuid:company_id>/incoming-requests', methods=['GET'])
+@read_replica
 def tradeflow_incoming_requests(company_id):
     """View incoming trade requests for this company"""
     if (resp := _require_login()):
@@ -38,10 +59,13 @@ def tradeflow_incoming_requests(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    incoming_requests = TradeRequest.query.join(Service).filter(
-        Service.company_id == company_id,
+    incoming_requests = TradeRequest.query.options(
+        joinedload(TradeRequest.requesting_company),
+        joinedload(TradeRequest.requested_service).joinedload(Service.company),
+    ).filter(
+        TradeRequest.requested_company_id == company_id,
         TradeRequest.status == 'active'
-    ).all()
+    ).order_by(TradeRequest.created_at.desc()).all()
 
     return render_template('tradeflow_incoming_requests.html', company=company, incoming_requests=incoming_requests, unread_counts=unread_counts, user_companies=user_companies)
 
@@ -54,13 +78,21 @@ def tradeflow_select_return(company_id, request_id):
     company, resp = _require_company_member(company_id)
     if resp:
         return resp
-    incoming_request = TradeRequest.query.get_or_404(request_id)
+    query = TradeRequest.query
+    if request.method == 'POST':
+        # Locked so a repeated or concurrent submit sees the status this one sets
+        query = query.with_for_update()
+    incoming_request = query.get_or_404(request_id)
 
     if (resp := _ensure_request_for_company(incoming_request, company_id)):
         return resp
 
     if request.method == 'POST':
-        selected_service_id = request.form.get('selected_service_id')
+        if incoming_request.status != 'active':
+            flash('This request has already been processed.', 'warning')
+            return redirect(url_for('main.tradeflow_incoming_requests', company_id=company_id))
+
+        selected_service_id = _parse_uuid(request.form.get('selected_service_id'))
         if not selected_service_id:
             flash('Please select a service', 'error')
             return redirect(url_for('main.tradeflow_select_return', company_id=company_id, request_id=request_id))
@@ -80,6 +112,11 @@ def tradeflow_select_return(company_id, request_id):
         db.session.add(proposal)
         incoming_request.status = 'archived'
         incoming_request.archived_at = datetime.datetime.now(datetime.timezone.utc)
+        bump_tradeflow_counters([
+            (incoming_request.requesting_company_id, 'archived'), (company_id, 'archived'),
+            (incoming_request.requesting_company_id, 'matches'), (company_id, 'matches'),
+        ], items={'archived': ('request', request_id), 'matches': ('match', proposal.proposal_id)})
+        record_match(company_id, incoming_request.created_at, incoming_request.archived_at)
         db.session.commit()
 
         flash('Match created! You can now make an offer.', 'success')
@@ -107,7 +144,7 @@ def tradeflow_select_return_detail(company_id, request_id, service_id):
     incoming_request = TradeRequest.query.get_or_404(request_id)
     service = Service.query.get_or_404(service_id)
 
-    if incoming_request.requested_service.company_id != company_id or service.company_id != incoming_request.requesting_company_id:
+    if incoming_request.requested_company_id != company_id or service.company_id != incoming_request.requesting_company_id:
         flash('Access denied', 'error')
         return redirect(url_for('main.my_companies'))
 
@@ -128,13 +165,22 @@ def tradeflow_decline_request(company_id, request_id):
     company, resp = _require_company_member(company_id)
     if resp:
         return resp
-    trade_request = TradeRequest.query.get_or_404(request_id)
+    # Locked so a concurrent decline or match sees the status this one sets
+    trade_request = TradeRequest.query.with_for_update().get_or_404(request_id)
 
     if (resp := _ensure_request_for_company(trade_request, company_id)):
         return resp
 
+    if trade_request.status != 'active':
+        flash('This request has already been processed.', 'warning')
+        return redirect(url_for('main.tradeflow_incoming_requests', company_id=company_id))
+
     trade_request.status = 'archived'
     trade_request.archived_at = datetime.datetime.now(datetime.timezone.utc)
+    bump_tradeflow_counters(
+        [(trade_request.requesting_company_id, 'archived'), (company_id, 'archived')],
+        items={'archived': ('request', request_id)},
+    )
     db.session.commit()
 
     flash('Request declined', 'info')
@@ -149,10 +195,21 @@ def tradeflow_create_match(company_id):
     company, resp = _require_company_member(company_id)
     if resp:
         return resp
-    request_id = request.form.get('request_id')
-    service_id = request.form.get('service_id')
+    request_id = _parse_uuid(request.form.get('request_id'))
+    service_id = _parse_uuid(request.form.get('service_id'))
+    if not request_id or not service_id:
+        abort(404)
+
+    # Locked so a repeated or concurrent submit sees the status this one sets
+    trade_request = TradeRequest.query.with_for_update().get_or_404(request_id)
+
+    if (resp := _ensure_request_for_company(trade_request, company_id)):
+        return resp
+
+    if trade_request.status != 'active':
+        flash('This request has already been processed.', 'warning')
+        return redirect(url_for('main.tradeflow_incoming_requests', company_id=company_id))
 
-    trade_request = TradeRequest.query.get_or_404(request_id)
     Service.query.get_or_404(service_id)
 
     proposal = DealProposal(
@@ -168,6 +225,11 @@ def tradeflow_create_match(company_id):
     db.session.add(proposal)
     trade_request.status = 'archived'
     trade_request.archived_at = datetime.datetime.now(datetime.timezone.utc)
+    bump_tradeflow_counters([
+        (trade_request.requesting_company_id, 'archived'), (company_id, 'archived'),
+        (trade_request.requesting_company_id, 'matches'), (company_id, 'matches'),
+    ], items={'archived': ('request', request_id), 'matches': ('match', proposal.proposal_id)})
+    record_match(company_id, trade_request.created_at, trade_request.archived_at)
     db.session.commit()
 
     flash('Match created! You can now create an offer.', 'success')
@@ -175,6 +237,7 @@ def tradeflow_create_match(company_id):
 
 
 @main.route('/tradeflow/<uuid:company_id>/you-requested', methods=['GET'])
+@read_replica
 def tradeflow_you_requested(company_id):
     """View trade requests that this company has sent"""
     if (resp := _require_login()):
@@ -190,7 +253,9 @@ def tradeflow_you_requested(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    your_requests = TradeRequest.query.filter_by(
+    your_requests = TradeRequest.query.options(
+        joinedload(TradeRequest.requested_service).joinedload(Service.company),
+    ).filter_by(
         requesting_company_id=company_id,
         status='active'
     ).all()
@@ -221,6 +286,7 @@ def tradeflow_you_requested_detail(company_id, request_id):
 
 
 @main.route('/tradeflow/<uuid:company_id>/archived-requests', methods=['GET'])
+@read_replica
 def tradeflow_archived_requests(company_id):
     """View archived trade requests"""
     if (resp := _require_login()):
@@ -236,14 +302,10 @@ def tradeflow_archived_requests(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    # Get archived requests both sent by and received by this company
-    archived_requests = TradeRequest.query.filter(
-        ((TradeRequest.requesting_company_id == company_id) | 
-         (TradeRequest.requested_service.has(company_id=company_id))),
-        TradeRequest.status == 'archived'
-    ).order_by(TradeRequest.archived_at.desc().nullsfirst()).all()
+    # Archived requests both sent by and received by this company, one keyset page at a time
+    archived_requests, next_cursor = _archived_requests_page(company_id, request.args.get('before'))
 
-    return render_template('tradeflow_archived_requests.html', company=company, archived_requests=archived_requests, unread_counts=unread_counts, user_companies=user_companies)
+    return render_template('tradeflow_archived_requests.html', company=company, archived_requests=archived_requests, next_cursor=next_cursor, unread_counts=unread_counts, user_companies=user_companies)
 
 
 @main.route('/tradeflow/<uuid:company_id>/archived-requests/<uuid:request_id>', methods=['GET'])
@@ -269,6 +331,7 @@ def tradeflow_archived_request_detail(company_id, request_id):
 
 
 @main.route('/tradeflow/<uuid:company_id>/match-made', methods=['GET'])
+@read_replica
 def tradeflow_match_made(company_id):
     """View all matches (where trade request was sent AND return service was selected)"""
     if (resp := _require_login()):
@@ -285,55 +348,32 @@ def tradeflow_match_made(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
-    expired = DealProposal.query.filter(
-        DealProposal.status == 'matched',
-        DealProposal.created_at < cutoff_date
-    ).all()
-    for proposal in expired:
-        db.session.delete(proposal)
-    db.session.commit()
-
-    matched_proposals = DealProposal.query.filter(
+    # Stale matches are purged by the expiry sweeper; hide any it hasn't reached yet
+    cutoff_date = datetime.datetime.now(datetime.timezone.utc) - MATCH_TTL
+    matched_proposals = DealProposal.query.options(
+        joinedload(DealProposal.from_service).joinedload(Service.company),
+        joinedload(DealProposal.to_service).joinedload(Service.company),
+    ).filter(
         DealProposal.status == 'matched',
+        DealProposal.created_at >= cutoff_date,
         (
             (DealProposal.from_company_id == company_id) |
             (DealProposal.to_company_id == company_id)
         )
     ).all()
 
-    # For each match, check if there's a pending proposal
+    # Pending (not rejected) proposals on the same service pairs, resolved for the whole page at once
+    pending_by_pair = _pending_proposals_by_pair(matched_proposals)
+
     matches_with_status = []
     for match in matched_proposals:
-        # Check if there's a pending proposal for this service pair (not rejected)
-        pending_proposal = DealProposal.query.filter(
-            DealProposal.status == 'pending',
-            (
-                (
-                    (DealProposal.from_company_id == match.from_company_id) &
-                    (DealProposal.to_company_id == match.to_company_id) &
-                    (DealProposal.from_service_id == match.from_service_id) &
-                    (DealProposal.to_service_id == match.to_service_id)
-                ) |
-                (
-                    (DealProposal.from_company_id == match.to_company_id) &
-                    (DealProposal.to_company_id == match.from_company_id) &
-                    (DealProposal.from_service_id == match.to_service_id) &
-                    (DealProposal.to_service_id == match.from_service_id)
-                )
-            )
-        ).first()
-        
+        pending_proposal = pending_by_pair.get(match.pair_key)
         match_info = {
             'proposal': match,
             'has_pending': pending_proposal is not None,
-            'pending_sent_by_you': False
-        }
-        
-        if pending_proposal:
             # Determine if the current company sent the pending proposal
-            match_info['pending_sent_by_you'] = (pending_proposal.from_company_id == company_id)
-        
+            'pending_sent_by_you': pending_proposal is not None and pending_proposal.from_company_id == company_id,
+        }
         matches_with_status.append(match_info)
 
     return render_template(
@@ -364,9 +404,8 @@ def tradeflow_match_detail(company_id, proposal_id):
     fairness_data = compute_fairness(proposal.from_service, proposal.to_service)
 
     if request.method == 'POST':
-        message = request.form.get('message', '')
-        money_amount = _parse_int(request.form.get('money_amount'), 0)
-        money_type = request.form.get('money_type') if request.form.get('money_type') in ('receive', 'give') else None
+        message = request.form.get('message', '').strip()
+        money_direction, money_amount = _money_terms(request.form)
 
         # Compute orientation for the NEW proposal based on current company sending
         if proposal.from_company_id == company_id:
@@ -380,13 +419,6 @@ def tradeflow_match_detail(company_id, proposal_id):
             new_from_service_id = proposal.to_service_id
             new_to_service_id = proposal.from_service_id
 
-        # Persist money info inside message (no DB fields). Prefix with a simple tag.
-        money_prefix = ''
-        if money_type and money_amount and money_amount > 0:
-            money_prefix = f"[MONEY:{money_type}:{money_amount}] "
-
-        full_message = (money_prefix + message).strip()
-
         # Create a new DealProposal so both sides' offers remain visible
         new_proposal = DealProposal(
             proposal_id=uuid.uuid4(),
@@ -395,10 +427,17 @@ def tradeflow_match_detail(company_id, proposal_id):
             from_service_id=new_from_service_id,
             to_service_id=new_to_service_id,
             status='pending',
-            message=full_message if full_message else None,
+            message=message or None,
+            money_direction=money_direction,
+            money_amount=money_amount,
             created_at=datetime.datetime.now(datetime.timezone.utc)
         )
         db.session.add(new_proposal)
+        bump_tradeflow_counters(
+            [(new_to_company_id, 'awaiting_signature'), (new_from_company_id, 'awaiting_other_party')],
+            items=dict.fromkeys(('awaiting_signature', 'awaiting_other_party'), ('offer', new_proposal.proposal_id)),
+        )
+        count_transition('offer_sent')
         db.session.commit()
 
         flash('Offer sent! Waiting for the other party to respond.', 'success')
@@ -422,32 +461,15 @@ def tradeflow_create_offer(company_id, proposal_id):
     if request.method == 'POST':
         message = request.form.get('message', '')
 
-        proposal.message = message if message.strip() else None
-        proposal.status = 'accepted'
-
-        db.session.add(_create_active_deal_from_proposal(proposal_id))
-        # Remove related pending/matched proposals for the same pair (both directions)
-        related = DealProposal.query.filter(
-            DealProposal.proposal_id != proposal_id,
-            DealProposal.status.in_(['matched', 'pending']),
-            (
-                (
-                    (DealProposal.from_company_id == proposal.from_company_id) &
-                    (DealProposal.to_company_id == proposal.to_company_id) &
-                    (DealProposal.from_service_id == proposal.from_service_id) &
-                    (DealProposal.to_service_id == proposal.to_service_id)
-                ) |
-                (
-                    (DealProposal.from_company_id == proposal.to_company_id) &
-                    (DealProposal.to_company_id == proposal.from_company_id) &
-                    (DealProposal.from_service_id == proposal.to_service_id) &
-                    (DealProposal.to_service_id == proposal.from_service_id)
-                )
-            )
-        ).all()
-        for p in related:
-            db.session.delete(p)
-        db.session.commit()
+        result = accept_proposal(
+            proposal_id,
+            expected_statuses=OPEN_STATUSES,
+            scope=SupersedeScope.SERVICE_PAIR,
+            message=message if message.strip() else None,
+        )
+        if not result.accepted:
+            flash('This match has already been processed.', 'warning')
+            return redirect(url_for('main.tradeflow_match_made', company_id=company_id))
 
         flash('Offer accepted! Deal is now active.', 'success')
         return redirect(url_for('main.tradeflow_ongoing_deals', company_id=company_id))
@@ -464,12 +486,11 @@ def tradeflow_awaiting_signature(company_id):
     if resp:
         return resp
 
-    mark_tradeflow_section_viewed(company_id, 'awaiting_signature')
-    unread_counts = get_tradeflow_unread_counts(company_id)
-
     if request.method == 'POST':
-        proposal_id = request.form.get('proposal_id')
+        proposal_id = _parse_uuid(request.form.get('proposal_id'))
         action = request.form.get('action')
+        if not proposal_id:
+            abort(404)
 
         proposal = DealProposal.query.get_or_404(proposal_id)
 
@@ -478,56 +499,21 @@ def tradeflow_awaiting_signature(company_id):
             return redirect(url_for('main.my_companies'))
 
         if action == 'accept':
-            proposal.status = 'accepted'
-            db.session.add(_create_active_deal_from_proposal(proposal_id))
-            
-            # First remove proposals for the exact same service pair (both orientations)
-            related = DealProposal.query.filter(
-                DealProposal.proposal_id != proposal_id,
-                DealProposal.status.in_(['matched', 'pending']),
-                (
-                    (
-                        (DealProposal.from_company_id == proposal.from_company_id) &
-                        (DealProposal.to_company_id == proposal.to_company_id) &
-                        (DealProposal.from_service_id == proposal.from_service_id) &
-                        (DealProposal.to_service_id == proposal.to_service_id)
-                    ) |
-                    (
-                        (DealProposal.from_company_id == proposal.to_company_id) &
-                        (DealProposal.to_company_id == proposal.from_company_id) &
-                        (DealProposal.from_service_id == proposal.to_service_id) &
-                        (DealProposal.to_service_id == proposal.from_service_id)
-                    )
-                )
-            ).all()
-            for p in related:
-                db.session.delete(p)
-            
-            # Additionally remove any other matched/pending proposals between the same companies (any services)
-            related_company = DealProposal.query.filter(
-                DealProposal.status.in_(['matched', 'pending']),
-                DealProposal.proposal_id != proposal_id,
-                (
-                    (
-                        (DealProposal.from_company_id == proposal.from_company_id) &
-                        (DealProposal.to_company_id == proposal.to_company_id)
-                    ) |
-                    (
-                        (DealProposal.from_company_id == proposal.to_company_id) &
-                        (DealProposal.to_company_id == proposal.from_company_id)
-                    )
-                )
-            ).all()
-            for p in related_company:
-                db.session.delete(p)
-            
-            db.session.commit()
+            result = accept_proposal(proposal_id)
+            if not result.accepted:
+                flash('This offer has already been processed.', 'warning')
+                return redirect(url_for('main.tradeflow_awaiting_signature', company_id=company_id))
 
             flash('Deal accepted! Now active.', 'success')
             return redirect(url_for('main.tradeflow_ongoing_deals', company_id=company_id))
 
         elif action == 'decline':
+            if proposal.status != 'pending':
+                flash('This offer has already been processed.', 'warning')
+                return redirect(url_for('main.tradeflow_awaiting_signature', company_id=company_id))
+
             proposal.status = 'rejected'
+            record_offer_decision(proposal, accepted=False)
             db.session.commit()
 
             flash('Offer declined.', 'info')
@@ -540,27 +526,14 @@ def tradeflow_awaiting_signature(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    awaiting_signature = DealProposal.query.filter_by(
+    awaiting_signature = DealProposal.query.options(
+        joinedload(DealProposal.from_service).joinedload(Service.company),
+        joinedload(DealProposal.to_service).joinedload(Service.company),
+    ).filter_by(
         to_company_id=company_id,
         status='pending'
     ).all()
 
-    # Parse money tags for overview cards
-    for offer in awaiting_signature:
-        offer.money_type = None
-        offer.money_amount = None
-        try:
-            if offer.message and offer.message.startswith('[MONEY:'):
-                end_idx = offer.message.find(']')
-                if end_idx != -1:
-                    tag = offer.message[7:end_idx]
-                    parts = tag.split(':')
-                    if len(parts) == 2 and parts[0] in ('receive', 'give'):
-                        offer.money_type = parts[0]
-                        offer.money_amount = _parse_int(parts[1], 0)
-        except Exception:
-            pass
-
     return render_template('tradeflow_awaiting_signature.html', company=company, awaiting_signature=awaiting_signature, unread_counts=unread_counts, user_companies=user_companies)
 
 
@@ -582,78 +555,26 @@ def tradeflow_awaiting_signature_detail(company_id, proposal_id):
         action = request.form.get('action')
 
         if action == 'accept':
-            proposal.status = 'accepted'
-            db.session.add(_create_active_deal_from_proposal(proposal_id))
-            
-            # First remove proposals for the exact same service pair (both orientations)
-            related = DealProposal.query.filter(
-                DealProposal.proposal_id != proposal_id,
-                DealProposal.status.in_(['matched', 'pending']),
-                (
-                    (
-                        (DealProposal.from_company_id == proposal.from_company_id) &
-                        (DealProposal.to_company_id == proposal.to_company_id) &
-                        (DealProposal.from_service_id == proposal.from_service_id) &
-                        (DealProposal.to_service_id == proposal.to_service_id)
-                    ) |
-                    (
-                        (DealProposal.from_company_id == proposal.to_company_id) &
-                        (DealProposal.to_company_id == proposal.from_company_id) &
-                        (DealProposal.from_service_id == proposal.to_service_id) &
-                        (DealProposal.to_service_id == proposal.from_service_id)
-                    )
-                )
-            ).all()
-            for p in related:
-                db.session.delete(p)
-            
-            # Additionally remove any other matched/pending proposals between the same companies (any services)
-            related_company = DealProposal.query.filter(
-                DealProposal.status.in_(['matched', 'pending']),
-                DealProposal.proposal_id != proposal_id,
-                (
-                    (
-                        (DealProposal.from_company_id == proposal.from_company_id) &
-                        (DealProposal.to_company_id == proposal.to_company_id)
-                    ) |
-                    (
-                        (DealProposal.from_company_id == proposal.to_company_id) &
-                        (DealProposal.to_company_id == proposal.from_company_id)
-                    )
-                )
-            ).all()
-            for p in related_company:
-                db.session.delete(p)
-            
-            db.session.commit()
+            result = accept_proposal(proposal_id)
+            if not result.accepted:
+                flash('This offer has already been processed.', 'warning')
+                return redirect(url_for('main.tradeflow_awaiting_signature', company_id=company_id))
 
             flash('Deal accepted! Now active.', 'success')
             return redirect(url_for('main.tradeflow_ongoing_deals', company_id=company_id))
 
         elif action == 'decline':
+            if proposal.status != 'pending':
+                flash('This offer has already been processed.', 'warning')
+                return redirect(url_for('main.tradeflow_awaiting_signature', company_id=company_id))
+
             proposal.status = 'rejected'
+            record_offer_decision(proposal, accepted=False)
             db.session.commit()
 
             flash('Offer declined.', 'info')
             return redirect(url_for('main.tradeflow_awaiting_signature', company_id=company_id))
 
-    # Parse optional money info from message prefix like [MONEY:receive:100]
-    proposal.money_type = None
-    proposal.money_amount = None
-    try:
-        if proposal.message and proposal.message.startswith('[MONEY:'):
-            end_idx = proposal.message.find(']')
-            if end_idx != -1:
-                tag = proposal.message[7:end_idx]  # inside MONEY:
-                parts = tag.split(':')
-                if len(parts) == 2 and parts[0] in ('receive', 'give'):
-                    proposal.money_type = parts[0]
-                    proposal.money_amount = _parse_int(parts[1], 0)
-                    # Strip the tag from the visible message
-                    proposal.message = proposal.message[end_idx+1:].strip()
-    except Exception:
-        pass
-
     # Compute fairness from the current viewer's perspective (they receive to_service, give from_service)
     fairness_data = compute_fairness(proposal.to_service, proposal.from_service)
 
@@ -680,9 +601,8 @@ def tradeflow_counter_offer(company_id, proposal_id):
     fairness_data = compute_fairness(proposal.to_service, proposal.from_service)
     
     if request.method == 'POST':
-        message = request.form.get('message', '')
-        money_amount = _parse_int(request.form.get('money_amount'), 0)
-        money_type = request.form.get('money_type') if request.form.get('money_type') in ('receive', 'give') else None
+        message = request.form.get('message', '').strip()
+        money_direction, money_amount = _money_terms(request.form)
 
         # Create counter offer - swap the direction
         # Original: from_company sends to to_company
@@ -692,13 +612,6 @@ def tradeflow_counter_offer(company_id, proposal_id):
         new_from_service_id = proposal.to_service_id
         new_to_service_id = proposal.from_service_id
 
-        # Persist money info inside message
-        money_prefix = ''
-        if money_type and money_amount and money_amount > 0:
-            money_prefix = f"[MONEY:{money_type}:{money_amount}] "
-
-        full_message = (money_prefix + message).strip()
-
         # Create new counter proposal
         counter_proposal = DealProposal(
             proposal_id=uuid.uuid4(),
@@ -707,13 +620,20 @@ def tradeflow_counter_offer(company_id, proposal_id):
             from_service_id=new_from_service_id,
             to_service_id=new_to_service_id,
             status='pending',
-            message=full_message if full_message else None,
+            message=message or None,
+            money_direction=money_direction,
+            money_amount=money_amount,
             created_at=datetime.datetime.now(datetime.timezone.utc)
         )
         db.session.add(counter_proposal)
         
         # Delete the original proposal
         db.session.delete(proposal)
+        bump_tradeflow_counters(
+            [(new_to_company_id, 'awaiting_signature'), (new_from_company_id, 'awaiting_other_party')],
+            items=dict.fromkeys(('awaiting_signature', 'awaiting_other_party'), ('offer', counter_proposal.proposal_id)),
+        )
+        count_transition('offer_sent')
         db.session.commit()
 
         flash('Counter offer sent! Waiting for the other party to respond.', 'success')
@@ -747,6 +667,7 @@ def tradeflow_cancel_deal(company_id, proposal_id):
 
 
 @main.route('/tradeflow/<uuid:company_id>/awaiting-other-party', methods=['GET'])
+@read_replica
 def tradeflow_awaiting_other_party(company_id):
     """View offers sent by this company awaiting other party's response"""
     if (resp := _require_login()):
@@ -762,27 +683,14 @@ def tradeflow_awaiting_other_party(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    awaiting_other_party = DealProposal.query.filter_by(
+    awaiting_other_party = DealProposal.query.options(
+        joinedload(DealProposal.from_service).joinedload(Service.company),
+        joinedload(DealProposal.to_service).joinedload(Service.company),
+    ).filter_by(
         from_company_id=company_id,
         status='pending'
     ).all()
 
-    # Parse money tags for overview cards
-    for offer in awaiting_other_party:
-        offer.money_type = None
-        offer.money_amount = None
-        try:
-            if offer.message and offer.message.startswith('[MONEY:'):
-                end_idx = offer.message.find(']')
-                if end_idx != -1:
-                    tag = offer.message[7:end_idx]
-                    parts = tag.split(':')
-                    if len(parts) == 2 and parts[0] in ('receive', 'give'):
-                        offer.money_type = parts[0]
-                        offer.money_amount = _parse_int(parts[1], 0)
-        except Exception:
-            pass
-
     return render_template('tradeflow_awaiting_other_party.html', company=company, awaiting_other_party=awaiting_other_party, unread_counts=unread_counts, user_companies=user_companies)
 
 
@@ -801,22 +709,6 @@ def tradeflow_awaiting_other_party_detail(company_id, proposal_id):
         flash('Access denied', 'error')
         return redirect(url_for('main.my_companies'))
 
-    # Parse optional money info from message prefix like [MONEY:receive:100]
-    proposal.money_type = None
-    proposal.money_amount = None
-    try:
-        if proposal.message and proposal.message.startswith('[MONEY:'):
-            end_idx = proposal.message.find(']')
-            if end_idx != -1:
-                tag = proposal.message[7:end_idx]
-                parts = tag.split(':')
-                if len(parts) == 2 and parts[0] in ('receive', 'give'):
-                    proposal.money_type = parts[0]
-                    proposal.money_amount = _parse_int(parts[1], 0)
-                    proposal.message = proposal.message[end_idx+1:].strip()
-    except Exception:
-        pass
-
     # Swap services for FROM company perspective: you offer from_service and want to_service
     fairness_data = compute_fairness(proposal.to_service, proposal.from_service)
 
@@ -824,6 +716,7 @@ def tradeflow_awaiting_other_party_detail(company_id, proposal_id):
 
 
 @main.route('/tradeflow/<uuid:company_id>/ongoing-deals', methods=['GET'])
+@read_replica
 def tradeflow_ongoing_deals(company_id):
     """View ongoing deals for this company"""
     if (resp := _require_login()):
@@ -839,7 +732,10 @@ def tradeflow_ongoing_deals(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    ongoing_deals = ActiveDeal.query.join(DealProposal).filter(
+    ongoing_deals = ActiveDeal.query.join(DealProposal).options(
+        contains_eager(ActiveDeal.proposal).joinedload(DealProposal.from_service).joinedload(Service.company),
+        contains_eager(ActiveDeal.proposal).joinedload(DealProposal.to_service).joinedload(Service.company),
+    ).filter(
         ((DealProposal.from_company_id == company_id) | (DealProposal.to_company_id == company_id)),
         ActiveDeal.status == 'in_progress'
     ).all()
@@ -862,6 +758,10 @@ def tradeflow_ongoing_deal_detail(company_id, deal_id):
         return resp
 
     if request.method == 'POST':
+        if active_deal.status == 'completed':
+            # Repeat submit; counters and stats were already updated when it completed
+            return redirect(url_for('main.tradeflow_completed_deals', company_id=company_id))
+
         if proposal.from_company_id == company_id:
             active_deal.to_company_completed = True
         else:
@@ -870,6 +770,11 @@ def tradeflow_ongoing_deal_detail(company_id, deal_id):
         if active_deal.from_company_completed and active_deal.to_company_completed:
             active_deal.status = 'completed'
             active_deal.completed_at = datetime.datetime.now(datetime.timezone.utc)
+            bump_tradeflow_counters(
+                [(proposal.from_company_id, 'completed'), (proposal.to_company_id, 'completed')],
+                items={'completed': ('deal', active_deal.active_deal_id)},
+            )
+            record_completion(proposal, active_deal)
             db.session.commit()
             flash('Deal completed! Both parties have confirmed delivery.', 'success')
             return redirect(url_for('main.tradeflow_completed_deals', company_id=company_id))
@@ -923,7 +828,33 @@ def tradeflow_switch_company(new_company_id):
         return redirect(url_for('main.tradeflow_incoming_requests', company_id=new_company_id))
 
 
+@main.route('/tradeflow/<uuid:company_id>/events', methods=['GET'])
+def tradeflow_events(company_id):
+    """Server-Sent Events stream of sidebar badge deltas for this company"""
+    _, _, resp = _member_or_403(company_id)
+    if resp:
+        return resp
+
+    broker.ensure_listener(current_app._get_current_object())
+    subscription = broker.subscribe(company_id, current_app.config['TRADEFLOW_EVENTS_MAX_STREAMS'])
+    if subscription is None:
+        # Every stream slot on this worker is taken; the page still works without live badges
+        return Response(status=503, headers={'Retry-After': str(FULL_RETRY_SECONDS)})
+    # The stream stays open for minutes; don't pin a pooled DB connection to it
+    db.session.remove()
+
+    response = Response(
+        broker.stream(company_id, subscription),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # The stream unsubscribes when it ends, but a body that never starts must free its slot too
+    response.call_on_close(lambda: broker.unsubscribe(company_id, subscription))
+    return response
+
+
 @main.route('/tradeflow/<uuid:company_id>/completed-deals', methods=['GET'])
+@read_replica
 def tradeflow_completed_deals(company_id):
     """View completed deals for this company"""
     if (resp := _require_login()):
@@ -939,7 +870,10 @@ def tradeflow_completed_deals(company_id):
     user_id = uuid.UUID(session['user_id'])
     user_companies = _sidebar_companies(user_id, company_id)
 
-    completed_deals = ActiveDeal.query.join(DealProposal).filter(
+    completed_deals = ActiveDeal.query.join(DealProposal).options(
+        contains_eager(ActiveDeal.proposal).joinedload(DealProposal.from_service).joinedload(Service.company),
+        contains_eager(ActiveDeal.proposal).joinedload(DealProposal.to_service).joinedload(Service.company),
+    ).filter(
         ((DealProposal.from_company_id == company_id) | (DealProposal.to_company_id == company_id)),
         ActiveDeal.status == 'completed'
     ).all()
@@ -997,9 +931,10 @@ def tradeflow_write_review(company_id, deal_id):
         reviewed_company_id = proposal.from_company_id
         reviewed_service_id = proposal.to_service_id
 
+    reviewer_id = uuid.UUID(session['user_id'])
     existing_review = Review.query.filter_by(
         deal_id=deal_id,
-        reviewer_id=session['user_id'],
+        reviewer_id=reviewer_id,
         reviewed_service_id=reviewed_service_id
     ).first()
 
@@ -1010,7 +945,7 @@ def tradeflow_write_review(company_id, deal_id):
         review = Review(
             review_id=uuid.uuid4(),
             deal_id=deal_id,
-            reviewer_id=session['user_id'],
+            reviewer_id=reviewer_id,
             rating=rating,
             comment=comment,
             reviewed_company_id=reviewed_company_id,
@@ -1019,6 +954,7 @@ def tradeflow_write_review(company_id, deal_id):
         )
 
         db.session.add(review)
+        record_review(review)
         db.session.commit()
 
         flash('Review submitted!', 'success')
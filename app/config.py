@@ -1,5 +1,19 @@
+import os
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
 class Config:
     SECRET_KEY = 'your_secret_key'
+
+    # 'production' under gunicorn (see gunicorn.conf.py); startup refuses debug mode there.
+    APP_ENV = os.environ.get('APP_ENV', 'development')
+    # Start the sweeper/EXPLAIN threads in create_app(). A preloading gunicorn master sets this
+    # to 0 and starts them in each worker instead, since threads don't survive fork.
+    START_BACKGROUND_THREADS = os.environ.get('START_BACKGROUND_THREADS', '1') != '0'
     
     SQLALCHEMY_DATABASE_URI = (
         'postgresql://postgres.flijuodhzqnqvabpgqpj:Barter.com123%21'
@@ -8,5 +22,61 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine/pool profile (see app/db_engine.py): dev, gunicorn or pgbouncer.
+    # The DB_* values below override the profile when set in the environment.
+    DB_PROFILE = os.environ.get('DB_PROFILE', 'dev')
+    DB_WORKER_THREADS = _env_int('GUNICORN_THREADS') or 8
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE')
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW')
+    DB_STATEMENT_TIMEOUT_MS = _env_int('DB_STATEMENT_TIMEOUT_MS')
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS = _env_int('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS')
+
+    # Read replica for GET routes marked @read_replica (see app/db_routing.py); unset = primary only.
+    # After a write the user reads from the primary for READ_REPLICA_PIN_SECONDS.
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    READ_REPLICA_PIN_SECONDS = 10
+    READ_REPLICA_ENDPOINTS = ()  # extra endpoints to route, e.g. 'main.view_company'
+    READ_REPLICA_DISABLED_ENDPOINTS = ()  # marked endpoints to keep on the primary
+
+    # Live tradeflow badges: fan events out to all workers through Postgres LISTEN/NOTIFY.
+    # Needs a session-mode connection (port 5432); set False for a single-process dev server.
+    TRADEFLOW_EVENTS_NOTIFY = True
+    TRADEFLOW_EVENTS_CHANNEL = 'tradeflow_events'
+    # Open streams per worker process, each holding a thread; unset = half of DB_WORKER_THREADS
+    TRADEFLOW_EVENTS_MAX_STREAMS = _env_int('TRADEFLOW_EVENTS_MAX_STREAMS')
+    # Membership cache invalidations ride the same LISTEN connection. Without NOTIFY every
+    # check reads through to the database, unless this is the only process serving the app.
+    MEMBERSHIP_EVENTS_CHANNEL = 'membership_events'
+    MEMBERSHIP_CACHE_SINGLE_PROCESS = False
+
+    # Expire trade requests / purge stale matches every N seconds in-process.
+    # 0 = off; run `flask --app run sweeper run` from cron instead.
+    SWEEPER_INTERVAL_SECONDS = 0
+
+    # Per-request db/template/app timings in a Server-Timing header (see app/request_timing.py).
+    # The JSON access log line on the 'app.access' logger is written either way.
+    SERVER_TIMING_HEADER = True
+
+    # Log statements slower than SLOW_QUERY_MS (0 = off) on 'app.slow_query' (see app/slow_queries.py).
+    # SLOW_QUERY_EXPLAIN_SAMPLE > 0 re-runs that fraction of slow SELECTs under EXPLAIN ANALYZE
+    # into a rotating plan file; keep it at 0 unless you are hunting a specific regression.
+    SLOW_QUERY_MS = 250
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.environ.get('SLOW_QUERY_EXPLAIN_SAMPLE', 0))
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = 600
+    SLOW_QUERY_EXPLAIN_FILE = os.environ.get('SLOW_QUERY_EXPLAIN_FILE')
+
+    # Prometheus metrics at /metrics (see app/metrics.py). With METRICS_TOKEN set, scrapers must
+    # send `Authorization: Bearer <token>`. Multiple workers need PROMETHEUS_MULTIPROC_DIR.
+    METRICS_ENABLED = True
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Password hashing policy (werkzeug method string). Changing it upgrades each stored hash
+    # on that user's next login. Hashes run on a per-process pool of PASSWORD_HASH_WORKERS
+    # threads with at most PASSWORD_HASH_MAX_PENDING waiting; more than that gets a 503.
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 16
+    PASSWORD_HASH_TIMEOUT_SECONDS = 10
+
     #de %21 is voor het ! teken in de wachtwoord
     #code supabase = Barter.com123!
@@ -0,0 +1,177 @@
+"""
+Engine and connection-pool profiles, selected with DB_PROFILE.
+
+- dev: the threaded development server; small pool, generous timeouts.
+- gunicorn: threaded gunicorn workers on a session-mode pooler (Supabase port 5432); one
+  pooled connection per worker thread plus a little headroom, fail fast when exhausted.
+- pgbouncer: transaction-mode pooling (Supabase port 6543). Session state doesn't survive a
+  transaction there, so timeouts are set with SET LOCAL per transaction and server-side
+  prepared statements are turned off. LISTEN needs a session, so keep
+  TRADEFLOW_EVENTS_NOTIFY off (membership checks then read through on every request) or point
+  the app at a session-mode port.
+
+Every profile pre-pings and recycles connections (the pooler drops idle ones) and bounds
+statement and idle-in-transaction time on the server. DB_POOL_SIZE, DB_MAX_OVERFLOW and the
+DB_*_TIMEOUT_MS settings override a profile; explicit SQLALCHEMY_ENGINE_OPTIONS win over both.
+SQLALCHEMY_REPLICA_URI, when set, becomes the 'replica' bind with the same options.
+"""
+import bisect
+import threading
+import time
+import weakref
+from typing import Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from .db_routing import REPLICA_BIND_KEY
+from .models import db
+
+# Upper bounds (ms) of the checkout wait histogram buckets; one more bucket holds anything slower
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+PROFILES = {
+    'dev': {
+        'pool_size': 5, 'max_overflow': 5, 'pool_timeout': 30, 'pool_recycle': 1800,
+        'statement_timeout_ms': 30000, 'idle_in_transaction_timeout_ms': 60000,
+    },
+    'gunicorn': {
+        'pool_size': None, 'max_overflow': 2, 'pool_timeout': 10, 'pool_recycle': 1800,
+        'statement_timeout_ms': 15000, 'idle_in_transaction_timeout_ms': 30000,
+    },
+    'pgbouncer': {
+        'pool_size': None, 'max_overflow': 4, 'pool_timeout': 10, 'pool_recycle': 300,
+        'statement_timeout_ms': 15000, 'idle_in_transaction_timeout_ms': 30000,
+        'transaction_pooling': True,
+    },
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'checkouts': 0,
+    'checkout_timeouts': 0,
+    'overflow_opened': 0,
+    'checkout_wait_ms_total': 0.0,
+    'checkout_wait_ms_max': 0.0,
+    'checkout_wait_ms_buckets': [0] * (len(WAIT_BUCKETS_MS) + 1),
+}
+_pools: 'weakref.WeakSet[MeteredQueuePool]' = weakref.WeakSet()
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and when they open overflow connections."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with _stats_lock:
+                _stats['checkout_timeouts'] += 1
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        with _stats_lock:
+            _stats['checkouts'] += 1
+            _stats['checkout_wait_ms_total'] += wait_ms
+            _stats['checkout_wait_ms_max'] = max(_stats['checkout_wait_ms_max'], wait_ms)
+            _stats['checkout_wait_ms_buckets'][bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            if self._overflow > max(overflow_before, 0):
+                _stats['overflow_opened'] += 1
+        return conn
+
+
+def pool_stats() -> Dict:
+    """Snapshot of this process's pool counters plus current pool occupancy."""
+    with _stats_lock:
+        snapshot = dict(_stats)
+        snapshot['checkout_wait_ms_buckets'] = list(snapshot['checkout_wait_ms_buckets'])
+    pools = list(_pools)
+    snapshot['pool_size'] = sum(pool.size() for pool in pools)
+    snapshot['checked_out'] = sum(pool.checkedout() for pool in pools)
+    snapshot['overflow'] = sum(max(pool.overflow(), 0) for pool in pools)
+    return snapshot
+
+
+def _profile_settings(app) -> Dict:
+    name = app.config.get('DB_PROFILE') or 'dev'
+    if name not in PROFILES:
+        raise RuntimeError(f"Unknown DB_PROFILE {name!r}; expected one of {', '.join(PROFILES)}")
+    settings = dict(PROFILES[name])
+    if settings['pool_size'] is None:
+        # Each worker thread holds at most one session; +2 for the sweeper and request bursts
+        settings['pool_size'] = int(app.config.get('DB_WORKER_THREADS') or 8) + 2
+    for key, option in (
+        ('pool_size', 'DB_POOL_SIZE'),
+        ('max_overflow', 'DB_MAX_OVERFLOW'),
+        ('statement_timeout_ms', 'DB_STATEMENT_TIMEOUT_MS'),
+        ('idle_in_transaction_timeout_ms', 'DB_IDLE_IN_TRANSACTION_TIMEOUT_MS'),
+    ):
+        if app.config.get(option) is not None:
+            settings[key] = int(app.config[option])
+    return settings
+
+
+def _timeout_sql(settings: Dict, local: bool) -> str:
+    scope = 'SET LOCAL' if local else 'SET'
+    return (
+        f"{scope} statement_timeout = {int(settings['statement_timeout_ms'])}; "
+        f"{scope} idle_in_transaction_session_timeout = {int(settings['idle_in_transaction_timeout_ms'])}"
+    )
+
+
+def configure_engine(app) -> None:
+    """Fill SQLALCHEMY_ENGINE_OPTIONS from the selected profile; call before db.init_app()."""
+    settings = _profile_settings(app)
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': True, 'pool_recycle': settings['pool_recycle']}
+    if not url.get_backend_name().startswith('sqlite') or url.database not in (None, '', ':memory:'):
+        options.update(
+            poolclass=MeteredQueuePool,
+            pool_size=settings['pool_size'],
+            max_overflow=settings['max_overflow'],
+            pool_timeout=settings['pool_timeout'],
+        )
+    if settings.get('transaction_pooling') and url.get_driver_name() == 'psycopg':
+        # psycopg 3 prepares repeated statements server-side, which transaction pooling breaks
+        options['connect_args'] = {'prepare_threshold': None}
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    if app.config.get('SQLALCHEMY_REPLICA_URI'):
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(REPLICA_BIND_KEY, {**options, 'url': app.config['SQLALCHEMY_REPLICA_URI']})
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['db_engine_profile'] = settings
+
+
+def init_engine_events(app) -> None:
+    """Install the per-connection (or per-transaction) server timeouts; call after db.init_app()."""
+    settings = app.extensions['db_engine_profile']
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'postgresql':
+            _install_timeouts(engine, settings)
+
+
+def _install_timeouts(engine, settings: Dict) -> None:
+    if settings.get('transaction_pooling'):
+        sql = _timeout_sql(settings, local=True)
+
+        @event.listens_for(engine, 'begin')
+        def _set_transaction_timeouts(conn):
+            conn.exec_driver_sql(sql)
+    else:
+        sql = _timeout_sql(settings, local=False)
+
+        @event.listens_for(engine, 'connect')
+        def _set_session_timeouts(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(sql)
+            cursor.close()
+            dbapi_connection.commit()  # a rolled-back SET would be undone on first checkin
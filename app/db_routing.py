@@ -0,0 +1,95 @@
+"""
+Read-replica routing with read-your-writes pinning.
+
+With SQLALCHEMY_REPLICA_URI set, GET requests to routes marked @read_replica (or listed in
+READ_REPLICA_ENDPOINTS) run their reads on the 'replica' bind; everything else, and every
+write, goes to the primary. A request that writes pins its user to the primary for
+READ_REPLICA_PIN_SECONDS (a timestamp in the signed session cookie, so it holds across
+workers), long enough for replication to catch up before they read their own change back.
+
+Bookkeeping that must read fresh data or write without pinning the user (section-viewed
+markers, view counters, authorization lookups) runs inside `with primary():`.
+
+To try it locally, run two Postgres instances with streaming replication and point
+SQLALCHEMY_DATABASE_URI and DATABASE_REPLICA_URL at them.
+"""
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND_KEY = 'replica'
+_ROUTING_KEY = 'db_routing'  # session.info: 'replica' or 'primary' for this request
+_WROTE_KEY = 'db_routing_wrote'  # session.info: a pinning write happened; stay on the primary
+_PRIMARY_DEPTH_KEY = 'db_routing_primary_depth'  # session.info: nesting of primary() blocks
+_PIN_KEY = '_primary_until'  # flask session: epoch seconds until which reads stay on the primary
+
+
+def _is_write(clause) -> bool:
+    return bool(getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None)
+
+
+class RoutingSession(Session):
+    """Session that sends a routed request's reads to the replica bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        routing = self.info.get(_ROUTING_KEY)
+        if bind is None and routing is not None:
+            primary_only = self.info.get(_PRIMARY_DEPTH_KEY)
+            if self._flushing or _is_write(clause):
+                if not primary_only:
+                    self.info[_WROTE_KEY] = True
+            elif routing == 'replica' and not primary_only and not self.info.get(_WROTE_KEY):
+                replica = self._db.engines.get(REPLICA_BIND_KEY)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(view):
+    """Mark a view as safe to serve from the replica (GET/HEAD only, unless the user is pinned)."""
+    view.read_replica = True
+    return view
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside the block; writes in it don't pin the user."""
+    db_session = current_app.extensions['sqlalchemy'].session()
+    db_session.info[_PRIMARY_DEPTH_KEY] = db_session.info.get(_PRIMARY_DEPTH_KEY, 0) + 1
+    try:
+        yield
+    finally:
+        db_session.info[_PRIMARY_DEPTH_KEY] -= 1
+
+
+def _route_request() -> None:
+    app = current_app
+    view = app.view_functions.get(request.endpoint)
+    routed = (
+        request.method in ('GET', 'HEAD')
+        and (getattr(view, 'read_replica', False) or request.endpoint in app.config['READ_REPLICA_ENDPOINTS'])
+        and request.endpoint not in app.config['READ_REPLICA_DISABLED_ENDPOINTS']
+        and session.get(_PIN_KEY, 0) <= time.time()
+    )
+    app.extensions['sqlalchemy'].session().info[_ROUTING_KEY] = 'replica' if routed else 'primary'
+
+
+def _pin_after_write(db_session) -> None:
+    if db_session.info.get(_WROTE_KEY) and has_request_context():
+        session[_PIN_KEY] = time.time() + current_app.config['READ_REPLICA_PIN_SECONDS']
+
+
+def init_read_replica(app) -> None:
+    """Route marked requests once a replica bind is configured (see db_engine.configure_engine)."""
+    app.config.setdefault('READ_REPLICA_PIN_SECONDS', 10)
+    app.config.setdefault('READ_REPLICA_ENDPOINTS', ())
+    app.config.setdefault('READ_REPLICA_DISABLED_ENDPOINTS', ())
+    if REPLICA_BIND_KEY not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    app.before_request(_route_request)
+    scoped = app.extensions['sqlalchemy'].session
+    if not event.contains(scoped, 'after_commit', _pin_after_write):
+        event.listen(scoped, 'after_commit', _pin_after_write)
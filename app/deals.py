@@ -0,0 +1,137 @@
+"""
+Deal acceptance (the one place a proposal turns into an ActiveDeal) and deal money totals.
+
+Every route that accepts a proposal goes through accept_proposal(). It row-locks the proposal
+together with the open proposals it will supersede, so two people accepting conflicting
+offers at the same moment end with exactly one deal; the loser sees ALREADY_PROCESSED.
+"""
+import datetime
+import uuid
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func
+
+from .models import ActiveDeal, DealProposal, db
+from .trade_stats import record_offer_decision
+
+OPEN_STATUSES = ('matched', 'pending')
+
+
+class AcceptOutcome(Enum):
+    ACCEPTED = 'accepted'
+    NOT_FOUND = 'not_found'  # gone, e.g. superseded by a concurrent accept
+    ALREADY_PROCESSED = 'already_processed'  # no longer in an acceptable status
+
+
+class SupersedeScope(Enum):
+    """Which other open proposals an accepted deal removes."""
+    SERVICE_PAIR = 'service_pair'  # same two services, either direction
+    COMPANY_PAIR = 'company_pair'  # anything open between the same two companies
+
+
+@dataclass(frozen=True)
+class AcceptResult:
+    outcome: AcceptOutcome
+    proposal: Optional[DealProposal] = None
+    active_deal: Optional[ActiveDeal] = None
+    superseded: int = 0
+
+    @property
+    def accepted(self) -> bool:
+        return self.outcome is AcceptOutcome.ACCEPTED
+
+
+def accept_proposal(
+    proposal_id,
+    expected_statuses: Iterable[str] = ('pending',),
+    scope: SupersedeScope = SupersedeScope.COMPANY_PAIR,
+    message: Optional[str] = None,
+) -> AcceptResult:
+    """Accept a proposal, create its ActiveDeal and delete superseded proposals in one transaction.
+
+    Authorisation is the caller's job. `message`, when given, replaces the proposal message.
+    Commits on success and rolls back otherwise.
+    """
+    from .blueprints.helpers import bump_tradeflow_counters
+
+    proposal_id = uuid.UUID(str(proposal_id))
+    target = db.session.get(DealProposal, proposal_id)
+    if target is None:
+        return AcceptResult(AcceptOutcome.NOT_FOUND)
+
+    if scope is SupersedeScope.SERVICE_PAIR:
+        group_filter = DealProposal.pair_key == target.pair_key
+    else:
+        group_filter = DealProposal.company_pair_key == target.company_pair_key
+
+    # Lock the target and everything it would supersede, in key order so concurrent accepts can't deadlock
+    locked = (
+        DealProposal.query
+        .filter(db.or_(
+            DealProposal.proposal_id == proposal_id,
+            db.and_(group_filter, DealProposal.status.in_(OPEN_STATUSES)),
+        ))
+        .order_by(DealProposal.proposal_id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    proposal = next((p for p in locked if p.proposal_id == proposal_id), None)
+    if proposal is None:
+        db.session.rollback()
+        return AcceptResult(AcceptOutcome.NOT_FOUND)
+    if proposal.status not in expected_statuses:
+        db.session.rollback()
+        return AcceptResult(AcceptOutcome.ALREADY_PROCESSED, proposal=proposal)
+
+    proposal.status = 'accepted'
+    if message is not None:
+        proposal.message = message
+    active_deal = ActiveDeal(
+        active_deal_id=uuid.uuid4(),
+        proposal_id=proposal_id,
+        from_company_completed=False,
+        to_company_completed=False,
+        status='in_progress',
+        created_at=datetime.datetime.now(datetime.timezone.utc),
+    )
+    db.session.add(active_deal)
+
+    superseded = db.session.execute(
+        delete(DealProposal)
+        .where(
+            group_filter,
+            DealProposal.status.in_(OPEN_STATUSES),
+            DealProposal.proposal_id != proposal_id,
+        )
+        .execution_options(synchronize_session='fetch')
+    ).rowcount
+
+    bump_tradeflow_counters(
+        [(proposal.from_company_id, 'ongoing'), (proposal.to_company_id, 'ongoing')],
+        items={'ongoing': ('deal', active_deal.active_deal_id)},
+    )
+    record_offer_decision(proposal, accepted=True)
+    db.session.commit()
+    return AcceptResult(AcceptOutcome.ACCEPTED, proposal=proposal, active_deal=active_deal, superseded=superseded)
+
+
+def company_money_balance(company_id) -> int:
+    """Net euros a company receives (positive) or pays (negative) across its accepted deals.
+
+    One aggregate over the money partial indexes; money_direction is from the proposer's side.
+    """
+    company_id = uuid.UUID(str(company_id))
+    proposer_gets = db.case(
+        (DealProposal.money_direction == 'receive', DealProposal.money_amount),
+        else_=-DealProposal.money_amount,
+    )
+    signed = db.case((DealProposal.from_company_id == company_id, proposer_gets), else_=-proposer_gets)
+    balance = db.session.query(func.coalesce(func.sum(signed), 0)).filter(
+        DealProposal.status == 'accepted',
+        DealProposal.money_amount.isnot(None),
+        db.or_(DealProposal.from_company_id == company_id, DealProposal.to_company_id == company_id),
+    ).scalar()
+    return int(balance)
@@ -4,8 +4,10 @@ from uuid import UUID, uuid4
 
 from sqlalchemy import func
 
+from .db_routing import primary
+from .metrics import count_view_event
 from .models import (
-    ActiveDeal,
+    CompanyTradeStats,
     DealProposal,
     Review,
     Service,
@@ -111,42 +113,23 @@ def compute_fairness(requested_service: Service, return_service: Service, smooth
         .all()
     }
 
-    # Company-level trust inputs
+    # Company-level trust inputs, from the write-maintained stats table
     company_completed: Dict[UUID, int] = {}
-    completed_rows = (
-        db.session.query(DealProposal.from_company_id.label("company_id"), func.count(ActiveDeal.active_deal_id).label("count"))
-        .join(ActiveDeal, ActiveDeal.proposal_id == DealProposal.proposal_id)
-        .filter(ActiveDeal.status == "completed")
-        .group_by(DealProposal.from_company_id)
-        .all()
-    )
-    for row in completed_rows:
-        company_completed[row.company_id] = company_completed.get(row.company_id, 0) + row.count
-
-    completed_rows_to = (
-        db.session.query(DealProposal.to_company_id.label("company_id"), func.count(ActiveDeal.active_deal_id).label("count"))
-        .join(ActiveDeal, ActiveDeal.proposal_id == DealProposal.proposal_id)
-        .filter(ActiveDeal.status == "completed")
-        .group_by(DealProposal.to_company_id)
+    company_avg_review_mapped: Dict[UUID, float] = {}
+    stats_rows = (
+        db.session.query(CompanyTradeStats.company_id, CompanyTradeStats.deals_completed, CompanyTradeStats.reviews_received, CompanyTradeStats.rating_total)
+        .filter(db.or_(CompanyTradeStats.deals_completed > 0, CompanyTradeStats.reviews_received > 0))
         .all()
     )
-    for row in completed_rows_to:
-        company_completed[row.company_id] = company_completed.get(row.company_id, 0) + row.count
+    for row in stats_rows:
+        if row.deals_completed:
+            company_completed[row.company_id] = row.deals_completed
+        if row.reviews_received:
+            company_avg_review_mapped[row.company_id] = (row.rating_total / row.reviews_received - 3.0) / 2.0
 
     completed_min = min(company_completed.values()) if company_completed else 0
     completed_max = max(company_completed.values()) if company_completed else 0
 
-    company_avg_review_mapped: Dict[UUID, float] = {}
-    company_review_rows = (
-        db.session.query(Service.company_id, func.avg(Review.rating).label("avg_rating"))
-        .join(Review, Review.reviewed_service_id == Service.service_id)
-        .group_by(Service.company_id)
-        .all()
-    )
-    for row in company_review_rows:
-        mapped = (float(row.avg_rating) - 3.0) / 2.0
-        company_avg_review_mapped[row.company_id] = mapped
-
     def _service_svi(service_obj: Service) -> Dict[str, float]:
         meta = service_meta.get(service_obj.service_id, {"duration": 0.0, "company_id": service_obj.company_id})
         effort_norm = _min_max_norm(meta["duration"], effort_min, effort_max, 0.0)
@@ -202,12 +185,15 @@ def compute_fairness(requested_service: Service, return_service: Service, smooth
 def record_service_view(service_id: UUID) -> None:
     """Store a view event for a service detail page."""
     try:
-        event = ServiceViewEvent(
-            view_id=uuid4(),
-            service_id=service_id,
-            viewed_at=datetime.datetime.now(datetime.timezone.utc),
-        )
-        db.session.add(event)
-        db.session.commit()
+        with primary():  # analytics write; doesn't pin the viewer to the primary
+            event = ServiceViewEvent(
+                view_id=uuid4(),
+                service_id=service_id,
+                viewed_at=datetime.datetime.now(datetime.timezone.utc),
+            )
+            db.session.add(event)
+            db.session.commit()
+        count_view_event(stored=True)
     except Exception:
         db.session.rollback()
+        count_view_event(stored=False)
@@ -0,0 +1,170 @@
+"""
+Cross-worker membership cache: {user_id: {company_id: is_admin}} for authorization checks.
+
+Every entry remembers the user's membership_version stamp it was loaded with. Routes that
+change memberships call bump_membership_versions() before their commit; the new stamps reach
+this process from its after_commit hook and every other worker through Postgres NOTIFY on the
+tradeflow LISTEN connection, and an entry older than the newest stamp seen is reloaded. While
+a worker's LISTEN connection is down it cannot hear bumps, so it reads through to the database;
+without NOTIFY it always does, unless MEMBERSHIP_CACHE_SINGLE_PROCESS says no other worker exists.
+"""
+import json
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import event, text, update
+
+from .db_routing import primary
+from .models import CompanyMember, User, db
+from .tradeflow_events import broker, register_listen_channel
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_CACHE_USERS = 10000  # users kept per worker (least recently used are dropped)
+_PENDING_KEY = 'membership_pending_versions'
+
+Roles = Dict[uuid.UUID, bool]
+
+
+def _load_roles(user_id: uuid.UUID) -> Tuple[int, Optional[Roles]]:
+    """(membership_version, roles) read in one statement; roles is None for an unknown user."""
+    with primary():  # authorization never trusts a lagging replica
+        rows = (
+            db.session.query(User.membership_version, CompanyMember.company_id, CompanyMember.is_admin)
+            .outerjoin(CompanyMember, CompanyMember.user_id == User.user_id)
+            .filter(User.user_id == user_id)
+            .all()
+        )
+    if not rows:
+        return -1, None
+    return rows[0].membership_version, {row.company_id: row.is_admin for row in rows if row.company_id}
+
+
+class MembershipCache:
+    """Per-process LRU of role maps, trusted only while version bumps can reach this process."""
+
+    def __init__(self, max_users: int = MEMBERSHIP_CACHE_USERS):
+        self._lock = threading.Lock()
+        self._max_users = max_users
+        self._entries: 'OrderedDict[uuid.UUID, Tuple[int, int, Roles]]' = OrderedDict()  # (generation, version, roles)
+        self._latest: 'OrderedDict[uuid.UUID, int]' = OrderedDict()  # newest stamp announced per user
+        self._generation = 0
+        self._live = False
+        self._hits = 0
+        self._misses = 0
+
+    def roles(self, user_id: uuid.UUID) -> Optional[Roles]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and self._live and entry[0] == self._generation and entry[1] >= self._latest.get(user_id, -1):
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return entry[2]
+            self._misses += 1
+            generation, live = self._generation, self._live
+
+        version, roles = _load_roles(user_id)
+        if roles is not None and live:
+            with self._lock:
+                # A bump or reconnect while we were reading makes this load unsafe to keep
+                if generation == self._generation and version >= self._latest.get(user_id, -1):
+                    self._entries[user_id] = (generation, version, roles)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self._max_users:
+                        self._entries.popitem(last=False)
+        return roles
+
+    def saw_version(self, user_id: uuid.UUID, version: int) -> None:
+        with self._lock:
+            if version > self._latest.get(user_id, -1):
+                self._latest[user_id] = version
+            self._latest.move_to_end(user_id)
+            while len(self._latest) > self._max_users:
+                self._latest.popitem(last=False)
+            entry = self._entries.get(user_id)
+            if entry and entry[1] < version:
+                del self._entries[user_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'users': len(self._entries)}
+
+    # LISTEN channel handler interface (see tradeflow_events.register_listen_channel)
+    def notify(self, payload: str) -> None:
+        try:
+            for item in json.loads(payload):
+                self.saw_version(uuid.UUID(item['user_id']), int(item['version']))
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed membership notification: %r', payload)
+
+    def reset(self, live: bool) -> None:
+        """Forget everything: bumps may have been missed while nobody was listening."""
+        with self._lock:
+            self._generation += 1
+            self._live = live
+            self._entries.clear()
+            self._latest.clear()
+
+
+membership_cache = MembershipCache()
+
+
+def cached_roles(user_id) -> Optional[Roles]:
+    """{company_id: is_admin} for a user (None if the user doesn't exist), usually without a query."""
+    app = current_app._get_current_object()
+    broker.ensure_listener(app)
+    return membership_cache.roles(uuid.UUID(str(user_id)))
+
+
+def bump_membership_versions(user_ids: Iterable) -> None:
+    """Advance the users' membership stamps; call before committing a membership change."""
+    user_ids = sorted({uuid.UUID(str(user_id)) for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+    rows = db.session.execute(
+        update(User)
+        .where(User.user_id.in_(user_ids))
+        .values(membership_version=User.membership_version + 1, updated_at=User.updated_at)
+        .returning(User.user_id, User.membership_version)
+        .execution_options(synchronize_session=False)
+    ).all()
+    payload = [{'user_id': str(user_id), 'version': version} for user_id, version in rows]
+    if not payload:
+        return
+
+    # Applied here after commit too, so this worker never serves its own stale entry
+    db.session.info.setdefault(_PENDING_KEY, []).extend(payload)
+    if current_app.config.get('TRADEFLOW_EVENTS_NOTIFY'):
+        db.session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {'channel': current_app.config['MEMBERSHIP_EVENTS_CHANNEL'], 'payload': json.dumps(payload)},
+        )
+
+
+def _apply_pending(session) -> None:
+    for item in session.info.pop(_PENDING_KEY, []):
+        membership_cache.saw_version(uuid.UUID(item['user_id']), item['version'])
+
+
+def _drop_pending(session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def init_membership_cache(app) -> None:
+    """Wire bumps into the session lifecycle and, with NOTIFY, onto the worker's LISTEN thread."""
+    app.config.setdefault('MEMBERSHIP_EVENTS_CHANNEL', 'membership_events')
+    app.config.setdefault('MEMBERSHIP_CACHE_SINGLE_PROCESS', False)
+    if app.config.get('TRADEFLOW_EVENTS_NOTIFY'):
+        register_listen_channel(app.config['MEMBERSHIP_EVENTS_CHANNEL'], membership_cache)
+    else:
+        # Bumps committed by other workers never reach this one, so only a lone process
+        # (where after_commit delivery sees every bump) may keep entries
+        membership_cache.reset(live=app.config['MEMBERSHIP_CACHE_SINGLE_PROCESS'])
+    if not event.contains(db.session, 'after_commit', _apply_pending):
+        event.listen(db.session, 'after_commit', _apply_pending)
+        event.listen(db.session, 'after_soft_rollback', _drop_pending)
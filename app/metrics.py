@@ -0,0 +1,198 @@
+"""
+Prometheus metrics, served at /metrics in the text exposition format.
+
+Request metrics are observed as each request finishes. Everything else (pool, password
+hashing, slow queries, sweeper, membership cache, SSE streams) lives in the owning
+module's own stats snapshot; sync_process_metrics() copies those into Prometheus at the
+end of each request and before a scrape, adding counter deltas and setting gauges.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to an empty directory before the workers
+start (see gunicorn.conf.py). Each worker then writes its samples there, and /metrics
+aggregates every worker, whichever one answers the scrape. Set METRICS_TOKEN to require
+`Authorization: Bearer <token>` on the endpoint.
+"""
+import hmac
+import os
+import threading
+
+from flask import Response, abort, current_app, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+from .db_engine import pool_stats
+from .membership_cache import membership_cache
+from .models import db
+from .passwords import password_hashing_stats
+from .request_timing import current_timing
+from .slow_queries import slow_query_stats
+from .sweeper import sweeper_stats
+from .tradeflow_events import broker
+
+_PENDING_KEY = 'metrics_pending_transitions'
+
+REQUEST_LATENCY = Histogram(
+    'barter_http_request_duration_seconds', 'Request latency by endpoint.', ['endpoint', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter('barter_http_requests', 'Finished requests by endpoint and status.', ['endpoint', 'method', 'status'])
+REQUEST_QUERIES = Histogram(
+    'barter_http_request_queries', 'SQL statements per request.', ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_TIME = Histogram(
+    'barter_http_request_db_seconds', 'SQL time per request.', ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+POOL_SIZE = Gauge('barter_db_pool_size', 'Configured pool connections.', multiprocess_mode='livesum')
+POOL_IN_USE = Gauge('barter_db_pool_checked_out', 'Connections checked out of the pool.', multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('barter_db_pool_overflow', 'Overflow connections open beyond pool_size.', multiprocess_mode='livesum')
+POOL_CHECKOUTS = Counter('barter_db_pool_checkouts', 'Pool checkouts.')
+POOL_WAIT = Counter('barter_db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled connection.')
+POOL_OVERFLOW_OPENED = Counter('barter_db_pool_overflow_opened', 'Checkouts that opened an overflow connection.')
+POOL_TIMEOUTS = Counter('barter_db_pool_checkout_timeouts', 'Checkouts that gave up waiting.')
+
+SLOW_QUERIES = Counter('barter_db_slow_queries', 'Statements slower than SLOW_QUERY_MS.')
+SLOW_QUERY_EXPLAINS = Counter('barter_db_slow_query_explains', 'Sampled EXPLAIN captures.', ['outcome'])
+
+PASSWORD_HASH_OPS = Counter('barter_password_hash_operations', 'Password hashing work by kind.', ['kind'])
+PASSWORD_HASH_TIME = Counter('barter_password_hash_seconds', 'Time spent hashing on the pool.')
+PASSWORD_HASH_QUEUED = Gauge('barter_password_hash_queued', 'Hashes waiting for a pool thread.', multiprocess_mode='livesum')
+PASSWORD_HASH_RUNNING = Gauge('barter_password_hash_running', 'Hashes running on the pool.', multiprocess_mode='livesum')
+
+CACHE_LOOKUPS = Counter('barter_cache_lookups', 'App cache lookups by result.', ['cache', 'result'])
+SSE_STREAMS = Gauge('barter_tradeflow_streams', 'Open tradeflow event streams.', multiprocess_mode='livesum')
+SSE_STREAMS_REJECTED = Counter('barter_tradeflow_streams_rejected', 'Event streams refused because the worker was full.')
+
+SWEEPER = Counter('barter_sweeper', 'Expiry sweeper activity.', ['kind'])
+VIEW_EVENTS = Counter('barter_service_view_events', 'Service view events ingested.', ['outcome'])
+TRANSITIONS = Counter('barter_tradeflow_transitions', 'Committed tradeflow transitions.', ['transition'])
+
+# (snapshot function, {stats key: (counter, scale)}) pairs synced as counter deltas
+_COUNTER_SOURCES = (
+    (pool_stats, {
+        'checkouts': (POOL_CHECKOUTS, 1),
+        'checkout_wait_ms_total': (POOL_WAIT, 0.001),
+        'overflow_opened': (POOL_OVERFLOW_OPENED, 1),
+        'checkout_timeouts': (POOL_TIMEOUTS, 1),
+    }),
+    (slow_query_stats, {
+        'slow_queries': (SLOW_QUERIES, 1),
+        'explains_captured': (SLOW_QUERY_EXPLAINS.labels('captured'), 1),
+        'explains_failed': (SLOW_QUERY_EXPLAINS.labels('failed'), 1),
+        'explains_dropped': (SLOW_QUERY_EXPLAINS.labels('dropped'), 1),
+    }),
+    (password_hashing_stats, {
+        'hashes': (PASSWORD_HASH_OPS.labels('hash'), 1),
+        'verifications': (PASSWORD_HASH_OPS.labels('verify'), 1),
+        'failed_verifications': (PASSWORD_HASH_OPS.labels('verify_failed'), 1),
+        'rehashes': (PASSWORD_HASH_OPS.labels('rehash'), 1),
+        'rejected': (PASSWORD_HASH_OPS.labels('rejected'), 1),
+        'timeouts': (PASSWORD_HASH_OPS.labels('timeout'), 1),
+        'latency_ms_total': (PASSWORD_HASH_TIME, 0.001),
+    }),
+    (membership_cache.stats, {
+        'hits': (CACHE_LOOKUPS.labels('membership', 'hit'), 1),
+        'misses': (CACHE_LOOKUPS.labels('membership', 'miss'), 1),
+    }),
+    (broker.stats, {
+        'rejected': (SSE_STREAMS_REJECTED, 1),
+    }),
+    (sweeper_stats, {
+        'runs': (SWEEPER.labels('run'), 1),
+        'failures': (SWEEPER.labels('failure'), 1),
+        'requests_archived': (SWEEPER.labels('request_archived'), 1),
+        'matches_purged': (SWEEPER.labels('match_purged'), 1),
+    }),
+)
+
+_sync_lock = threading.Lock()
+_synced = {}  # (source index, key) -> value already added to its counter
+
+
+def sync_process_metrics() -> None:
+    """Copy this process's module stats into the Prometheus metrics."""
+    with _sync_lock:
+        for index, (snapshot, counters) in enumerate(_COUNTER_SOURCES):
+            stats = snapshot()
+            for key, (counter, scale) in counters.items():
+                value = stats.get(key) or 0
+                delta = value - _synced.get((index, key), 0)
+                if delta > 0:
+                    counter.inc(delta * scale)
+                _synced[(index, key)] = value
+
+    pool = pool_stats()
+    POOL_SIZE.set(pool['pool_size'])
+    POOL_IN_USE.set(pool['checked_out'])
+    POOL_OVERFLOW.set(pool['overflow'])
+    hashing = password_hashing_stats()
+    PASSWORD_HASH_QUEUED.set(hashing['queued'])
+    PASSWORD_HASH_RUNNING.set(hashing['running'])
+    SSE_STREAMS.set(broker.stream_count())
+
+
+def count_transition(name: str) -> None:
+    """Count a tradeflow transition once the current transaction commits."""
+    db.session.info.setdefault(_PENDING_KEY, []).append(name)
+
+
+def count_view_event(stored: bool) -> None:
+    VIEW_EVENTS.labels('stored' if stored else 'failed').inc()
+
+
+def _apply_pending(session) -> None:
+    for name in session.info.pop(_PENDING_KEY, []):
+        TRANSITIONS.labels(name).inc()
+
+
+def _drop_pending(session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def _observe_request(response):
+    timing = current_timing()
+    endpoint = request.endpoint or 'unmatched'  # keep 404 paths out of the label set
+    REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    if timing is not None:
+        REQUEST_LATENCY.labels(endpoint, request.method).observe(timing.elapsed())
+        REQUEST_QUERIES.labels(endpoint).observe(timing.queries)
+        REQUEST_DB_TIME.labels(endpoint).observe(timing.sql_ms / 1000)
+    sync_process_metrics()
+    return response
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    sync_process_metrics()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app) -> None:
+    """Serve /metrics and record request and transition metrics (METRICS_ENABLED)."""
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_TOKEN', None)
+    if not app.config['METRICS_ENABLED']:
+        return
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    app.after_request(_observe_request)
+    if not event.contains(db.session, 'after_commit', _apply_pending):
+        event.listen(db.session, 'after_commit', _apply_pending)
+        event.listen(db.session, 'after_soft_rollback', _drop_pending)
@@ -21,12 +21,22 @@
 # Migrations zijn zoals Git voor de database → altijd in volgorde houden.
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy import DateTime, CheckConstraint, Index, text
+from sqlalchemy import DateTime, CheckConstraint, Index, select, text
 from sqlalchemy.sql import func
 from enum import Enum
 
-db = SQLAlchemy()
+from .db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def insert_on_conflict(model):
+    """INSERT supporting on_conflict_do_*() for the primary's dialect (SQLite runs the test suite)."""
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite.insert(model)
+    return postgresql.insert(model)
 
 
 # ==========================
@@ -140,6 +150,9 @@ class User(db.Model):
 
     created_at = db.Column(DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Bumped on every change to this user's company memberships (see app/membership_cache.py)
+    membership_version = db.Column(db.BigInteger, nullable=False, default=0, server_default=text('0'))
     
     # Indexes for performance
     __table_args__ = (
@@ -340,9 +353,49 @@ class ServiceViewEvent(db.Model):
         return f"<ServiceViewEvent service={self.service_id} at={self.viewed_at}>"
 
 
+# ==========================
+# SERVICE CO-REQUEST INDEX
+# ==========================
+class ServiceCoRequest(db.Model):
+    """
+    Precomputed top-K neighbours: "companies that requested X also requested Y".
+    Rebuilt offline (flask --app run recommendations rebuild), only read by the marketplace.
+    """
+    __tablename__ = "service_co_request"
+
+    service_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("service.service_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    neighbor_service_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("service.service_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    score = db.Column(db.Float, nullable=False)  # cosine similarity of the two request sets
+    co_count = db.Column(db.Integer, nullable=False)  # companies that requested both
+    rank = db.Column(db.SmallInteger, nullable=False)  # 1 = best neighbour
+    built_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Primary key (service_id, neighbor_service_id) serves the lookup; neighbour index keeps cascades cheap
+    __table_args__ = (
+        Index('ix_service_co_request_neighbor', 'neighbor_service_id'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ServiceCoRequest {self.service_id} -> {self.neighbor_service_id} score={self.score:.3f}>"
+
+
 # ==========================
 # TRADE REQUEST
 # ==========================
+def _requested_company_default(context):
+    # Owner of the requested service, for inserts that don't pass requested_company_id themselves
+    service_id = context.get_current_parameters()["requested_service_id"]
+    return context.connection.scalar(select(Service.company_id).where(Service.service_id == service_id))
+
+
 class TradeRequest(db.Model):
     """
     A trade request sent by one company expressing interest in another company's service.
@@ -362,6 +415,13 @@ class TradeRequest(db.Model):
         db.ForeignKey("service.service_id", ondelete="CASCADE"),
         nullable=False
     )
+    # Owner of requested_service, copied at insert so incoming lookups don't need the service join
+    requested_company_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("company.company_id", ondelete="CASCADE"),
+        nullable=False,
+        default=_requested_company_default,
+    )
     validity_days = db.Column(db.Integer, nullable=False, default=14)  # 7, 14, 30, 60, 90
     status = db.Column(db.Text, nullable=False, default='active')  # active, archived
     created_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -374,6 +434,12 @@ class TradeRequest(db.Model):
         Index('ix_trade_request_requested_service', 'requested_service_id'),
         Index('ix_trade_request_status', 'status'),
         Index('ix_trade_request_expires_at', 'expires_at'),
+        # Keyset pages of archived requests, one index per side (see _archived_requests_page)
+        Index('ix_trade_request_archived_sent', 'requesting_company_id', 'archived_at', 'request_id',
+              postgresql_where=text("status = 'archived'")),
+        Index('ix_trade_request_archived_received', 'requested_company_id', 'archived_at', 'request_id',
+              postgresql_where=text("status = 'archived'")),
+        Index('ix_trade_request_requested_company_status_created', 'requested_company_id', 'status', 'created_at'),
         # Validity must be one of the allowed values
         CheckConstraint('validity_days IN (7, 14, 30, 60, 90)', name='ck_trade_request_validity_days'),
         # Status must be valid
@@ -382,6 +448,7 @@ class TradeRequest(db.Model):
 
     # Relationships
     requesting_company = db.relationship("Company", foreign_keys=[requesting_company_id], backref="trade_requests_sent")
+    requested_company = db.relationship("Company", foreign_keys=[requested_company_id], backref="trade_requests_received")
     requested_service = db.relationship("Service", backref="trade_requests")
 
     def __repr__(self) -> str:
@@ -391,6 +458,26 @@ class TradeRequest(db.Model):
 # ==========================
 # DEAL PROPOSAL
 # ==========================
+def proposal_pair_key(from_company_id, from_service_id, to_company_id, to_service_id) -> str:
+    """Order-independent key for a (company, service) <-> (company, service) pair; a proposal and its mirror share it."""
+    return "|".join(sorted((f"{from_company_id}:{from_service_id}", f"{to_company_id}:{to_service_id}")))
+
+
+def company_pair_key(company_a_id, company_b_id) -> str:
+    """Order-independent key for the two companies of a proposal."""
+    return "|".join(sorted((str(company_a_id), str(company_b_id))))
+
+
+def _pair_key_default(context):
+    p = context.get_current_parameters()
+    return proposal_pair_key(p["from_company_id"], p["from_service_id"], p["to_company_id"], p["to_service_id"])
+
+
+def _company_pair_key_default(context):
+    p = context.get_current_parameters()
+    return company_pair_key(p["from_company_id"], p["to_company_id"])
+
+
 class DealProposal(db.Model):
     """
     A proposal sent from one company admin to another to trade services.
@@ -422,16 +509,35 @@ class DealProposal(db.Model):
     message = db.Column(db.Text)  # Optional message from proposer
     status = db.Column(db.Text, nullable=False, default='pending')  # pending, accepted, rejected
     created_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Optional money top-up, from the proposer's (from_company) side: 'receive' = they are paid, 'give' = they pay
+    money_direction = db.Column(db.Text, nullable=True)
+    money_amount = db.Column(db.Integer, nullable=True)  # whole euros, > 0
+    # Filled on insert; the mirror-image proposal gets the same keys
+    pair_key = db.Column(db.Text, nullable=False, default=_pair_key_default)
+    company_pair_key = db.Column(db.Text, nullable=False, default=_company_pair_key_default)
 
     # Indexes and constraints
     __table_args__ = (
         Index('ix_deal_proposal_from_company', 'from_company_id'),
         Index('ix_deal_proposal_to_company', 'to_company_id'),
         Index('ix_deal_proposal_status', 'status'),
+        Index('ix_deal_proposal_pair_status', 'pair_key', 'status'),
+        Index('ix_deal_proposal_company_pair_status', 'company_pair_key', 'status'),
+        # Net money balance per company only reads accepted proposals that carry money
+        Index('ix_deal_proposal_money_from', 'from_company_id',
+              postgresql_where=text("money_amount IS NOT NULL AND status = 'accepted'")),
+        Index('ix_deal_proposal_money_to', 'to_company_id',
+              postgresql_where=text("money_amount IS NOT NULL AND status = 'accepted'")),
         # Status must be valid
-        CheckConstraint("status IN ('pending', 'accepted', 'rejected')", name='ck_deal_proposal_status'),
+        CheckConstraint("status IN ('matched', 'pending', 'accepted', 'rejected')", name='ck_deal_proposal_status'),
         # Cannot propose to yourself
         CheckConstraint('from_company_id != to_company_id', name='ck_deal_proposal_different_companies'),
+        # Money terms are set together, with a known direction and a positive amount
+        CheckConstraint(
+            "(money_direction IS NULL AND money_amount IS NULL) OR "
+            "(money_direction IN ('receive', 'give') AND money_amount > 0)",
+            name='ck_deal_proposal_money_terms',
+        ),
     )
 
     # Relationships
@@ -528,7 +634,8 @@ class Review(db.Model):
         Index('ix_review_deal', 'deal_id'),
         Index('ix_review_reviewer', 'reviewer_id'),
         Index('ix_review_reviewed_company', 'reviewed_company_id'),
-        Index('ix_review_reviewed_service', 'reviewed_service_id'),
+        # Serves per-service lookups and newest-first keyset pagination of service reviews
+        Index('ix_review_service_created', 'reviewed_service_id', 'created_at'),
         # Rating must be 1-5
         CheckConstraint('rating >= 1 AND rating <= 5', name='ck_review_rating_range'),
         # NOTE: Unique constraint (deal_id, reviewer_id) removed due to existing duplicate data
@@ -578,6 +685,8 @@ class TradeflowView(db.Model):
     )
     section = db.Column(db.Text, nullable=False)  # 'incoming', 'you_requested', 'archived', 'matches', etc.
     last_viewed_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # TradeflowCounter.seq at the moment of the last view; unread = counter.seq - last_seen_seq
+    last_seen_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default=text('0'))
 
     # Indexes and unique constraint
     __table_args__ = (
@@ -600,5 +709,71 @@ class TradeflowView(db.Model):
         return f"<TradeflowView {self.section} for company {self.company_id} by user {self.user_id}>"
 
 
+# ==========================
+# TRADEFLOW BADGE COUNTERS
+# ==========================
+class TradeflowCounter(db.Model):
+    """
+    Monotonic per-(company, section) event counter, bumped on every tradeflow transition.
+    Sidebar badges compare it with TradeflowView.last_seen_seq instead of counting history.
+    """
+    __tablename__ = "tradeflow_counter"
+
+    company_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("company.company_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    section = db.Column(db.Text, primary_key=True)
+    seq = db.Column(db.BigInteger, nullable=False, default=0, server_default=text('0'))
+    updated_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
+    __table_args__ = (
+        CheckConstraint(
+            "section IN ('incoming', 'you_requested', 'archived', 'matches', 'awaiting_signature', 'awaiting_other_party', 'ongoing', 'completed')",
+            name='ck_tradeflow_counter_section'
+        ),
+    )
 
+    def __repr__(self) -> str:
+        return f"<TradeflowCounter {self.section}={self.seq} for company {self.company_id}>"
+
+
+# ==========================
+# COMPANY TRADE STATISTICS
+# ==========================
+class CompanyTradeStats(db.Model):
+    """
+    Running per-company trading totals, updated alongside each tradeflow transition and review
+    so dashboards and trust scoring read one row instead of history. Durations are kept as
+    hour histograms (HOUR_BUCKETS in app/trade_stats.py) to estimate medians.
+    """
+    __tablename__ = "company_trade_stats"
+
+    company_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey("company.company_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    deals_completed = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    # Decisions on proposals addressed to this company
+    offers_accepted = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    offers_rejected = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    reviews_received = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    rating_total = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
+    # Bucket counts: hours from an incoming request to this company matching it,
+    # and from deal start to completion (both parties)
+    match_hours_histogram = db.Column(JSONB, nullable=False, default=list, server_default=text("'[]'"))
+    completion_hours_histogram = db.Column(JSONB, nullable=False, default=list, server_default=text("'[]'"))
+    updated_at = db.Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        CheckConstraint(
+            'deals_completed >= 0 AND offers_accepted >= 0 AND offers_rejected >= 0 '
+            'AND reviews_received >= 0 AND rating_total >= 0',
+            name='ck_company_trade_stats_non_negative'
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return f"<CompanyTradeStats {self.deals_completed} completed for company {self.company_id}>"
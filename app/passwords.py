@@ -0,0 +1,176 @@
+"""
+Password hashing policy and the bounded pool that runs it.
+
+Hashing is deliberately slow, so login and register hand it to a small per-process thread
+pool (hashlib's scrypt/pbkdf2 release the GIL while they work) instead of burning CPU on
+whichever request thread got the form. PASSWORD_HASH_WORKERS caps how many hashes run at
+once and PASSWORD_HASH_MAX_PENDING how many may wait; beyond that callers get
+HashingBusy straight away rather than queueing behind a login burst. Stored hashes made
+under an older PASSWORD_HASH_METHOD are replaced on the user's next successful login.
+"""
+import bisect
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds anything slower
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated (or too slow); the caller should ask the user to retry."""
+
+
+class PasswordHasher:
+    """Per-process hashing pool with admission control and latency counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._method_prefix: Optional[str] = None
+        self.method = 'scrypt:32768:8:1'
+        self.workers = 2
+        self.max_pending = 16
+        self.timeout = 10.0
+        self._stats = {
+            'hashes': 0,
+            'verifications': 0,
+            'failed_verifications': 0,
+            'rehashes': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'queued': 0,
+            'running': 0,
+            'max_queued': 0,
+            'latency_ms_total': 0.0,
+            'latency_ms_buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+        }
+
+    def configure(self, method: str, workers: int, max_pending: int, timeout: float) -> None:
+        with self._lock:
+            self.method = method
+            self.workers = max(int(workers), 1)
+            self.max_pending = max(int(max_pending), 0)
+            self.timeout = float(timeout)
+            self._method_prefix = None
+            self._shutdown_locked()
+
+    def _shutdown_locked(self) -> None:
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._slots = None
+
+    def _pool(self) -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+        # Built lazily and rebuilt after fork: a pool inherited from a preloading master has no threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                self._executor_pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+            return self._executor, self._slots
+
+    def _run(self, fn, *args):
+        """Run fn on the pool and wait for it; raises HashingBusy when full or timed out."""
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingBusy()
+
+        with self._lock:
+            self._stats['queued'] += 1
+            self._stats['max_queued'] = max(self._stats['max_queued'], self._stats['queued'])
+
+        def task():
+            with self._lock:
+                self._stats['queued'] -= 1
+                self._stats['running'] += 1
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with self._lock:
+                    self._stats['running'] -= 1
+                    self._stats['latency_ms_total'] += elapsed_ms
+                    self._stats['latency_ms_buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+                slots.release()
+
+        future = executor.submit(task)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise HashingBusy()
+
+    def method_prefix(self) -> str:
+        """The policy as it appears in a stored hash (e.g. 'scrypt:32768:8:1'), defaults filled in."""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        return stored_hash.split('$', 1)[0] != self.method_prefix()
+
+    def hash(self, password: str) -> str:
+        """A new stored hash for password under the current policy."""
+        result = self._run(generate_password_hash, password, self.method)
+        with self._lock:
+            self._stats['hashes'] += 1
+        return result
+
+    def verify(self, stored_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash if stored_hash predates the current policy, else None)."""
+        upgrade = self.needs_rehash(stored_hash)
+
+        def check():
+            if not check_password_hash(stored_hash, password):
+                return False, None
+            return True, generate_password_hash(password, self.method) if upgrade else None
+
+        ok, new_hash = self._run(check)
+        with self._lock:
+            self._stats['verifications'] += 1
+            if not ok:
+                self._stats['failed_verifications'] += 1
+            if new_hash:
+                self._stats['rehashes'] += 1
+        return ok, new_hash
+
+    def stats(self) -> Dict:
+        """Snapshot of this process's hashing counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['latency_ms_buckets'] = list(snapshot['latency_ms_buckets'])
+            snapshot['workers'] = self.workers
+            snapshot['max_pending'] = self.max_pending
+            return snapshot
+
+
+password_hasher = PasswordHasher()
+
+
+def password_hashing_stats() -> Dict:
+    return password_hasher.stats()
+
+
+def init_password_hashing(app) -> None:
+    """Apply the PASSWORD_HASH_* policy from config."""
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+    app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 16)
+    app.config.setdefault('PASSWORD_HASH_TIMEOUT_SECONDS', 10)
+    password_hasher.configure(
+        app.config['PASSWORD_HASH_METHOD'],
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_MAX_PENDING'],
+        app.config['PASSWORD_HASH_TIMEOUT_SECONDS'],
+    )
@@ -0,0 +1,130 @@
+import datetime
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Set, Tuple
+from uuid import UUID
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select, union
+
+from .models import DealProposal, Service, ServiceCoRequest, TradeRequest, db
+
+DEFAULT_TOP_K = 20  # neighbours kept per service
+RECOMMENDATION_LIMIT = 6  # cards shown in the marketplace section
+
+
+def _company_baskets() -> Dict[UUID, Set[UUID]]:
+    """Services each company asked for: its trade requests plus the side it received in accepted deals."""
+    baskets: Dict[UUID, Set[UUID]] = defaultdict(set)
+
+    request_rows = db.session.query(TradeRequest.requesting_company_id, TradeRequest.requested_service_id).distinct()
+    for row in request_rows:
+        baskets[row.requesting_company_id].add(row.requested_service_id)
+
+    # from_company receives from_service, to_company receives to_service
+    deal_rows = db.session.query(
+        DealProposal.from_company_id,
+        DealProposal.from_service_id,
+        DealProposal.to_company_id,
+        DealProposal.to_service_id,
+    ).filter(DealProposal.status == 'accepted')
+    for row in deal_rows:
+        baskets[row.from_company_id].add(row.from_service_id)
+        baskets[row.to_company_id].add(row.to_service_id)
+
+    return baskets
+
+
+def _top_neighbors(baskets: Iterable[Set[UUID]], top_k: int) -> Dict[UUID, List[Tuple[float, int, UUID]]]:
+    """Item-to-item cosine similarity over company baskets, truncated to top_k per service."""
+    item_counts: Counter = Counter()
+    pair_counts: Counter = Counter()
+    for items in baskets:
+        item_counts.update(items)
+        for a, b in combinations(sorted(items), 2):
+            pair_counts[(a, b)] += 1
+
+    candidates: Dict[UUID, List[Tuple[float, int, UUID]]] = defaultdict(list)
+    for (a, b), co_count in pair_counts.items():
+        score = co_count / math.sqrt(item_counts[a] * item_counts[b])
+        candidates[a].append((score, co_count, b))
+        candidates[b].append((score, co_count, a))
+
+    return {
+        service_id: heapq.nlargest(top_k, neighbors, key=lambda n: (n[0], n[1]))
+        for service_id, neighbors in candidates.items()
+    }
+
+
+def rebuild_co_request_index(top_k: int = DEFAULT_TOP_K) -> int:
+    """Recompute the service_co_request table from request/deal history; returns rows written."""
+    built_at = datetime.datetime.now(datetime.timezone.utc)
+    neighbors = _top_neighbors(_company_baskets().values(), top_k)
+
+    rows = [
+        {
+            "service_id": service_id,
+            "neighbor_service_id": neighbor_id,
+            "score": score,
+            "co_count": co_count,
+            "rank": rank,
+            "built_at": built_at,
+        }
+        for service_id, top in neighbors.items()
+        for rank, (score, co_count, neighbor_id) in enumerate(top, start=1)
+    ]
+
+    # Swap the whole table in one transaction so readers never see a half-built index
+    db.session.query(ServiceCoRequest).delete(synchronize_session=False)
+    if rows:
+        db.session.execute(insert(ServiceCoRequest), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def recommended_services(company_id: UUID, exclude_company_ids: Iterable[UUID] = (), limit: int = RECOMMENDATION_LIMIT) -> List[Service]:
+    """Active services most co-requested with what this company already asked for (single query)."""
+    seeds = union(
+        select(TradeRequest.requested_service_id.label("service_id")).where(
+            TradeRequest.requesting_company_id == company_id
+        ),
+        select(DealProposal.from_service_id.label("service_id")).where(
+            DealProposal.from_company_id == company_id, DealProposal.status == 'accepted'
+        ),
+        select(DealProposal.to_service_id.label("service_id")).where(
+            DealProposal.to_company_id == company_id, DealProposal.status == 'accepted'
+        ),
+    ).subquery()
+    seed_ids = select(seeds.c.service_id)
+
+    excluded = {company_id, *exclude_company_ids}
+    score = func.sum(ServiceCoRequest.score)
+    rows = (
+        db.session.query(Service, score.label("score"))
+        .join(ServiceCoRequest, ServiceCoRequest.neighbor_service_id == Service.service_id)
+        .filter(
+            ServiceCoRequest.service_id.in_(seed_ids),
+            ~ServiceCoRequest.neighbor_service_id.in_(seed_ids),
+            Service.is_active == True,  # noqa: E712
+            ~Service.company_id.in_(excluded),
+        )
+        .group_by(Service.service_id)
+        .order_by(score.desc())
+        .limit(limit)
+        .all()
+    )
+    return [row[0] for row in rows]
+
+
+recommendations_cli = AppGroup("recommendations", help="Marketplace recommendation index.")
+
+
+@recommendations_cli.command("rebuild")
+@click.option("--top-k", default=DEFAULT_TOP_K, show_default=True, help="Neighbours kept per service.")
+def rebuild_command(top_k):
+    """Rebuild the co-request neighbours table."""
+    written = rebuild_co_request_index(top_k)
+    click.echo(f"Wrote {written} co-request neighbour rows.")
@@ -0,0 +1,119 @@
+"""
+Per-request timing: SQL, template rendering and the Python time around them.
+
+Each request gets a Server-Timing header (visible in the browser's network panel) and one
+JSON line on the 'app.access' logger keyed by endpoint. SQL time is summed from cursor
+events on every engine, so replica reads count too; work on background threads is ignored.
+"""
+import json
+import logging
+import time
+
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+access_logger = logging.getLogger('app.access')
+
+_TIMING_KEY = '_request_timing'
+
+
+class RequestTiming:
+    __slots__ = ('started', 'sql_ms', 'queries', 'template_ms', '_template_starts')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_ms = 0.0
+        self.queries = 0
+        self.template_ms = 0.0
+        self._template_starts = []
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+
+def current_timing():
+    """This request's RequestTiming, or None outside a request (or before it started)."""
+    if not has_request_context():
+        return None
+    return g.get(_TIMING_KEY)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timing() is not None:
+        conn.info.setdefault('request_timing_starts', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    starts = conn.info.get('request_timing_starts')
+    if timing is None or not starts:
+        return
+    timing.sql_ms += (time.perf_counter() - starts.pop()) * 1000
+    timing.queries += 1
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('request_timing_starts'):
+        conn.info['request_timing_starts'].pop()
+
+
+def _before_render(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None:
+        timing._template_starts.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None and timing._template_starts:
+        timing.template_ms += (time.perf_counter() - timing._template_starts.pop()) * 1000
+
+
+def _start_timing() -> None:
+    g.setdefault(_TIMING_KEY, RequestTiming())
+
+
+def _finish_timing(response):
+    timing = current_timing()
+    if timing is None:
+        return response
+    total_ms = timing.elapsed() * 1000
+    app_ms = max(total_ms - timing.sql_ms - timing.template_ms, 0.0)
+
+    if current_app.config.get('SERVER_TIMING_HEADER'):
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={timing.sql_ms:.1f};desc="{timing.queries} queries", '
+            f'tpl;dur={timing.template_ms:.1f}, app;dur={app_ms:.1f}, total;dur={total_ms:.1f}',
+        )
+    if access_logger.isEnabledFor(logging.INFO):
+        access_logger.info(json.dumps({
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(timing.sql_ms, 1),
+            'queries': timing.queries,
+            'template_ms': round(timing.template_ms, 1),
+            'app_ms': round(app_ms, 1),
+        }))
+    return response
+
+
+def init_request_timing(app) -> None:
+    """Time every request of this app; install the engine and template hooks once per process."""
+    app.config.setdefault('SERVER_TIMING_HEADER', True)
+    # Registered first so it starts before the other before_request hooks
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_timing)
+    app.after_request(_finish_timing)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
@@ -5,45 +5,48 @@ import uuid
 import datetime
 import random
 import string
-from flask import request, redirect, url_for, render_template, session, flash
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import request, redirect, url_for, render_template, session, flash, jsonify
+from . import deals
 from .blueprints.core import main
-from .models import db, User, Company, CompanyMember, Service, DealProposal, ActiveDeal, Review, CompanyJoinRequest, ServiceCategory
+from .blueprints.helpers import (
+    _current_membership,
+    _member_or_403,
+    _review_page,
+    _review_summary,
+    _sidebar_companies,
+    bump_tradeflow_counters,
+    current_identity,
+    get_current_user,
+)
+from .db_routing import read_replica
+from .membership_cache import bump_membership_versions
+from .passwords import HashingBusy, password_hasher
+from .metrics import count_transition
+from .models import db, User, Company, CompanyMember, Service, DealProposal, Review, CompanyJoinRequest, ServiceCategory
+from .trade_stats import company_trade_stats, record_offer_decision
 
 
 def _workspace_context(company_id: uuid.UUID, uid: uuid.UUID):
     """Build sidebar + counts context for workspace pages."""
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership:
         return None
 
+    sidebar_companies = _sidebar_companies(uid, company_id)
+    selected = next((c for c in sidebar_companies if c['is_selected']), None)
+    if selected is None:
+        # The cached membership is gone from the database (left or removed since it was cached)
+        return None
+
     # Store selected company in session for navigation
     session['selected_company_id'] = str(company_id)
 
-    member_count = CompanyMember.query.filter_by(company_id=company_id).count()
-    service_count = Service.query.filter_by(company_id=company_id).count()
-
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    sidebar_companies = []
-    for mem in memberships:
-        comp = Company.query.get(mem.company_id)
-        if not comp:
-            continue
-        sidebar_companies.append({
-            'company_id': comp.company_id,
-            'name': comp.name,
-            'member_count': CompanyMember.query.filter_by(company_id=comp.company_id).count(),
-            'service_count': Service.query.filter_by(company_id=comp.company_id).count(),
-            'role': 'Admin' if mem.is_admin else 'Member',
-            'is_selected': comp.company_id == company_id,
-        })
-
     return {
         'company': company,
         'membership': membership,
-        'member_count': member_count,
-        'service_count': service_count,
+        'member_count': selected['member_count'],
+        'service_count': selected['service_count'],
         'companies': sidebar_companies,
     }
 
@@ -70,8 +73,7 @@ def select_company_for_tradeflow():
     if "user_id" not in session:
         return redirect(url_for("main.login"))
 
-    uid = uuid.UUID(session["user_id"])
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
+    memberships = list(current_identity().memberships.values())
 
     if not memberships:
         flash('You need to be a member of a company to access Tradeflow', 'error')
@@ -82,15 +84,12 @@ def select_company_for_tradeflow():
     
     # If user has a selected company in session and is still a member, use it
     if selected_company_id:
-        selected_membership = CompanyMember.query.filter_by(
-            user_id=uid, 
-            company_id=uuid.UUID(selected_company_id)
-        ).first()
+        selected_membership = _current_membership(selected_company_id)
         if selected_membership:
             return redirect(url_for('main.tradeflow_incoming_requests', company_id=selected_company_id))
     
     # Otherwise, use the first company
-    first_company = Company.query.get(memberships[0].company_id)
+    first_company = memberships[0].company
     if first_company:
         return redirect(url_for('main.tradeflow_incoming_requests', company_id=first_company.company_id))
     
@@ -112,11 +111,16 @@ def register():
             flash('Username and password are required', 'error')
             return render_template('register.html')
         if User.query.filter_by(username=username).first() is None:
+            try:
+                password_hash = password_hasher.hash(password)
+            except HashingBusy:
+                flash('We are handling a lot of sign-ups right now, please try again in a moment', 'error')
+                return render_template('register.html'), 503
             new_user = User(
                 user_id=uuid.uuid4(),
                 username=username,
                 email=email,
-                password_hash=generate_password_hash(password)
+                password_hash=password_hash
             )
             db.session.add(new_user)
             db.session.commit()
@@ -135,8 +139,17 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         usr = User.query.filter_by(username=username).first()
-        if usr and check_password_hash(usr.password_hash, password):
+        try:
+            ok, new_hash = password_hasher.verify(usr.password_hash, password) if usr else (False, None)
+        except HashingBusy:
+            flash('We are handling a lot of logins right now, please try again in a moment', 'error')
+            return render_template('login.html'), 503
+        if ok:
             session['user_id'] = str(usr.user_id)
+            if new_hash:
+                # Stored under an older hashing policy; upgrade while we have the plaintext
+                usr.password_hash = new_hash
+                db.session.commit()
             
             # Check how many companies the user is in
             memberships = CompanyMember.query.filter_by(user_id=usr.user_id).all()
@@ -169,7 +182,7 @@ def profile_settings():
     """User profile settings."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    usr = User.query.get(session['user_id'])
+    usr = get_current_user()
     if request.method == 'POST':
         usr.email = request.form.get('email', usr.email)
         usr.location = request.form.get('location', usr.location)
@@ -196,27 +209,12 @@ def my_companies():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     uid = uuid.UUID(session['user_id'])
-    usr = User.query.get(uid)
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    user_companies = []
-    for m in memberships:
-        comp = Company.query.get(m.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            service_count = Service.query.filter_by(company_id=comp.company_id).count()
-            user_companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'description': comp.description,
-                'member_count': member_count,
-                'service_count': service_count,
-                'is_admin': m.is_admin
-            })
+    usr = get_current_user()
     return render_template(
         'my_companies.html',
         current_user=usr,
         username=usr.username if usr else '',
-        companies=user_companies,
+        companies=_sidebar_companies(uid),
     )
 
 
@@ -226,7 +224,7 @@ def create_company():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     uid = uuid.UUID(session['user_id'])
-    usr = User.query.get(uid)
+    usr = get_current_user()
     
     if request.method == 'POST':
         name = request.form.get('name')
@@ -264,25 +262,13 @@ def create_company():
             created_at=datetime.datetime.now(datetime.timezone.utc)
         )
         db.session.add(creator)
+        bump_membership_versions([uid])
         db.session.commit()
         flash('Company created successfully', 'success')
         return redirect(url_for('main.my_companies'))
     
     # Build companies list for sidebar
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    companies = []
-    for mem in memberships:
-        comp = Company.query.get(mem.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            service_count = Service.query.filter_by(company_id=comp.company_id).count()
-            companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'member_count': member_count,
-                'service_count': service_count,
-                'role': 'Admin' if mem.is_admin else 'Member'
-            })
+    companies = _sidebar_companies(uid)
     
     return render_template(
         'create_company.html',
@@ -297,30 +283,15 @@ def join_company():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     uid = uuid.UUID(session['user_id'])
-    usr = User.query.get(uid)
+    usr = get_current_user()
     
     if request.method == 'POST':
         join_code = request.form.get('join_code')
         company = Company.query.filter_by(join_code=join_code).first()
         if not company:
             flash('Invalid join code', 'error')
-            # Build companies list for error case
-            memberships = CompanyMember.query.filter_by(user_id=uid).all()
-            companies = []
-            for mem in memberships:
-                comp = Company.query.get(mem.company_id)
-                if comp:
-                    member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-                    service_count = Service.query.filter_by(company_id=comp.company_id).count()
-                    companies.append({
-                        'company_id': comp.company_id,
-                        'name': comp.name,
-                        'member_count': member_count,
-                        'service_count': service_count,
-                        'role': 'Admin' if mem.is_admin else 'Member'
-                    })
-            return render_template('join_company.html', username=usr.username if usr else '', companies=companies)
-        existing = CompanyMember.query.filter_by(company_id=company.company_id, user_id=uid).first()
+            return render_template('join_company.html', username=usr.username if usr else '', companies=_sidebar_companies(uid))
+        existing = _current_membership(company.company_id)
         if existing:
             flash('You are already a member of this company', 'info')
             return redirect(url_for('main.workspace_overview', company_id=company.company_id))
@@ -331,25 +302,13 @@ def join_company():
             is_admin=False
         )
         db.session.add(member)
+        bump_membership_versions([uid])
         db.session.commit()
         flash('Successfully joined company', 'success')
         return redirect(url_for('main.workspace_overview', company_id=company.company_id))
     
     # Build companies list for sidebar
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    companies = []
-    for mem in memberships:
-        comp = Company.query.get(mem.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            service_count = Service.query.filter_by(company_id=comp.company_id).count()
-            companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'member_count': member_count,
-                'service_count': service_count,
-                'role': 'Admin' if mem.is_admin else 'Member'
-            })
+    companies = _sidebar_companies(uid)
     
     return render_template(
         'join_company.html',
@@ -363,9 +322,8 @@ def view_company(company_id):
     """View company details."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership:
         flash('You are not a member of this company', 'error')
         return redirect(url_for('main.my_companies'))
@@ -378,29 +336,15 @@ def edit_company(company_id):
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     uid = uuid.UUID(session['user_id'])
-    usr = User.query.get(uid)
+    usr = get_current_user()
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership or not membership.is_admin:
         flash('You do not have permission to edit this company', 'error')
         return redirect(url_for('main.view_company', company_id=company_id))
     
     # Build sidebar context
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    companies = []
-    for mem in memberships:
-        comp = Company.query.get(mem.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            service_count = Service.query.filter_by(company_id=comp.company_id).count()
-            companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'member_count': member_count,
-                'service_count': service_count,
-                'role': 'Admin' if mem.is_admin else 'Member',
-                'is_selected': comp.company_id == company_id
-            })
+    companies = _sidebar_companies(uid, company_id)
     
     if request.method == 'POST':
         company.name = request.form.get('name', company.name)
@@ -424,13 +368,13 @@ def leave_company(company_id):
     """Leave a company."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership:
         flash('You are not a member of this company', 'error')
         return redirect(url_for('main.my_companies'))
     db.session.delete(membership)
+    bump_membership_versions([membership.user_id])
     db.session.commit()
     flash('You have left the company', 'success')
     return redirect(url_for('main.my_companies'))
@@ -441,12 +385,13 @@ def delete_company(company_id):
     """Delete a company. Admin only."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership or not membership.is_admin:
         flash('You do not have permission to delete this company', 'error')
         return redirect(url_for('main.view_company', company_id=company_id))
+    # Memberships go with the company (ON DELETE CASCADE)
+    bump_membership_versions(user_id for (user_id,) in db.session.query(CompanyMember.user_id).filter_by(company_id=company_id))
     db.session.delete(company)
     db.session.commit()
     flash('Company and all data deleted', 'success')
@@ -485,13 +430,24 @@ def workspace_overview(company_id):
         company=company,
         members=members,
         is_admin=membership.is_admin,
-        username=User.query.get(uid).username if User.query.get(uid) else '',
+        username=current_identity().username,
         companies=companies,
         member_count=member_count,
         service_count=service_count,
+        money_balance=deals.company_money_balance(company_id),
+        trade_stats=company_trade_stats(company_id),
     )
 
 
+@main.route('/workspace/<uuid:company_id>/stats.json')
+def workspace_trade_stats(company_id):
+    """Read-only JSON of the company's trading statistics (members only)."""
+    _, _, resp = _member_or_403(company_id)
+    if resp:
+        return resp
+    return jsonify(company_id=str(company_id), **company_trade_stats(company_id))
+
+
 @main.route('/workspace/<uuid:company_id>/members')
 def workspace_members(company_id):
     """Workspace members page."""
@@ -516,7 +472,7 @@ def workspace_members(company_id):
         join_requests=join_requests,
         is_admin=membership.is_admin,
         current_user_id=uid,
-        username=User.query.get(uid).username if User.query.get(uid) else '',
+        username=current_identity().username,
         companies=companies,
         member_count=member_count,
         service_count=service_count,
@@ -528,9 +484,8 @@ def accept_join_request(company_id, request_id):
     """Accept a join request. Admin only."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
+    membership = _current_membership(company_id)
     company = Company.query.get_or_404(company_id)
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
     if not membership or not membership.is_admin:
         flash('You do not have permission', 'error')
         return redirect(url_for('main.workspace_members', company_id=company_id))
@@ -544,6 +499,7 @@ def accept_join_request(company_id, request_id):
     )
     db.session.add(member)
     db.session.delete(join_req)
+    bump_membership_versions([join_req.user_id])
     db.session.commit()
     flash('Join request accepted', 'success')
     return redirect(url_for('main.workspace_members', company_id=company_id))
@@ -554,13 +510,13 @@ def remove_member(company_id, member_id):
     """Remove a member from company. Admin only."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
+    membership = _current_membership(company_id)
     if not membership or not membership.is_admin:
         flash('You do not have permission', 'error')
         return redirect(url_for('main.workspace_members', company_id=company_id))
     member = CompanyMember.query.get_or_404(member_id)
     db.session.delete(member)
+    bump_membership_versions([member.user_id])
     db.session.commit()
     flash('Member removed', 'success')
     return redirect(url_for('main.workspace_members', company_id=company_id))
@@ -571,14 +527,14 @@ def transfer_admin(company_id, member_id):
     """Transfer admin role to another member. Admin only."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
-    my_membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
+    my_membership = _current_membership(company_id)
     if not my_membership or not my_membership.is_admin:
         flash('You do not have permission', 'error')
         return redirect(url_for('main.workspace_members', company_id=company_id))
     member = CompanyMember.query.get_or_404(member_id)
     my_membership.is_admin = False
     member.is_admin = True
+    bump_membership_versions([my_membership.user_id, member.user_id])
     db.session.commit()
     flash('Admin role transferred', 'success')
     return redirect(url_for('main.workspace_members', company_id=company_id))
@@ -589,13 +545,13 @@ def demote_admin(company_id, member_id):
     """Demote an admin. Admin only."""
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
-    uid = uuid.UUID(session['user_id'])
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
+    membership = _current_membership(company_id)
     if not membership or not membership.is_admin:
         flash('You do not have permission', 'error')
         return redirect(url_for('main.workspace_members', company_id=company_id))
     member = CompanyMember.query.get_or_404(member_id)
     member.is_admin = False
+    bump_membership_versions([member.user_id])
     db.session.commit()
     flash('Member demoted', 'success')
     return redirect(url_for('main.workspace_members', company_id=company_id))
@@ -623,7 +579,7 @@ def workspace_services(company_id):
         company=company,
         services=services,
         is_admin=membership.is_admin,
-        username=User.query.get(uid).username if User.query.get(uid) else '',
+        username=current_identity().username,
         companies=companies,
         member_count=member_count,
         service_count=service_count,
@@ -649,15 +605,17 @@ def workspace_service_view(company_id, service_id):
         flash('Service does not belong to this company', 'error')
         return redirect(url_for('main.workspace_services', company_id=company_id))
 
-    reviews = Review.query.filter_by(reviewed_service_id=service_id).all()
+    reviews, next_cursor = _review_page(service_id, request.args.get('reviews_before'))
 
     return render_template(
         'workspace_service_public_view.html',
         company=company,
         service=service,
         reviews=reviews,
+        review_summary=_review_summary(service_id),
+        next_reviews_cursor=next_cursor,
         is_admin=membership.is_admin,
-        username=User.query.get(uid).username if User.query.get(uid) else '',
+        username=current_identity().username,
         user_companies=companies,
     )
 
@@ -673,7 +631,7 @@ def add_service(company_id):
     uid = uuid.UUID(session['user_id'])
     company = Company.query.get_or_404(company_id)
     
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
+    membership = _current_membership(company_id)
     if not membership:
         flash('You are not a member of this company', 'error')
         return redirect(url_for('main.my_companies'))
@@ -686,19 +644,8 @@ def add_service(company_id):
         custom_category = request.form.get('custom_category')
         is_offered = request.form.get('is_offered') == 'true'
         
-        usr = User.query.get(uid)
-        memberships = CompanyMember.query.filter_by(user_id=uid).all()
-        user_companies = []
-        for m in memberships:
-            comp = Company.query.get(m.company_id)
-            if comp:
-                member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-                user_companies.append({
-                    'company_id': comp.company_id,
-                    'name': comp.name,
-                    'member_count': member_count,
-                    'is_admin': m.is_admin
-                })
+        usr = get_current_user()
+        user_companies = _sidebar_companies(uid, company_id)
         
         if not title or not description or not duration_hours:
             flash('Vul dit veld in.', 'error')
@@ -756,19 +703,8 @@ def add_service(company_id):
     # Use ServiceCategory enum for consistent category options
     available_categories = ServiceCategory.choices()
     
-    usr = User.query.get(uid)
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    user_companies = []
-    for m in memberships:
-        comp = Company.query.get(m.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            user_companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'member_count': member_count,
-                'is_admin': m.is_admin
-            })
+    usr = get_current_user()
+    user_companies = _sidebar_companies(uid, company_id)
     
     return render_template('service_add.html', 
                          company=company,
@@ -784,30 +720,16 @@ def edit_service(service_id):
         return redirect(url_for('main.login'))
     
     uid = uuid.UUID(session['user_id'])
-    usr = User.query.get(uid)
+    usr = get_current_user()
     service = Service.query.get_or_404(service_id)
     company = Company.query.get(service.company_id)
     
-    membership = CompanyMember.query.filter_by(company_id=service.company_id, user_id=uid).first()
+    membership = _current_membership(service.company_id)
     if not membership or not membership.is_admin:
         flash('You do not have permission to edit this service', 'error')
         return redirect(url_for('main.workspace_services', company_id=service.company_id))
     
-    memberships = CompanyMember.query.filter_by(user_id=uid).all()
-    companies = []
-    for mem in memberships:
-        comp = Company.query.get(mem.company_id)
-        if comp:
-            member_count = CompanyMember.query.filter_by(company_id=comp.company_id).count()
-            service_count = Service.query.filter_by(company_id=comp.company_id).count()
-            companies.append({
-                'company_id': comp.company_id,
-                'name': comp.name,
-                'member_count': member_count,
-                'service_count': service_count,
-                'role': 'Admin' if mem.is_admin else 'Member',
-                'is_selected': comp.company_id == service.company_id
-            })
+    companies = _sidebar_companies(uid, service.company_id)
     
     pending_proposals = DealProposal.query.filter(
         DealProposal.status == 'pending',
@@ -895,11 +817,10 @@ def delete_service(service_id):
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     
-    uid = uuid.UUID(session['user_id'])
     service = Service.query.get_or_404(service_id)
     company_id = service.company_id
     
-    membership = CompanyMember.query.filter_by(company_id=company_id, user_id=uid).first()
+    membership = _current_membership(company_id)
     if not membership or not membership.is_admin:
         flash('You do not have permission to delete this service', 'error')
         return redirect(url_for('main.workspace_services', company_id=company_id))
@@ -921,13 +842,15 @@ def delete_service(service_id):
 
 
 @main.route('/marketplace/service/<uuid:service_id>')
+@read_replica
 def marketplace_service_detail_view(service_id):
     """Public service detail view for marketplace (no login required to view)."""
     service = Service.query.get_or_404(service_id)
     company = Company.query.get(service.company_id)
     
-    # Get reviews for this service
-    reviews = Review.query.filter_by(reviewed_service_id=service_id).all()
+    # Get one page of reviews (newest first) plus the star histogram
+    reviews, next_cursor = _review_page(service_id, request.args.get('reviews_before'))
+    review_summary = _review_summary(service_id)
     
     # Check if user is logged in
     is_logged_in = 'user_id' in session
@@ -935,9 +858,8 @@ def marketplace_service_detail_view(service_id):
     is_admin = False
     
     if is_logged_in:
-        uid = uuid.UUID(session['user_id'])
         # Check if user has a company
-        membership = CompanyMember.query.filter_by(user_id=uid).first()
+        membership = next(iter(current_identity().memberships.values()), None)
         if membership:
             user_company_id = membership.company_id
             is_admin = membership.is_admin
@@ -947,6 +869,8 @@ def marketplace_service_detail_view(service_id):
         service=service,
         company=company,
         reviews=reviews,
+        review_summary=review_summary,
+        next_reviews_cursor=next_cursor,
         is_logged_in=is_logged_in,
         user_company_id=user_company_id,
         is_admin=is_admin
@@ -961,19 +885,13 @@ def send_proposal():
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     
-    uid = uuid.UUID(session['user_id'])
-    
     from_company_id = uuid.UUID(request.form.get('from_company_id'))
     to_company_id = uuid.UUID(request.form.get('to_company_id'))
     from_service_id = uuid.UUID(request.form.get('from_service_id'))
     to_service_id = uuid.UUID(request.form.get('to_service_id'))
     message = request.form.get('message', '').strip()
     
-    membership = CompanyMember.query.filter_by(
-        company_id=from_company_id,
-        user_id=uid,
-        is_admin=True
-    ).first()
+    membership = _current_membership(from_company_id, require_admin=True)
     
     if not membership:
         flash('You are not an admin of this company', 'error')
@@ -993,6 +911,11 @@ def send_proposal():
     )
     
     db.session.add(proposal)
+    bump_tradeflow_counters(
+        [(to_company_id, 'awaiting_signature'), (from_company_id, 'awaiting_other_party')],
+        items=dict.fromkeys(('awaiting_signature', 'awaiting_other_party'), ('offer', proposal.proposal_id)),
+    )
+    count_transition('offer_sent')
     db.session.commit()
     
     flash('Proposal sent successfully!', 'success')
@@ -1005,39 +928,21 @@ def accept_proposal(proposal_id):
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     
-    uid = uuid.UUID(session['user_id'])
     proposal = DealProposal.query.get_or_404(proposal_id)
     
-    membership = CompanyMember.query.filter_by(
-        company_id=proposal.to_company_id,
-        user_id=uid,
-        is_admin=True
-    ).first()
+    membership = _current_membership(proposal.to_company_id, require_admin=True)
     
     if not membership:
         flash('You are not an admin of this company', 'error')
         return redirect(url_for('main.workspace_overview', company_id=proposal.to_company_id))
     
-    if proposal.status != 'pending':
+    to_company_id = proposal.to_company_id
+    if not deals.accept_proposal(proposal_id).accepted:
         flash('This proposal has already been processed', 'warning')
-        return redirect(url_for('main.workspace_overview', company_id=proposal.to_company_id))
-    
-    proposal.status = 'accepted'
-    
-    active_deal = ActiveDeal(
-        active_deal_id=uuid.uuid4(),
-        proposal_id=proposal_id,
-        from_company_completed=False,
-        to_company_completed=False,
-        status='in_progress',
-        created_at=datetime.datetime.now(datetime.timezone.utc)
-    )
-    
-    db.session.add(active_deal)
-    db.session.commit()
+        return redirect(url_for('main.workspace_overview', company_id=to_company_id))
     
     flash('Proposal accepted! The deal is now active.', 'success')
-    return redirect(url_for('main.workspace_overview', company_id=proposal.to_company_id))
+    return redirect(url_for('main.workspace_overview', company_id=to_company_id))
 
 
 @main.route('/proposal/<uuid:proposal_id>/reject', methods=['POST'])
@@ -1046,14 +951,9 @@ def reject_proposal(proposal_id):
     if 'user_id' not in session:
         return redirect(url_for('main.login'))
     
-    uid = uuid.UUID(session['user_id'])
     proposal = DealProposal.query.get_or_404(proposal_id)
     
-    membership = CompanyMember.query.filter_by(
-        company_id=proposal.to_company_id,
-        user_id=uid,
-        is_admin=True
-    ).first()
+    membership = _current_membership(proposal.to_company_id, require_admin=True)
     
     if not membership:
         flash('You are not an admin of this company', 'error')
@@ -1064,6 +964,7 @@ def reject_proposal(proposal_id):
         return redirect(url_for('main.workspace_overview', company_id=proposal.to_company_id))
     
     proposal.status = 'rejected'
+    record_offer_decision(proposal, accepted=False)
     db.session.commit()
     
     flash('Proposal rejected', 'info')
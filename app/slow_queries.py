@@ -0,0 +1,209 @@
+"""
+Slow-query log with sampled EXPLAIN (ANALYZE, BUFFERS) capture.
+
+Any statement slower than SLOW_QUERY_MS is logged on 'app.slow_query' as one JSON line:
+endpoint (or background thread name), a fingerprint of the statement with literals and
+IN-lists collapsed, the shape of its bound parameters, duration and row count. Group by
+fingerprint to find the queries worth fixing.
+
+With SLOW_QUERY_EXPLAIN_SAMPLE > 0, that fraction of slow SELECTs is re-run under EXPLAIN
+(ANALYZE, BUFFERS) on a background thread, at most once per fingerprint per
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS. The re-run uses its own connection inside a
+transaction that is rolled back, and the plan goes to a rotating file
+(SLOW_QUERY_EXPLAIN_FILE, by default slow_query_plans.log in the instance folder).
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from typing import Dict
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.slow_query')
+plan_logger = logging.getLogger('app.slow_query.plans')
+
+EXPLAIN_QUEUE_SIZE = 20  # pending EXPLAINs; more slow queries than that are not explained
+PLAN_FILE_BYTES = 5 * 1024 * 1024
+PLAN_FILE_BACKUPS = 5
+
+_settings = {'threshold_ms': 0, 'sample': 0.0, 'interval': 600}
+_stats_lock = threading.Lock()
+_stats = {'slow_queries': 0, 'explains_captured': 0, 'explains_failed': 0, 'explains_dropped': 0}
+_last_explained: Dict[str, float] = {}
+_explain_queue: 'queue.Queue' = queue.Queue(maxsize=EXPLAIN_QUEUE_SIZE)
+_explainer = None
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%\([^)]+\)s|%s')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_VALUES_ROWS = re.compile(r'(\(\?[^()]*\))(?:\s*,\s*\(\?[^()]*\))+')
+
+
+def slow_query_stats() -> Dict:
+    """Snapshot of this process's slow-query counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals, placeholders, IN-lists and VALUES rows collapsed."""
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _IN_LIST.sub('(?...)', normalized)
+    normalized = _VALUES_ROWS.sub(r'\1, ...', normalized)
+    return ' '.join(normalized.split())
+
+
+def _parameter_shape(parameters, executemany: bool):
+    if executemany:
+        rows = list(parameters or [])
+        return {'rows': len(rows), 'first': _parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        if len(parameters) <= 10:
+            return {key: type(value).__name__ for key, value in parameters.items()}
+        return {'count': len(parameters), 'types': dict(Counter(type(v).__name__ for v in parameters.values()))}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+def _source() -> str:
+    if has_request_context():
+        return request.endpoint or request.path
+    return threading.current_thread().name
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _settings['threshold_ms'] > 0 and not conn.info.get('slow_query_explain'):
+        conn.info.setdefault('slow_query_starts', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('slow_query_starts')
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    if duration_ms < _settings['threshold_ms']:
+        return
+
+    shape = fingerprint(statement)
+    fingerprint_id = hashlib.sha1(shape.encode()).hexdigest()[:12]
+    source = _source()
+    with _stats_lock:
+        _stats['slow_queries'] += 1
+    logger.warning(json.dumps({
+        'endpoint': source,
+        'fingerprint': fingerprint_id,
+        'statement': shape,
+        'params': _parameter_shape(parameters, executemany),
+        'duration_ms': round(duration_ms, 1),
+        'rowcount': getattr(cursor, 'rowcount', None),
+    }, default=str))
+
+    if _should_explain(conn, statement, executemany, fingerprint_id):
+        try:
+            _explain_queue.put_nowait((conn.engine, statement, parameters, fingerprint_id, source, duration_ms))
+        except queue.Full:
+            with _stats_lock:
+                _stats['explains_dropped'] += 1
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('slow_query_starts'):
+        conn.info['slow_query_starts'].pop()
+
+
+def _should_explain(conn, statement: str, executemany: bool, fingerprint_id: str) -> bool:
+    if executemany or conn.dialect.name != 'postgresql' or random.random() >= _settings['sample']:
+        return False
+    head = statement.lstrip().upper()
+    # ANALYZE really runs the statement: plain reads only (no locks, no NOTIFY side effects)
+    if not head.startswith('SELECT') or 'FOR UPDATE' in head or 'PG_NOTIFY' in head:
+        return False
+    now = time.monotonic()
+    with _stats_lock:
+        if now - _last_explained.get(fingerprint_id, -_settings['interval']) < _settings['interval']:
+            return False
+        _last_explained[fingerprint_id] = now
+    return True
+
+
+def _explain_forever() -> None:
+    while True:
+        engine, statement, parameters, fingerprint_id, source, duration_ms = _explain_queue.get()
+        try:
+            with engine.connect() as conn:
+                conn.info['slow_query_explain'] = True
+                try:
+                    rows = conn.exec_driver_sql('EXPLAIN (ANALYZE, BUFFERS) ' + statement, parameters or {}).all()
+                finally:
+                    conn.rollback()
+                    conn.info.pop('slow_query_explain', None)
+            plan = '\n'.join(row[0] for row in rows)
+            plan_logger.info(
+                '-- %s fingerprint=%s endpoint=%s duration_ms=%.1f\n%s\n%s\n',
+                datetime.datetime.now(datetime.timezone.utc).isoformat(), fingerprint_id, source,
+                duration_ms, ' '.join(statement.split()), plan,
+            )
+            with _stats_lock:
+                _stats['explains_captured'] += 1
+        except Exception:
+            logger.exception('EXPLAIN for slow query %s failed', fingerprint_id)
+            with _stats_lock:
+                _stats['explains_failed'] += 1
+
+
+def _open_plan_file(path: str) -> None:
+    if any(isinstance(h, RotatingFileHandler) for h in plan_logger.handlers):
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=PLAN_FILE_BYTES, backupCount=PLAN_FILE_BACKUPS)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    plan_logger.addHandler(handler)
+    plan_logger.setLevel(logging.INFO)
+    plan_logger.propagate = False
+
+
+def init_slow_query_log(app) -> None:
+    """Apply SLOW_QUERY_* from config and open the plan file when sampling is on."""
+    app.config.setdefault('SLOW_QUERY_MS', 250)
+    app.config.setdefault('SLOW_QUERY_EXPLAIN_SAMPLE', 0.0)
+    app.config.setdefault('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', 600)
+    _settings['threshold_ms'] = float(app.config['SLOW_QUERY_MS'] or 0)
+    _settings['sample'] = float(app.config['SLOW_QUERY_EXPLAIN_SAMPLE'] or 0)
+    _settings['interval'] = float(app.config['SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS'])
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    if _settings['threshold_ms'] > 0 and _settings['sample'] > 0:
+        _open_plan_file(
+            app.config.get('SLOW_QUERY_EXPLAIN_FILE')
+            or os.path.join(app.instance_path, 'slow_query_plans.log')
+        )
+
+
+def start_slow_query_explainer() -> None:
+    """Start this process's EXPLAIN thread when sampling is on (after init_slow_query_log)."""
+    global _explainer
+    if _settings['threshold_ms'] <= 0 or _settings['sample'] <= 0:
+        return
+    if _explainer is None or not _explainer.is_alive():
+        _explainer = threading.Thread(target=_explain_forever, name='slow-query-explain', daemon=True)
+        _explainer.start()
@@ -0,0 +1,166 @@
+"""
+Expiry sweeper: archives trade requests past expires_at and purges stale matches.
+
+Runs from cron via `flask --app run sweeper run`, or in-process when
+SWEEPER_INTERVAL_SECONDS > 0. Every pass works in bounded batches, each its own short
+transaction; SKIP LOCKED lets several workers sweep at once without blocking each other.
+"""
+import datetime
+import logging
+import threading
+import time
+from typing import Dict
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, select, update
+
+from .models import DealProposal, TradeRequest, db
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+MATCH_TTL = datetime.timedelta(days=7)  # matched proposals nobody turned into an offer
+
+_stats_lock = threading.Lock()
+_stats = {
+    'runs': 0,
+    'failures': 0,
+    'requests_archived': 0,
+    'matches_purged': 0,
+    'last_run_at': None,
+    'last_duration_ms': None,
+}
+_scheduler = None
+
+
+def sweeper_stats() -> Dict:
+    """Snapshot of this process's sweeper counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def archive_expired_requests(now: datetime.datetime, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """Set status='archived' and archived_at on active requests whose validity has run out."""
+    from .blueprints.helpers import bump_tradeflow_counters
+
+    total = 0
+    while True:
+        batch = (
+            select(TradeRequest.request_id)
+            .where(TradeRequest.status == 'active', TradeRequest.expires_at <= now)
+            .order_by(TradeRequest.expires_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = db.session.execute(
+            update(TradeRequest)
+            .where(TradeRequest.request_id.in_(batch.scalar_subquery()))
+            .values(status='archived', archived_at=now)
+            .returning(TradeRequest.requesting_company_id, TradeRequest.requested_company_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            db.session.rollback()
+            break
+
+        events = []
+        for requesting_company_id, requested_company_id in rows:
+            events.append((requesting_company_id, 'archived'))
+            if requested_company_id != requesting_company_id:
+                events.append((requested_company_id, 'archived'))
+        bump_tradeflow_counters(events)
+        db.session.commit()
+
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
+
+
+def purge_stale_matches(now: datetime.datetime, batch_size: int = SWEEP_BATCH_SIZE) -> int:
+    """Delete matched proposals older than MATCH_TTL."""
+    cutoff = now - MATCH_TTL
+    total = 0
+    while True:
+        batch = (
+            select(DealProposal.proposal_id)
+            .where(DealProposal.status == 'matched', DealProposal.created_at < cutoff)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        purged = db.session.execute(
+            delete(DealProposal)
+            .where(DealProposal.proposal_id.in_(batch.scalar_subquery()))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        total += purged
+        if purged < batch_size:
+            break
+    return total
+
+
+def run_sweep(batch_size: int = SWEEP_BATCH_SIZE) -> Dict[str, int]:
+    """One full pass; updates the process counters and returns this pass's totals."""
+    started = time.perf_counter()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        result = {
+            'requests_archived': archive_expired_requests(now, batch_size),
+            'matches_purged': purge_stale_matches(now, batch_size),
+        }
+    except Exception:
+        db.session.rollback()
+        with _stats_lock:
+            _stats['failures'] += 1
+        raise
+
+    with _stats_lock:
+        _stats['runs'] += 1
+        _stats['requests_archived'] += result['requests_archived']
+        _stats['matches_purged'] += result['matches_purged']
+        _stats['last_run_at'] = now.isoformat()
+        _stats['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _sweep_forever(app, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        with app.app_context():
+            try:
+                result = run_sweep()
+                if any(result.values()):
+                    logger.info('Expiry sweep: %s', result)
+            except Exception:
+                logger.exception('Expiry sweep failed')
+            finally:
+                db.session.remove()
+
+
+def start_sweeper(app) -> None:
+    """Start the in-process scheduler thread when SWEEPER_INTERVAL_SECONDS is set."""
+    global _scheduler
+    interval = app.config.get('SWEEPER_INTERVAL_SECONDS') or 0
+    if interval <= 0 or (_scheduler and _scheduler.is_alive()):
+        return
+    _scheduler = threading.Thread(
+        target=_sweep_forever, args=(app, interval), name='expiry-sweeper', daemon=True
+    )
+    _scheduler.start()
+
+
+sweeper_cli = AppGroup("sweeper", help="Expire trade requests and purge stale matches.")
+
+
+@sweeper_cli.command("run")
+@click.option("--batch-size", default=SWEEP_BATCH_SIZE, show_default=True, help="Rows per transaction.")
+def run_command(batch_size):
+    """Run one sweep now (for cron)."""
+    result = run_sweep(batch_size)
+    click.echo(
+        f"Archived {result['requests_archived']} expired requests, "
+        f"purged {result['matches_purged']} stale matches."
+    )
@@ -0,0 +1,235 @@
+"""
+Per-company trading statistics (company_trade_stats), maintained on write.
+
+Tradeflow write paths call the record_* helpers before their commit, so a company's stats row
+changes in the same transaction as the transition it describes and dashboards read one row.
+`flask --app run trade-stats rebuild` recomputes everything that history still holds.
+"""
+import bisect
+import datetime
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, update
+
+from .metrics import count_transition
+from .models import ActiveDeal, CompanyTradeStats, DealProposal, Review, db, insert_on_conflict
+
+# Upper bounds (hours) of the duration histogram buckets; one more bucket holds anything longer
+HOUR_BUCKETS = (1, 4, 12, 24, 48, 72, 168, 336, 720)
+
+_COUNTERS = ('deals_completed', 'offers_accepted', 'offers_rejected', 'reviews_received', 'rating_total')
+_HISTOGRAMS = {'match_hours': 'match_hours_histogram', 'completion_hours': 'completion_hours_histogram'}
+
+
+def _hours_between(start: Optional[datetime.datetime], end: Optional[datetime.datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=datetime.timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=datetime.timezone.utc)
+    return max((end - start).total_seconds() / 3600, 0.0)
+
+
+def _add_samples(histogram: Iterable[int], hours: Iterable[Optional[float]]) -> List[int]:
+    """New bucket list with the samples added (a fresh list so the JSONB change is detected)."""
+    counts = list(histogram or [])
+    counts += [0] * (len(HOUR_BUCKETS) + 1 - len(counts))
+    for sample in hours:
+        if sample is not None:
+            counts[bisect.bisect_left(HOUR_BUCKETS, sample)] += 1
+    return counts
+
+
+def histogram_median(histogram: Iterable[int]) -> Optional[float]:
+    """Median estimate in hours, interpolated inside the bucket holding the middle sample."""
+    counts = list(histogram or [])
+    middle = sum(counts) / 2
+    if not middle:
+        return None
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= middle:
+            lower = HOUR_BUCKETS[index - 1] if index else 0
+            if index >= len(HOUR_BUCKETS):
+                return float(lower)
+            return lower + (HOUR_BUCKETS[index] - lower) * (middle - seen) / count
+        seen += count
+    return None
+
+
+def _apply(changes: Dict[uuid.UUID, Dict[str, object]]) -> None:
+    """Add {company_id: {counter: n, 'match_hours'/'completion_hours': [hours]}} to the stats rows.
+
+    Missing rows are created first; rows are then locked in key order so concurrent
+    transitions touching the same companies serialise instead of losing updates.
+    """
+    changes = {uuid.UUID(str(company_id)): change for company_id, change in changes.items()}
+    if not changes:
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    company_ids = sorted(changes)
+    db.session.execute(
+        insert_on_conflict(CompanyTradeStats)
+        .values([{'company_id': company_id, 'updated_at': now} for company_id in company_ids])
+        .on_conflict_do_nothing(index_elements=[CompanyTradeStats.company_id])
+    )
+    rows = (
+        CompanyTradeStats.query
+        .filter(CompanyTradeStats.company_id.in_(company_ids))
+        .order_by(CompanyTradeStats.company_id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    for stats in rows:
+        change = changes[stats.company_id]
+        for name in _COUNTERS:
+            if change.get(name):
+                setattr(stats, name, getattr(stats, name) + change[name])
+        for key, column in _HISTOGRAMS.items():
+            if change.get(key):
+                setattr(stats, column, _add_samples(getattr(stats, column), change[key]))
+        stats.updated_at = now
+
+
+def record_match(company_id, requested_at: datetime.datetime, matched_at: datetime.datetime) -> None:
+    """A company matched a request it received; samples its request-to-match time."""
+    count_transition('match')
+    _apply({company_id: {'match_hours': [_hours_between(requested_at, matched_at)]}})
+
+
+def record_offer_decision(proposal: DealProposal, accepted: bool) -> None:
+    """The recipient of a proposal accepted or rejected it."""
+    count_transition('offer_accepted' if accepted else 'offer_rejected')
+    _apply({proposal.to_company_id: {'offers_accepted' if accepted else 'offers_rejected': 1}})
+
+
+def record_completion(proposal: DealProposal, active_deal: ActiveDeal) -> None:
+    """Both parties confirmed delivery; counts the deal and its duration for each company."""
+    count_transition('deal_completed')
+    hours = _hours_between(active_deal.created_at, active_deal.completed_at)
+    _apply({
+        company_id: {'deals_completed': 1, 'completion_hours': [hours]}
+        for company_id in {proposal.from_company_id, proposal.to_company_id}
+    })
+
+
+def record_review(review: Review) -> None:
+    """A review was written about a company."""
+    if review.reviewed_company_id is None:
+        return
+    _apply({review.reviewed_company_id: {'reviews_received': 1, 'rating_total': int(review.rating)}})
+
+
+def describe_trade_stats(stats: Optional[CompanyTradeStats]) -> Dict[str, object]:
+    """Dashboard/JSON view of a stats row; a company that never traded gets zeros."""
+    if stats is None:
+        stats = CompanyTradeStats(
+            deals_completed=0, offers_accepted=0, offers_rejected=0, reviews_received=0,
+            rating_total=0, match_hours_histogram=[], completion_hours_histogram=[],
+        )
+    decided = stats.offers_accepted + stats.offers_rejected
+    return {
+        'deals_completed': stats.deals_completed,
+        'offers_accepted': stats.offers_accepted,
+        'offers_rejected': stats.offers_rejected,
+        'acceptance_rate': stats.offers_accepted / decided if decided else None,
+        'reviews_received': stats.reviews_received,
+        'average_rating': stats.rating_total / stats.reviews_received if stats.reviews_received else None,
+        'median_hours_to_match': histogram_median(stats.match_hours_histogram),
+        'median_hours_to_complete': histogram_median(stats.completion_hours_histogram),
+        'updated_at': stats.updated_at.isoformat() if stats.updated_at else None,
+    }
+
+
+def company_trade_stats(company_id) -> Dict[str, object]:
+    """One primary-key read of a company's stats."""
+    return describe_trade_stats(db.session.get(CompanyTradeStats, uuid.UUID(str(company_id))))
+
+
+def rebuild_trade_stats() -> int:
+    """Recompute every company's stats from deal and review history; returns rows written.
+
+    Proposals don't reference the request they came from, so request-to-match times can't be
+    recovered; existing match histograms are kept as they are.
+    """
+    totals: Dict[uuid.UUID, Dict[str, object]] = {}
+
+    def company(company_id):
+        return totals.setdefault(company_id, {
+            **{name: 0 for name in _COUNTERS},
+            'completion_hours_histogram': _add_samples([], []),
+        })
+
+    completed = (
+        db.session.query(
+            DealProposal.from_company_id,
+            DealProposal.to_company_id,
+            ActiveDeal.created_at,
+            ActiveDeal.completed_at,
+        )
+        .join(ActiveDeal, ActiveDeal.proposal_id == DealProposal.proposal_id)
+        .filter(ActiveDeal.status == 'completed')
+        .yield_per(1000)
+    )
+    for row in completed:
+        hours = _hours_between(row.created_at, row.completed_at)
+        for company_id in {row.from_company_id, row.to_company_id}:
+            stats = company(company_id)
+            stats['deals_completed'] += 1
+            stats['completion_hours_histogram'] = _add_samples(stats['completion_hours_histogram'], [hours])
+
+    decisions = (
+        db.session.query(DealProposal.to_company_id, DealProposal.status, func.count(DealProposal.proposal_id))
+        .filter(DealProposal.status.in_(('accepted', 'rejected')))
+        .group_by(DealProposal.to_company_id, DealProposal.status)
+    )
+    for company_id, status, n in decisions:
+        company(company_id)['offers_accepted' if status == 'accepted' else 'offers_rejected'] = n
+
+    reviews = (
+        db.session.query(Review.reviewed_company_id, func.count(Review.review_id), func.coalesce(func.sum(Review.rating), 0))
+        .filter(Review.reviewed_company_id.isnot(None))
+        .group_by(Review.reviewed_company_id)
+    )
+    for company_id, n, rating_total in reviews:
+        stats = company(company_id)
+        stats['reviews_received'] = n
+        stats['rating_total'] = int(rating_total)
+
+    # Reset first so companies whose history disappeared drop back to zero
+    now = datetime.datetime.now(datetime.timezone.utc)
+    db.session.execute(
+        update(CompanyTradeStats)
+        .values(**{name: 0 for name in _COUNTERS}, completion_hours_histogram=[], updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if totals:
+        stmt = insert_on_conflict(CompanyTradeStats).values([
+            {'company_id': company_id, 'updated_at': now, **stats} for company_id, stats in totals.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CompanyTradeStats.company_id],
+            set_={
+                **{name: getattr(stmt.excluded, name) for name in _COUNTERS},
+                'completion_hours_histogram': stmt.excluded.completion_hours_histogram,
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+        db.session.execute(stmt)
+    db.session.commit()
+    return len(totals)
+
+
+trade_stats_cli = AppGroup("trade-stats", help="Maintain per-company trading statistics.")
+
+
+@trade_stats_cli.command("rebuild")
+def rebuild_command():
+    """Recompute company_trade_stats from deal and review history."""
+    written = rebuild_trade_stats()
+    click.echo(f"Rebuilt trade stats for {written} companies.")
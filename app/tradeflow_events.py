@@ -0,0 +1,214 @@
+"""
+Live tradeflow notifications for the sidebar (Server-Sent Events).
+
+Write paths queue badge deltas, and item events for the rows behind them, via
+announce_badge_deltas(); the sidebar bumps its badges, and on a list page shows the new item
+and refreshes the list in place. With TRADEFLOW_EVENTS_NOTIFY on, they are sent with pg_notify
+inside the writer's transaction, so Postgres delivers them to every worker's LISTEN thread on
+commit (and drops them on rollback). Without it, they are published to this process only, from
+the session's after_commit hook.
+
+Every open stream holds one of the worker's threads, so a worker serves at most
+TRADEFLOW_EVENTS_MAX_STREAMS of them and turns further ones away with a 503; those clients
+try again later and meanwhile see fresh counts on every page load.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from flask import current_app
+from sqlalchemy import event, text
+
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100  # events buffered per open stream before dropping
+KEEPALIVE_SECONDS = 15  # comment line so proxies don't close idle streams
+CLIENT_RETRY_MS = 5000  # EventSource reconnect delay
+FULL_RETRY_SECONDS = 60  # Retry-After sent when the worker has no stream slot left
+_PENDING_KEY = 'tradeflow_pending_events'
+
+# Other channels sharing this worker's LISTEN connection: channel -> handler with
+# notify(payload) per message and reset(live) whenever the connection comes up or goes down
+_channel_handlers: Dict[str, object] = {}
+
+
+def register_listen_channel(channel: str, handler) -> None:
+    _channel_handlers[channel] = handler
+
+
+class TradeflowBroker:
+    """In-process pub/sub: one bounded queue per open SSE stream, keyed by company."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[queue.Queue]] = {}
+        self._streams = 0
+        self._rejected = 0
+        self._listener = None
+
+    def subscribe(self, company_id, max_streams: Optional[int] = None) -> Optional[queue.Queue]:
+        """A queue for a new stream, or None when this worker already serves max_streams."""
+        subscription = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if max_streams is not None and self._streams >= max_streams:
+                self._rejected += 1
+                return None
+            self._subscribers.setdefault(str(company_id), set()).add(subscription)
+            self._streams += 1
+        return subscription
+
+    def unsubscribe(self, company_id, subscription: queue.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(str(company_id))
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._streams -= 1
+                if not subscribers:
+                    del self._subscribers[str(company_id)]
+
+    def stream_count(self) -> int:
+        with self._lock:
+            return self._streams
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'streams': self._streams, 'rejected': self._rejected}
+
+    def publish(self, payload: dict) -> None:
+        with self._lock:
+            targets = list(self._subscribers.get(payload.get('company_id'), ()))
+        for subscription in targets:
+            try:
+                subscription.put_nowait(payload)
+            except queue.Full:
+                pass  # Slow client; it resyncs from the counters on its next page load
+
+    def stream(self, company_id, subscription: queue.Queue) -> Iterator[str]:
+        """SSE body for one client; unsubscribes when the client disconnects."""
+        try:
+            yield f"retry: {CLIENT_RETRY_MS}\n\n"
+            while True:
+                try:
+                    payload = subscription.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Payloads without an event name come from workers older than item events
+                yield f"event: {payload.get('event', 'badge')}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            self.unsubscribe(company_id, subscription)
+
+    def ensure_listener(self, app) -> None:
+        """Start this worker's LISTEN thread on first use (after any gunicorn fork).
+
+        The thread also serves channels added with register_listen_channel().
+        """
+        if not app.config.get('TRADEFLOW_EVENTS_NOTIFY'):
+            return
+        with self._lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=_listen_forever,
+                args=(app, app.config['TRADEFLOW_EVENTS_CHANNEL']),
+                name='tradeflow-listen',
+                daemon=True,
+            )
+            self._listener.start()
+
+
+broker = TradeflowBroker()
+
+
+def _listen_forever(app, channel: str) -> None:
+    """Relay NOTIFY payloads from Postgres to the local broker, reconnecting on failure."""
+    backoff = 1
+    while True:
+        try:
+            with app.app_context():
+                raw = db.engine.raw_connection()
+            raw.detach()  # Dedicated LISTEN session; never hand it back to the pool
+            conn = raw.driver_connection
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    for name in (channel, *_channel_handlers):
+                        cur.execute(f'LISTEN "{name}"')
+                backoff = 1
+                for handler in _channel_handlers.values():
+                    handler.reset(live=True)
+                while True:
+                    if select.select([conn], [], [], KEEPALIVE_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        note = conn.notifies.pop(0)
+                        handler = _channel_handlers.get(note.channel)
+                        if handler is not None:
+                            handler.notify(note.payload)
+                            continue
+                        try:
+                            broker.publish(json.loads(note.payload))
+                        except ValueError:
+                            logger.warning('Ignoring malformed tradeflow notification: %r', note.payload)
+            finally:
+                for handler in _channel_handlers.values():
+                    handler.reset(live=False)
+                raw.close()
+        except Exception:
+            logger.exception('Tradeflow LISTEN connection lost; retrying in %ss', backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def announce_badge_deltas(increments: Dict[tuple, int], items: Iterable[tuple] = ()) -> None:
+    """Queue {(company_id, section): n} deltas, and (company_id, section, kind, item_id) arrivals
+    behind them, for delivery when the current transaction commits."""
+    by_company: Dict[str, Dict[str, int]] = {}
+    for (company_id, section), n in increments.items():
+        by_company.setdefault(str(company_id), {})[section] = n
+    payloads = [
+        {'event': 'badge', 'company_id': company_id, 'deltas': deltas} for company_id, deltas in by_company.items()
+    ]
+    payloads += [
+        {'event': 'item', 'company_id': str(company_id), 'section': section, 'kind': kind, 'id': str(item_id)}
+        for company_id, section, kind, item_id in items
+    ]
+    if not payloads:
+        return
+
+    if current_app.config.get('TRADEFLOW_EVENTS_NOTIFY'):
+        db.session.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {'channel': current_app.config['TRADEFLOW_EVENTS_CHANNEL'], 'payloads': [json.dumps(p) for p in payloads]},
+        )
+    else:
+        db.session.info.setdefault(_PENDING_KEY, []).extend(payloads)
+
+
+def _publish_pending(session) -> None:
+    for payload in session.info.pop(_PENDING_KEY, []):
+        broker.publish(payload)
+
+
+def _drop_pending(session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def init_tradeflow_events(app) -> None:
+    """Hook local (non-NOTIFY) delivery into the session lifecycle."""
+    app.config.setdefault('TRADEFLOW_EVENTS_NOTIFY', False)
+    app.config.setdefault('TRADEFLOW_EVENTS_CHANNEL', 'tradeflow_events')
+    if not app.config.get('TRADEFLOW_EVENTS_MAX_STREAMS'):
+        # Keep at least half of each worker's threads for ordinary page requests
+        app.config['TRADEFLOW_EVENTS_MAX_STREAMS'] = max(1, int(app.config.get('DB_WORKER_THREADS') or 8) // 2)
+    if not event.contains(db.session, 'after_commit', _publish_pending):
+        event.listen(db.session, 'after_commit', _publish_pending)
+        event.listen(db.session, 'after_soft_rollback', _drop_pending)
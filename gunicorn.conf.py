@@ -0,0 +1,79 @@
+"""
+Production gunicorn settings:  gunicorn -c gunicorn.conf.py wsgi:app
+
+gthread workers. Workers come from the CPU count, capped by how many database connections
+the pool profile gives each one. Threads come from GUNICORN_THREADS, which the app also reads
+to size its pool (DB_WORKER_THREADS, see app/db_engine.py).
+
+An open tradeflow event stream (SSE) holds a thread for as long as its page is open, so the
+app lets each worker serve at most TRADEFLOW_EVENTS_MAX_STREAMS of them (by default half of
+GUNICORN_THREADS) and refuses the rest with a 503. The other threads stay free for page
+requests; refused pages retry the stream a minute later and keep their badges current on
+every load. Raise GUNICORN_THREADS together with the limit if many users keep tabs open.
+
+The app is preloaded in the master and forked, so before a worker serves anything it
+drops the DB connections it inherited and starts its own background threads (sweeper,
+EXPLAIN sampler). The LISTEN thread and the password-hashing pool already start lazily in
+each worker. Prometheus samples from every worker go to PROMETHEUS_MULTIPROC_DIR, which is
+a fresh temporary directory unless you set it yourself (then empty it before each start).
+
+Environment: PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS, GUNICORN_KEEPALIVE,
+DB_CONNECTION_BUDGET (connections this instance may hold on the database, default 60),
+TRADEFLOW_EVENTS_MAX_STREAMS.
+"""
+import multiprocessing
+import os
+import tempfile
+
+# Read by app.config at import time, i.e. when the app is preloaded below
+os.environ.setdefault('APP_ENV', 'production')
+os.environ.setdefault('DB_PROFILE', 'gunicorn')
+os.environ.setdefault('GUNICORN_THREADS', '8')
+os.environ['START_BACKGROUND_THREADS'] = '0'  # started per worker in post_worker_init
+if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='barter-prometheus-')
+
+
+def _connections_per_worker(threads: int) -> int:
+    # Mirrors the gunicorn profile in app/db_engine.py: one per thread + 2, plus max_overflow
+    pool_size = int(os.environ.get('DB_POOL_SIZE') or threads + 2)
+    max_overflow = int(os.environ.get('DB_MAX_OVERFLOW') or 2)
+    return pool_size + max_overflow
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5001')}"
+worker_class = 'gthread'
+threads = int(os.environ['GUNICORN_THREADS'])
+workers = int(os.environ.get('WEB_CONCURRENCY') or max(1, min(
+    multiprocessing.cpu_count() * 2 + 1,
+    int(os.environ.get('DB_CONNECTION_BUDGET', 60)) // _connections_per_worker(threads),
+)))
+
+preload_app = True
+timeout = 30  # a gthread worker heartbeats from its main loop, so long SSE streams don't trip this
+graceful_timeout = 30  # open streams are cut at this point on restart; the browser reconnects
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))  # behind a load balancer, set above its idle timeout
+max_requests = 2000
+max_requests_jitter = 200  # spread the recycling so workers don't all restart together
+
+accesslog = None  # the app writes its own JSON access line on the 'app.access' logger
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_worker_init(worker):
+    from app import start_background_threads
+    from app.models import db
+
+    app = worker.wsgi
+    with app.app_context():
+        # Pooled connections copied from the master share its sockets; forget them unclosed
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    start_background_threads(app)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
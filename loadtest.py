@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""
+Load generator for barter.com: simulated users walking the real routes over HTTP.
+
+Start the app against a database seeded with seed_data.py, then for example:
+
+    python loadtest.py --base-url http://127.0.0.1:5001 --concurrency 10 --duration 60
+    python loadtest.py --mix browse=5,public=2,trade=3 --iterations 20
+
+Journeys (weights set with --mix):
+  browse  log in, search the marketplace, page through it, open service pages
+  public  anonymous marketplace and public service pages
+  trade   one full deal between two companies: trade request, select a return service,
+          offer, accept, both sides confirm delivery, review
+
+Every virtual user logs in as a pair of seed admins (see --usernames), and as long as
+there are enough admins each pair is used by a single virtual user. At the end it prints
+throughput and, per route, request count, error rate, p50/p95/p99 latency and the average
+SQL time/query count from the app's Server-Timing header.
+Only the standard library is used, so it runs from any checkout.
+"""
+import argparse
+import http.cookiejar
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+SEED_ADMINS = [
+    'alice_johnson', 'bob_smith', 'charlie_brown', 'diana_prince', 'edward_norton',
+    'fiona_apple', 'george_lucas', 'hannah_montana', 'isaac_newton', 'julia_roberts',
+    'kyle_reese', 'lucy_liu', 'michael_scott', 'natalie_portman', 'oliver_twist',
+    'penny_lane', 'quentin_blake', 'rita_hayworth', 'steve_jobs', 'tara_reid',
+]
+SEARCH_TERMS = ['web', 'design', 'marketing', 'legal', 'cloud', 'finance', 'data', 'video', 'hr', 'sales']
+UUID = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+_UUID_RE = re.compile(UUID)
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+class JourneyError(Exception):
+    """A step could not continue (unexpected status or an ID missing from the page)."""
+
+
+class Results:
+    """Latency samples and error counts per route, shared by all virtual users."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.db_ms = defaultdict(float)
+        self.queries = defaultdict(int)
+        self.timed = defaultdict(int)
+        self.journeys = defaultdict(int)
+        self.failed_journeys = defaultdict(int)
+
+    def record(self, route, elapsed_ms, ok, server_timing):
+        with self._lock:
+            self.latencies[route].append(elapsed_ms)
+            if not ok:
+                self.errors[route] += 1
+            match = _SERVER_TIMING_DB.search(server_timing or '')
+            if match:
+                self.db_ms[route] += float(match.group(1))
+                self.queries[route] += int(match.group(2))
+                self.timed[route] += 1
+
+    def journey_done(self, name, ok):
+        with self._lock:
+            self.journeys[name] += 1
+            if not ok:
+                self.failed_journeys[name] += 1
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # Measure each hop on its own; the journey decides where to go next
+
+
+class Client:
+    """One browser: its own cookie jar, no automatic redirects."""
+
+    def __init__(self, base_url, results, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.results = results
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def request(self, method, path, form=None, expect=(200, 302)):
+        """(status, body, location); records latency under the path with IDs replaced by <id>."""
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        route = f"{method} {_UUID_RE.sub('<id>', path.split('?')[0])}"
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                status, body, headers = resp.status, resp.read().decode('utf-8', 'replace'), resp.headers
+        except urllib.error.HTTPError as exc:
+            status, body, headers = exc.code, exc.read().decode('utf-8', 'replace'), exc.headers
+        except (urllib.error.URLError, OSError) as exc:
+            self.results.record(route, (time.perf_counter() - started) * 1000, False, None)
+            raise JourneyError(f'{route}: {exc}') from exc
+        self.results.record(route, (time.perf_counter() - started) * 1000, status in expect, headers.get('Server-Timing'))
+        if status not in expect:
+            raise JourneyError(f'{route}: HTTP {status}')
+        return status, body, headers.get('Location', '')
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, form, **kwargs):
+        return self.request('POST', path, form=form, **kwargs)
+
+
+def _find(pattern, text, what):
+    match = re.search(pattern, text)
+    if not match:
+        raise JourneyError(f'no {what} on the page')
+    return match.group(1)
+
+
+class Actor:
+    """A logged-in seed admin and the company they run."""
+
+    def __init__(self, client, username, password):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.company_id = None
+
+    def login(self):
+        _, _, location = self.client.post('/login', {'username': self.username, 'password': self.password}, expect=(302,))
+        if '/login' in location:
+            raise JourneyError(f'login failed for {self.username}')
+        _, body, _ = self.client.get('/my-companies')
+        self.company_id = _find(rf'/workspace/({UUID})', body, f'company for {self.username}')
+
+    def service_ids(self):
+        _, body, _ = self.client.get(f'/workspace/{self.company_id}/services')
+        ids = re.findall(rf'/workspace/{self.company_id}/services/({UUID})', body)
+        if not ids:
+            raise JourneyError(f'{self.username} has no services')
+        return ids
+
+
+def browse(client, actor, rng):
+    client.get(f'/marketplace?company_id={actor.company_id}')
+    _, body, _ = client.get('/marketplace?' + urllib.parse.urlencode({'search': rng.choice(SEARCH_TERMS)}))
+    client.get('/marketplace?page=2')
+    service_ids = re.findall(rf'/marketplace/service/({UUID})/trade', body) or re.findall(
+        rf'/marketplace/service/({UUID})', client.get('/marketplace')[1]
+    )
+    for service_id in rng.sample(service_ids, min(2, len(service_ids))):
+        client.get(f'/marketplace/service/{service_id}/trade')
+
+
+def public(client, rng):
+    _, body, _ = client.get('/marketplace/public?' + urllib.parse.urlencode({'search': rng.choice(SEARCH_TERMS)}))
+    service_ids = re.findall(rf'/marketplace/service/({UUID})', body)
+    if not service_ids or rng.random() < 0.5:
+        _, body, _ = client.get('/marketplace/public')
+        service_ids = re.findall(rf'/marketplace/service/({UUID})', body)
+    if service_ids:
+        client.get(f'/marketplace/service/{rng.choice(service_ids)}')
+
+
+def trade(requester, provider, rng):
+    """requester asks for one of provider's services and the deal runs to a review."""
+    a, b = requester, provider
+    a.client.get(f'/marketplace/select-company/{a.company_id}', expect=(302,))
+    a.client.post(f'/marketplace/service/{rng.choice(b.service_ids())}/request', {'validity_days': 14}, expect=(302,))
+
+    # Provider picks a return service from the requester's catalogue
+    _, body, _ = b.client.get(f'/tradeflow/{b.company_id}/incoming-requests')
+    request_id = _find(rf'/tradeflow/{b.company_id}/incoming-requests/({UUID})/select-return', body, 'incoming request')
+    _, body, _ = b.client.get(f'/tradeflow/{b.company_id}/incoming-requests/{request_id}/select-return')
+    return_ids = re.findall(rf'/select-return/({UUID})', body)
+    if not return_ids:
+        raise JourneyError('no return services offered')
+    b.client.post(
+        f'/tradeflow/{b.company_id}/incoming-requests/{request_id}/select-return',
+        {'selected_service_id': rng.choice(return_ids)}, expect=(302,),
+    )
+
+    # Provider turns the match into an offer; requester accepts it
+    _, body, _ = b.client.get(f'/tradeflow/{b.company_id}/match-made')
+    match_id = _find(rf'/tradeflow/{b.company_id}/match/({UUID})', body, 'match')
+    b.client.get(f'/tradeflow/{b.company_id}/match/{match_id}')
+    b.client.post(f'/tradeflow/{b.company_id}/match/{match_id}', {'message': 'Load test offer'}, expect=(302,))
+    _, body, _ = a.client.get(f'/tradeflow/{a.company_id}/awaiting-signature')
+    offer_id = _find(rf'/tradeflow/{a.company_id}/awaiting-signature/({UUID})', body, 'offer')
+    a.client.get(f'/tradeflow/{a.company_id}/awaiting-signature/{offer_id}')
+    a.client.post(f'/tradeflow/{a.company_id}/awaiting-signature/{offer_id}', {'action': 'accept'}, expect=(302,))
+
+    # Both confirm delivery, then the requester reviews
+    _, body, _ = a.client.get(f'/tradeflow/{a.company_id}/ongoing-deals')
+    deal_id = _find(rf'/tradeflow/{a.company_id}/ongoing-deals/({UUID})', body, 'ongoing deal')
+    a.client.post(f'/tradeflow/{a.company_id}/ongoing-deals/{deal_id}', {}, expect=(302,))
+    b.client.post(f'/tradeflow/{b.company_id}/ongoing-deals/{deal_id}', {}, expect=(302,))
+    a.client.get(f'/tradeflow/{a.company_id}/completed-deals')
+    a.client.post(
+        f'/tradeflow/{a.company_id}/completed-deals/{deal_id}/write-review',
+        {'rating': rng.randint(3, 5), 'comment': 'Load test review'}, expect=(302,),
+    )
+
+
+def _virtual_user(index, args, mix, results, deadline):
+    rng = random.Random(args.seed + index if args.seed is not None else None)
+    names, weights = zip(*mix.items())
+    pair = (args.usernames[(2 * index) % len(args.usernames)], args.usernames[(2 * index + 1) % len(args.usernames)])
+    actors = None
+    done = 0
+    while (args.iterations and done < args.iterations) or (not args.iterations and time.monotonic() < deadline):
+        journey = rng.choices(names, weights)[0]
+        ok = True
+        try:
+            if journey == 'public':
+                public(Client(args.base_url, results, args.timeout), rng)
+            else:
+                if actors is None:
+                    actors = [Actor(Client(args.base_url, results, args.timeout), name, args.password) for name in pair]
+                    for actor in actors:
+                        actor.login()
+                if journey == 'browse':
+                    browse(actors[0].client, actors[0], rng)
+                else:
+                    requester, provider = rng.sample(actors, 2)
+                    trade(requester, provider, rng)
+        except JourneyError as exc:
+            ok = False
+            if args.verbose:
+                print(f'[vu {index}] {journey} failed: {exc}', file=sys.stderr)
+            if 'login failed' in str(exc) or '/login' in str(exc):
+                actors = None
+        results.journey_done(journey, ok)
+        done += 1
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def report(results, elapsed):
+    total = sum(len(v) for v in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f'\n{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, '
+          f'{errors} errors ({100 * errors / max(total, 1):.2f}%)')
+    print('Journeys: ' + ', '.join(
+        f'{name} {n} ({results.failed_journeys[name]} failed)' for name, n in sorted(results.journeys.items())
+    ))
+    header = f"{'route':62s} {'n':>6s} {'err%':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'db ms':>7s} {'queries':>7s}"
+    print('\n' + header + '\n' + '-' * len(header))
+    for route in sorted(results.latencies, key=lambda r: -len(results.latencies[r])):
+        samples = sorted(results.latencies[route])
+        timed = results.timed[route]
+        print(
+            f'{route[:62]:62s} {len(samples):6d} {100 * results.errors[route] / len(samples):6.2f} '
+            f'{_percentile(samples, 0.50):8.1f} {_percentile(samples, 0.95):8.1f} {_percentile(samples, 0.99):8.1f} '
+            f"{(results.db_ms[route] / timed if timed else 0):7.1f} {(results.queries[route] / timed if timed else 0):7.1f}"
+        )
+
+
+def _parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('browse', 'public', 'trade'):
+            raise argparse.ArgumentTypeError(f'unknown journey {name!r}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:5001')
+    parser.add_argument('--concurrency', type=int, default=5, help='virtual users running in parallel')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run (ignored with --iterations)')
+    parser.add_argument('--iterations', type=int, default=0, help='journeys per virtual user instead of a duration')
+    parser.add_argument('--mix', type=_parse_mix, default=_parse_mix('browse=5,public=3,trade=2'))
+    parser.add_argument('--usernames', type=lambda v: v.split(','), default=SEED_ADMINS,
+                        help='comma-separated company admins to log in as (default: seed_data.py admins)')
+    parser.add_argument('--password', default='testgebruiker')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=None, help='random seed for repeatable journeys')
+    parser.add_argument('--verbose', action='store_true', help='print each failed journey')
+    args = parser.parse_args(argv)
+
+    results = Results()
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=_virtual_user, args=(i, args, args.mix, results, deadline), daemon=True)
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(results, time.monotonic() - started)
+    return 1 if sum(results.errors.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Partial indexes for keyset pagination of archived trade requests
+
+Revision ID: 3f1a7c9d2e85
+Revises: 9b6e2f4a1c53
+Create Date: 2026-10-19 18:03:27.410592
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a7c9d2e85'
+down_revision = '9b6e2f4a1c53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older rows were archived without a timestamp; the keyset order needs one
+    op.execute("""
+        UPDATE trade_request SET archived_at = created_at
+         WHERE status = 'archived' AND archived_at IS NULL
+    """)
+
+    with op.batch_alter_table('trade_request', schema=None) as batch_op:
+        batch_op.create_index('ix_trade_request_archived_sent', ['requesting_company_id', 'archived_at', 'request_id'], unique=False,
+                              postgresql_where=sa.text("status = 'archived'"))
+        batch_op.create_index('ix_trade_request_archived_received', ['requested_service_id', 'archived_at', 'request_id'], unique=False,
+                              postgresql_where=sa.text("status = 'archived'"))
+
+
+def downgrade():
+    with op.batch_alter_table('trade_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_trade_request_archived_received')
+        batch_op.drop_index('ix_trade_request_archived_sent')
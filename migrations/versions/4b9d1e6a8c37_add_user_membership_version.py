@@ -0,0 +1,26 @@
+"""Per-user membership version stamp for the membership cache
+
+Revision ID: 4b9d1e6a8c37
+Revises: 8e2a5f7c3b19
+Create Date: 2026-10-19 20:14:08.551920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b9d1e6a8c37'
+down_revision = '8e2a5f7c3b19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('membership_version', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('membership_version')
@@ -0,0 +1,39 @@
+"""Add service_co_request neighbours table for marketplace recommendations
+
+Revision ID: 5c2e8f1a9d47
+Revises: 017aafa19e8a
+Create Date: 2026-10-19 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8f1a9d47'
+down_revision = '017aafa19e8a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('service_co_request',
+    sa.Column('service_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('neighbor_service_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('co_count', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.SmallInteger(), nullable=False),
+    sa.Column('built_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['neighbor_service_id'], ['service.service_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['service_id'], ['service.service_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('service_id', 'neighbor_service_id')
+    )
+    with op.batch_alter_table('service_co_request', schema=None) as batch_op:
+        batch_op.create_index('ix_service_co_request_neighbor', ['neighbor_service_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('service_co_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_co_request_neighbor')
+
+    op.drop_table('service_co_request')
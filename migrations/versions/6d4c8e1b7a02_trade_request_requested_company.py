@@ -0,0 +1,47 @@
+"""Denormalized requested_company_id on trade_request for incoming lookups
+
+Revision ID: 6d4c8e1b7a02
+Revises: 3f1a7c9d2e85
+Create Date: 2026-10-19 18:47:53.128406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6d4c8e1b7a02'
+down_revision = '3f1a7c9d2e85'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trade_request', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('requested_company_id', postgresql.UUID(as_uuid=True), nullable=True))
+
+    op.execute("""
+        UPDATE trade_request tr SET requested_company_id = s.company_id
+          FROM service s
+         WHERE s.service_id = tr.requested_service_id
+    """)
+
+    with op.batch_alter_table('trade_request', schema=None) as batch_op:
+        batch_op.alter_column('requested_company_id', existing_type=postgresql.UUID(as_uuid=True), nullable=False)
+        batch_op.create_foreign_key('trade_request_requested_company_id_fkey', 'company', ['requested_company_id'], ['company_id'], ondelete='CASCADE')
+        batch_op.create_index('ix_trade_request_requested_company_status_created', ['requested_company_id', 'status', 'created_at'], unique=False)
+        # Received-side archived pages now key on the company directly
+        batch_op.drop_index('ix_trade_request_archived_received')
+        batch_op.create_index('ix_trade_request_archived_received', ['requested_company_id', 'archived_at', 'request_id'], unique=False,
+                              postgresql_where=sa.text("status = 'archived'"))
+
+
+def downgrade():
+    with op.batch_alter_table('trade_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_trade_request_archived_received')
+        batch_op.create_index('ix_trade_request_archived_received', ['requested_service_id', 'archived_at', 'request_id'], unique=False,
+                              postgresql_where=sa.text("status = 'archived'"))
+        batch_op.drop_index('ix_trade_request_requested_company_status_created')
+        batch_op.drop_constraint('trade_request_requested_company_id_fkey', type_='foreignkey')
+        batch_op.drop_column('requested_company_id')
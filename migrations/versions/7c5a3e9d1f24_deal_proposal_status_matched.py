@@ -0,0 +1,36 @@
+"""Allow the 'matched' status in ck_deal_proposal_status
+
+Revision ID: 7c5a3e9d1f24
+Revises: 4b9d1e6a8c37
+Create Date: 2026-10-19 21:05:37.184402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c5a3e9d1f24'
+down_revision = '4b9d1e6a8c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF EXISTS: databases created from schema.sql never had this constraint
+    op.execute('ALTER TABLE deal_proposal DROP CONSTRAINT IF EXISTS ck_deal_proposal_status')
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.create_check_constraint(
+            'ck_deal_proposal_status',
+            "status IN ('matched', 'pending', 'accepted', 'rejected')",
+        )
+
+
+def downgrade():
+    # Fails while 'matched' rows exist; resolve or delete them first
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_deal_proposal_status', type_='check')
+        batch_op.create_check_constraint(
+            'ck_deal_proposal_status',
+            "status IN ('pending', 'accepted', 'rejected')",
+        )
@@ -0,0 +1,38 @@
+"""Per-company trading statistics maintained on write
+
+Revision ID: 8e2a5f7c3b19
+Revises: 6d4c8e1b7a02
+Create Date: 2026-10-19 19:32:41.208613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '8e2a5f7c3b19'
+down_revision = '6d4c8e1b7a02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Starts empty; fill it from history with `flask --app run trade-stats rebuild`
+    op.create_table('company_trade_stats',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('deals_completed', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('offers_accepted', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('offers_rejected', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('reviews_received', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('rating_total', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('match_hours_histogram', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'"), nullable=False),
+    sa.Column('completion_hours_histogram', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'"), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('deals_completed >= 0 AND offers_accepted >= 0 AND offers_rejected >= 0 AND reviews_received >= 0 AND rating_total >= 0', name='ck_company_trade_stats_non_negative'),
+    sa.ForeignKeyConstraint(['company_id'], ['company.company_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('company_id')
+    )
+
+
+def downgrade():
+    op.drop_table('company_trade_stats')
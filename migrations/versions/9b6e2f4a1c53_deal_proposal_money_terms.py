@@ -0,0 +1,64 @@
+"""Structured money terms on deal_proposal, parsed out of [MONEY:...] message prefixes
+
+Revision ID: 9b6e2f4a1c53
+Revises: e83b5d0c7f21
+Create Date: 2026-10-19 17:12:09.634018
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b6e2f4a1c53'
+down_revision = 'e83b5d0c7f21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('money_direction', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('money_amount', sa.Integer(), nullable=True))
+
+    # "[MONEY:give:100] Hello" -> direction 'give', amount 100, message "Hello"
+    op.execute(r"""
+        UPDATE deal_proposal dp SET
+            money_direction = p.tag[2],
+            money_amount = p.tag[3]::integer,
+            message = NULLIF(btrim(substr(dp.message, length(p.tag[1]) + 1)), '')
+          FROM (
+            SELECT proposal_id, regexp_match(message, '^(\[MONEY:(receive|give):(\d{1,9})\])') AS tag
+              FROM deal_proposal
+             WHERE message LIKE '[MONEY:%'
+          ) p
+         WHERE dp.proposal_id = p.proposal_id
+           AND p.tag IS NOT NULL
+           AND p.tag[3]::integer > 0
+    """)
+
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.create_check_constraint(
+            'ck_deal_proposal_money_terms',
+            "(money_direction IS NULL AND money_amount IS NULL) OR "
+            "(money_direction IN ('receive', 'give') AND money_amount > 0)",
+        )
+        batch_op.create_index('ix_deal_proposal_money_from', ['from_company_id'], unique=False,
+                              postgresql_where=sa.text("money_amount IS NOT NULL AND status = 'accepted'"))
+        batch_op.create_index('ix_deal_proposal_money_to', ['to_company_id'], unique=False,
+                              postgresql_where=sa.text("money_amount IS NOT NULL AND status = 'accepted'"))
+
+
+def downgrade():
+    op.execute("""
+        UPDATE deal_proposal
+           SET message = btrim('[MONEY:' || money_direction || ':' || money_amount || '] ' || COALESCE(message, ''))
+         WHERE money_amount IS NOT NULL
+    """)
+
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.drop_index('ix_deal_proposal_money_to')
+        batch_op.drop_index('ix_deal_proposal_money_from')
+        batch_op.drop_constraint('ck_deal_proposal_money_terms', type_='check')
+        batch_op.drop_column('money_amount')
+        batch_op.drop_column('money_direction')
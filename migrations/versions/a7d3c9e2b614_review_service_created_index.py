@@ -0,0 +1,29 @@
+"""Composite (reviewed_service_id, created_at) index for review keyset pagination
+
+Revision ID: a7d3c9e2b614
+Revises: 5c2e8f1a9d47
+Create Date: 2026-10-19 10:02:18.554310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3c9e2b614'
+down_revision = '5c2e8f1a9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The composite index has reviewed_service_id as leading column, so it replaces the single-column one
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_service_created', ['reviewed_service_id', 'created_at'], unique=False)
+        batch_op.drop_index('ix_review_reviewed_service')
+
+
+def downgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_reviewed_service', ['reviewed_service_id'], unique=False)
+        batch_op.drop_index('ix_review_service_created')
@@ -0,0 +1,88 @@
+"""Push-maintained tradeflow badge counters and per-user last seen sequence
+
+Revision ID: c41f7b2e8a90
+Revises: a7d3c9e2b614
+Create Date: 2026-10-19 11:20:05.917342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7b2e8a90'
+down_revision = 'a7d3c9e2b614'
+branch_labels = None
+depends_on = None
+
+
+# One (company_id, section, event_at) row per item that currently feeds a sidebar badge,
+# mirroring the count-on-read definitions this migration replaces.
+TRADEFLOW_EVENTS = """
+    SELECT s.company_id, 'incoming' AS section, tr.created_at AS event_at
+      FROM trade_request tr JOIN service s ON s.service_id = tr.requested_service_id
+     WHERE tr.status = 'active'
+    UNION ALL
+    SELECT tr.requesting_company_id, 'you_requested', tr.created_at
+      FROM trade_request tr WHERE tr.status = 'active'
+    UNION ALL
+    SELECT tr.requesting_company_id, 'archived', COALESCE(tr.archived_at, tr.created_at)
+      FROM trade_request tr WHERE tr.status = 'archived'
+    UNION ALL
+    SELECT s.company_id, 'archived', COALESCE(tr.archived_at, tr.created_at)
+      FROM trade_request tr JOIN service s ON s.service_id = tr.requested_service_id
+     WHERE tr.status = 'archived' AND s.company_id <> tr.requesting_company_id
+    UNION ALL
+    SELECT dp.from_company_id, 'matches', dp.created_at FROM deal_proposal dp WHERE dp.status = 'matched'
+    UNION ALL
+    SELECT dp.to_company_id, 'matches', dp.created_at FROM deal_proposal dp WHERE dp.status = 'matched'
+    UNION ALL
+    SELECT dp.to_company_id, 'awaiting_signature', dp.created_at FROM deal_proposal dp WHERE dp.status = 'pending'
+    UNION ALL
+    SELECT dp.from_company_id, 'awaiting_other_party', dp.created_at FROM deal_proposal dp WHERE dp.status = 'pending'
+    UNION ALL
+    SELECT c.company_id, CASE ad.status WHEN 'completed' THEN 'completed' ELSE 'ongoing' END, ad.created_at
+      FROM active_deal ad
+      JOIN deal_proposal dp ON dp.proposal_id = ad.proposal_id
+      CROSS JOIN LATERAL (VALUES (dp.from_company_id), (dp.to_company_id)) AS c(company_id)
+"""
+
+
+def upgrade():
+    op.create_table('tradeflow_counter',
+    sa.Column('company_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('section', sa.Text(), nullable=False),
+    sa.Column('seq', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint("section IN ('incoming', 'you_requested', 'archived', 'matches', 'awaiting_signature', 'awaiting_other_party', 'ongoing', 'completed')", name='ck_tradeflow_counter_section'),
+    sa.ForeignKeyConstraint(['company_id'], ['company.company_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('company_id', 'section')
+    )
+    with op.batch_alter_table('tradeflow_view', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seen_seq', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+
+    # Backfill so existing badges keep their values: counters = items so far,
+    # last_seen_seq = items that were already there when the user last looked.
+    op.execute(f"""
+        INSERT INTO tradeflow_counter (company_id, section, seq)
+        SELECT company_id, section, COUNT(*) FROM ({TRADEFLOW_EVENTS}) ev
+        GROUP BY company_id, section
+    """)
+    op.execute(f"""
+        UPDATE tradeflow_view v SET last_seen_seq = seen.n
+          FROM (
+            SELECT v2.view_id, COUNT(*) AS n
+              FROM tradeflow_view v2
+              JOIN ({TRADEFLOW_EVENTS}) ev
+                ON ev.company_id = v2.company_id AND ev.section = v2.section AND ev.event_at <= v2.last_viewed_at
+             GROUP BY v2.view_id
+          ) seen
+         WHERE v.view_id = seen.view_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('tradeflow_view', schema=None) as batch_op:
+        batch_op.drop_column('last_seen_seq')
+
+    op.drop_table('tradeflow_counter')
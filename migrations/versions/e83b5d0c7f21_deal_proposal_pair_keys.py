@@ -0,0 +1,47 @@
+"""Order-independent pair_key / company_pair_key on deal_proposal, indexed with status
+
+Revision ID: e83b5d0c7f21
+Revises: c41f7b2e8a90
+Create Date: 2026-10-19 16:05:41.208734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83b5d0c7f21'
+down_revision = 'c41f7b2e8a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pair_key', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('company_pair_key', sa.Text(), nullable=True))
+
+    # Same format as models.proposal_pair_key / company_pair_key; "C" collation matches Python's sort order
+    from_side = "(from_company_id::text || ':' || from_service_id::text) COLLATE \"C\""
+    to_side = "(to_company_id::text || ':' || to_service_id::text) COLLATE \"C\""
+    from_company = 'from_company_id::text COLLATE "C"'
+    to_company = 'to_company_id::text COLLATE "C"'
+    op.execute(f"""
+        UPDATE deal_proposal SET
+            pair_key = LEAST({from_side}, {to_side}) || '|' || GREATEST({from_side}, {to_side}),
+            company_pair_key = LEAST({from_company}, {to_company}) || '|' || GREATEST({from_company}, {to_company})
+    """)
+
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.alter_column('pair_key', existing_type=sa.Text(), nullable=False)
+        batch_op.alter_column('company_pair_key', existing_type=sa.Text(), nullable=False)
+        batch_op.create_index('ix_deal_proposal_pair_status', ['pair_key', 'status'], unique=False)
+        batch_op.create_index('ix_deal_proposal_company_pair_status', ['company_pair_key', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deal_proposal', schema=None) as batch_op:
+        batch_op.drop_index('ix_deal_proposal_company_pair_status')
+        batch_op.drop_index('ix_deal_proposal_pair_status')
+        batch_op.drop_column('company_pair_key')
+        batch_op.drop_column('pair_key')
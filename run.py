@@ -5,7 +5,7 @@
 #   * Running on http://127.0.0.1:5000/
 #
 # Open dat adres in je browser om de webapp te bekijken.
-from app import create_app
+from app import check_production_config, create_app
 import os
 
 app = create_app()
@@ -14,9 +14,11 @@ if __name__ == "__main__":
     # Use threaded mode for better performance
     # debug=True: Herladen bij code wijzigingen (traag)
     # debug=False: Sneller, maar geen auto-reload
-    # Kies een van beide met de omgevingsvariabele DEBUG
+    # Kies een van beide met de omgevingsvariabele FLASK_DEBUG (standaard uit)
+    # Productie draait via gunicorn, zie wsgi.py en gunicorn.conf.py
     
-    debug_mode = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
+    debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    check_production_config(app, debug_mode)
     
     # Use threaded=True voor beter multi-tasking
     app.run(
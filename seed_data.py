@@ -502,6 +502,7 @@ def seed_database(force_reset=False):
                     request_id=uuid.uuid4(),
                     requesting_company_id=companies[requesting_idx].company_id,
                     requested_service_id=service.service_id,
+                    requested_company_id=service.company_id,
                     validity_days=30,
                     status='active',
                     created_at=now - datetime.timedelta(days=5),
@@ -548,6 +549,7 @@ def seed_database(force_reset=False):
                 request_id=uuid.uuid4(),
                 requesting_company_id=companies[comp_a_idx].company_id,
                 requested_service_id=service_b.service_id,
+                requested_company_id=service_b.company_id,
                 validity_days=30,
                 status='active',
                 created_at=now - datetime.timedelta(days=7),
@@ -561,6 +563,7 @@ def seed_database(force_reset=False):
                 request_id=uuid.uuid4(),
                 requesting_company_id=companies[comp_b_idx].company_id,
                 requested_service_id=service_a.service_id,
+                requested_company_id=service_a.company_id,
                 validity_days=30,
                 status='active',
                 created_at=now - datetime.timedelta(days=6),
@@ -0,0 +1,138 @@
+"""
+Shared fixtures: the app on a scratch database, and a driver that walks tradeflow through the
+real POST routes (so counters, stats and events are written exactly as in production).
+
+Each test module gets its own database: a temporary SQLite file, or the empty database named
+by TEST_DATABASE_URL (e.g. postgresql://localhost/barter_test), whose tables are dropped again
+when the module finishes.
+"""
+import datetime
+import os
+import uuid
+
+import pytest
+
+from app import create_app
+from app.config import Config
+from app.models import ActiveDeal, Company, CompanyMember, DealProposal, Service, TradeRequest, User, db
+
+SERVICES_PER_COMPANY = 3
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    url = os.environ.get('TEST_DATABASE_URL') or f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in {
+            'SQLALCHEMY_DATABASE_URI': url,
+            'SQLALCHEMY_REPLICA_URI': None,
+            'TRADEFLOW_EVENTS_NOTIFY': False,
+            'MEMBERSHIP_CACHE_SINGLE_PROCESS': True,  # pytest is the only process
+            'START_BACKGROUND_THREADS': False,
+            'SWEEPER_INTERVAL_SECONDS': 0,
+            'SERVER_TIMING_HEADER': True,
+            'APP_ENV': 'test',
+        }.items():
+            mp.setattr(Config, name, value)
+        app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+class TradeflowDriver:
+    """Companies, logged-in clients and tradeflow transitions, made through the app's own routes.
+
+    Requests run outside any app context (each gets its own, as in production); lookups open a
+    short one and hand plain IDs back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def company(self, name):
+        """(user_id, company_id, service_ids) of a new company with a single admin."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        user_id, company_id = uuid.uuid4(), uuid.uuid4()
+        service_ids = [uuid.uuid4() for _ in range(SERVICES_PER_COMPANY)]
+        with self.app.app_context():
+            db.session.add_all([
+                User(user_id=user_id, username=f'test_{name}', email=f'test_{name}@example.com', password_hash='!'),
+                Company(company_id=company_id, name=f'Test {name}', join_code=f'TEST-{name}'),
+                CompanyMember(member_id=uuid.uuid4(), company_id=company_id, user_id=user_id,
+                              member_role='founder', is_admin=True),
+            ])
+            db.session.add_all(
+                Service(service_id=service_id, company_id=company_id, title=f'{name} service {i}',
+                        description='Test fixture service.', duration_hours=4 + i,
+                        categories='IT,Consulting', created_at=now)
+                for i, service_id in enumerate(service_ids)
+            )
+            db.session.commit()
+        return user_id, company_id, service_ids
+
+    def client(self, user_id=None, company_id=None):
+        client = self.app.test_client()
+        if user_id is not None:
+            with client.session_transaction() as sess:
+                sess['user_id'] = str(user_id)
+                sess['marketplace_company_id'] = str(company_id)
+                sess['selected_company_id'] = str(company_id)
+        return client
+
+    @staticmethod
+    def post(client, path, form=None):
+        response = client.post(path, data=form or {})
+        assert response.status_code == 302, f'POST {path} returned {response.status_code}'
+
+    def ask(self, client, requester, service_id):
+        """Send a trade request for service_id; returns its request_id."""
+        self.post(client, f'/marketplace/service/{service_id}/request', {'validity_days': 14})
+        with self.app.app_context():
+            return TradeRequest.query.filter_by(
+                requesting_company_id=requester, requested_service_id=service_id,
+            ).order_by(TradeRequest.created_at.desc()).first().request_id
+
+    def decline(self, client, responder, request_id):
+        self.post(client, f'/tradeflow/{responder}/decline-request/{request_id}')
+
+    def match(self, client, responder, request_id, return_service_id):
+        """Answer an incoming request with one of the responder's services; returns the match."""
+        self.post(client, f'/tradeflow/{responder}/incoming-requests/{request_id}/select-return',
+                  {'selected_service_id': str(return_service_id)})
+        with self.app.app_context():
+            return DealProposal.query.filter_by(
+                to_company_id=responder, to_service_id=return_service_id, status='matched',
+            ).order_by(DealProposal.created_at.desc()).first().proposal_id
+
+    def offer(self, client, company_id, match_id):
+        """Turn a match into an offer from company_id; returns the pending proposal."""
+        self.post(client, f'/tradeflow/{company_id}/match/{match_id}', {'message': 'Test offer'})
+        with self.app.app_context():
+            return DealProposal.query.filter_by(
+                from_company_id=company_id, status='pending',
+            ).order_by(DealProposal.created_at.desc()).first().proposal_id
+
+    def accept(self, client, company_id, proposal_id):
+        """Sign an offer; returns the new active deal."""
+        self.post(client, f'/tradeflow/{company_id}/awaiting-signature/{proposal_id}', {'action': 'accept'})
+        with self.app.app_context():
+            return ActiveDeal.query.filter_by(proposal_id=proposal_id).one().active_deal_id
+
+    def confirm(self, client, company_id, deal_id):
+        """Confirm delivery; the deal completes once both sides have."""
+        self.post(client, f'/tradeflow/{company_id}/ongoing-deals/{deal_id}')
+
+    def review(self, client, company_id, deal_id):
+        self.post(client, f'/tradeflow/{company_id}/completed-deals/{deal_id}/write-review',
+                  {'rating': 4, 'comment': 'Test review'})
+
+
+@pytest.fixture(scope='module')
+def tradeflow(app):
+    return TradeflowDriver(app)
@@ -0,0 +1,49 @@
+"""Membership cache: when entries may be kept without NOTIFY."""
+import pytest
+from sqlalchemy import delete
+
+from app.membership_cache import init_membership_cache, membership_cache
+from app.models import CompanyMember, db
+
+
+@pytest.fixture
+def cache_config(app):
+    """Re-run init_membership_cache under changed config, and under the module's config afterwards."""
+    original = dict(app.config)
+
+    def configure(**config):
+        app.config.update(config)
+        init_membership_cache(app)
+
+    yield configure
+    app.config.clear()
+    app.config.update(original)
+    init_membership_cache(app)
+
+
+def _remove_membership_elsewhere(app, user_id):
+    """A change committed by another worker: its version bump never reaches this process."""
+    with app.app_context():
+        db.session.execute(delete(CompanyMember).where(CompanyMember.user_id == user_id))
+        db.session.commit()
+
+
+def test_without_notify_roles_are_read_through(app, tradeflow, cache_config):
+    cache_config(TRADEFLOW_EVENTS_NOTIFY=False, MEMBERSHIP_CACHE_SINGLE_PROCESS=False)
+    owner, home, _ = tradeflow.company('cache_read_through')
+    with app.app_context():
+        assert membership_cache.roles(owner) == {home: True}
+    _remove_membership_elsewhere(app, owner)
+    with app.app_context():
+        assert membership_cache.roles(owner) == {}
+    assert membership_cache.stats()['users'] == 0
+
+
+def test_a_single_process_keeps_entries(app, tradeflow, cache_config):
+    cache_config(TRADEFLOW_EVENTS_NOTIFY=False, MEMBERSHIP_CACHE_SINGLE_PROCESS=True)
+    owner, home, _ = tradeflow.company('cache_single_process')
+    with app.app_context():
+        assert membership_cache.roles(owner) == {home: True}
+        hits = membership_cache.stats()['hits']
+        assert membership_cache.roles(owner) == {home: True}
+    assert membership_cache.stats()['hits'] == hits + 1
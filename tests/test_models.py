@@ -0,0 +1,31 @@
+"""Column defaults the models fill in at insert."""
+import datetime
+import uuid
+
+from app.models import TradeRequest, db
+
+
+def _trade_request(requester, service_id, **extra):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return TradeRequest(request_id=uuid.uuid4(), requesting_company_id=requester, requested_service_id=service_id,
+                        validity_days=14, expires_at=now + datetime.timedelta(days=14), **extra)
+
+
+def test_trade_request_takes_requested_company_from_the_service(app, tradeflow):
+    _, requester, _ = tradeflow.company('model_requester')
+    _, owner, services = tradeflow.company('model_owner')
+    with app.app_context():
+        trade_requests = [_trade_request(requester, service_id) for service_id in services[:2]]
+        db.session.add_all(trade_requests)
+        db.session.commit()
+        assert [trade_request.requested_company_id for trade_request in trade_requests] == [owner, owner]
+
+
+def test_trade_request_keeps_an_explicit_requested_company(app, tradeflow):
+    _, requester, _ = tradeflow.company('model_explicit_requester')
+    _, owner, services = tradeflow.company('model_explicit_owner')
+    with app.app_context():
+        trade_request = _trade_request(requester, services[0], requested_company_id=owner)
+        db.session.add(trade_request)
+        db.session.commit()
+        assert trade_request.requested_company_id == owner
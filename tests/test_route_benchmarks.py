@@ -0,0 +1,158 @@
+"""
+Route benchmarks with SQL statement budgets.
+
+Builds a fixed-size set of fixtures (one company with ROWS_PER_SECTION entries in every
+tradeflow section, plus the partner companies on the other side) and requests each hot page
+through the test client, reading the statement count from the app's own Server-Timing header.
+
+Timings are too noisy to gate on, but the statement count is deterministic at a fixed fixture
+size, so a change that brings back an N+1 (a query per row) fails here. When a page genuinely
+needs another query, raise its budget in the same change. Median and p95 times are attached to
+each test as properties (see `pytest --junitxml`).
+"""
+import re
+import statistics
+import time
+
+import pytest
+
+ROWS_PER_SECTION = 5  # entries per tradeflow section for the benchmarked company
+SECTIONS = ('incoming', 'you_requested', 'archived', 'matched', 'awaiting_signature',
+            'awaiting_other_party', 'ongoing', 'completed')
+WARMUP = 2  # unmeasured requests per page (fill caches)
+REPEAT = 5  # measured requests per page
+
+# Benchmark name -> most SQL statements one request may run at the fixture size above
+QUERY_BUDGETS = {
+    'my_companies': 2,
+    'marketplace': 5,
+    'marketplace_public': 3,
+    'marketplace_service_view': 8,
+    'marketplace_service_detail_view': 4,
+    'tradeflow_incoming_requests': 6,
+    'tradeflow_select_return': 5,
+    'tradeflow_select_return_detail': 4,
+    'tradeflow_you_requested': 7,
+    'tradeflow_you_requested_detail': 4,
+    'tradeflow_archived_requests': 6,
+    'tradeflow_archived_request_detail': 4,
+    'tradeflow_match_made': 7,
+    'tradeflow_match_detail': 17,
+    'tradeflow_awaiting_signature': 6,
+    'tradeflow_awaiting_signature_detail': 11,
+    'tradeflow_awaiting_other_party': 6,
+    'tradeflow_awaiting_other_party_detail': 11,
+    'tradeflow_ongoing_deals': 6,
+    'tradeflow_ongoing_deal_detail': 6,
+    'tradeflow_completed_deals': 6,
+    'tradeflow_completed_deal_detail': 8,
+}
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+@pytest.fixture(scope='module')
+def fixture_ids(tradeflow):
+    """Walk each tradeflow section's rows into place; returns the IDs the page paths need."""
+    owner, home, home_services = tradeflow.company('home')
+    partners = {
+        section: [tradeflow.company(f'{section}_{i}') for i in range(ROWS_PER_SECTION)] for section in SECTIONS
+    }
+    ids = {'owner': owner, 'home': home, 'partner_service': partners['incoming'][0][2][0]}
+    home_client = tradeflow.client(owner, home)
+
+    for section, rows in partners.items():
+        for i, (user, partner, services) in enumerate(rows):
+            client = tradeflow.client(user, partner)
+            mine = home_services[i % len(home_services)]
+            if section == 'incoming':
+                ids.setdefault('incoming_request', tradeflow.ask(client, partner, mine))
+                ids.setdefault('return_service', services[0])
+            elif section == 'you_requested':
+                ids.setdefault('you_requested', tradeflow.ask(home_client, home, services[0]))
+            elif section == 'archived':
+                # Only the requesting side may open an archived request, so we ask and they decline
+                request_id = tradeflow.ask(home_client, home, services[0])
+                tradeflow.decline(client, partner, request_id)
+                ids.setdefault('archived', request_id)
+            elif section in ('matched', 'awaiting_other_party'):
+                match_id = tradeflow.match(home_client, home, tradeflow.ask(client, partner, mine), services[0])
+                if section == 'matched':
+                    ids.setdefault('matched', match_id)
+                    continue
+                ids.setdefault('awaiting_other_party', tradeflow.offer(home_client, home, match_id))
+            else:
+                # The partner offers to us; ongoing/completed go on to accept (and finish)
+                match_id = tradeflow.match(client, partner, tradeflow.ask(home_client, home, services[0]), mine)
+                offer_id = tradeflow.offer(client, partner, match_id)
+                if section == 'awaiting_signature':
+                    ids.setdefault('awaiting_signature', offer_id)
+                    continue
+                deal_id = tradeflow.accept(home_client, home, offer_id)
+                if section == 'ongoing':
+                    ids.setdefault('ongoing', deal_id)
+                    continue
+                tradeflow.confirm(home_client, home, deal_id)
+                tradeflow.confirm(client, partner, deal_id)
+                tradeflow.review(home_client, home, deal_id)
+                ids.setdefault('completed', deal_id)
+    return ids
+
+
+def _pages(ids):
+    """name -> (path, logged_in) for every benchmarked page."""
+    tf = f"/tradeflow/{ids['home']}"
+    return {
+        'my_companies': ('/my-companies', True),
+        'marketplace': ('/marketplace', True),
+        'marketplace_public': ('/marketplace/public', False),
+        'marketplace_service_view': (f"/marketplace/service/{ids['partner_service']}/trade", True),
+        'marketplace_service_detail_view': (f"/marketplace/service/{ids['partner_service']}", False),
+        'tradeflow_incoming_requests': (f'{tf}/incoming-requests', True),
+        'tradeflow_select_return': (f"{tf}/incoming-requests/{ids['incoming_request']}/select-return", True),
+        'tradeflow_select_return_detail': (
+            f"{tf}/incoming-requests/{ids['incoming_request']}/select-return/{ids['return_service']}", True),
+        'tradeflow_you_requested': (f'{tf}/you-requested', True),
+        'tradeflow_you_requested_detail': (f"{tf}/you-requested/{ids['you_requested']}", True),
+        'tradeflow_archived_requests': (f'{tf}/archived-requests', True),
+        'tradeflow_archived_request_detail': (f"{tf}/archived-requests/{ids['archived']}", True),
+        'tradeflow_match_made': (f'{tf}/match-made', True),
+        'tradeflow_match_detail': (f"{tf}/match/{ids['matched']}", True),
+        'tradeflow_awaiting_signature': (f'{tf}/awaiting-signature', True),
+        'tradeflow_awaiting_signature_detail': (f"{tf}/awaiting-signature/{ids['awaiting_signature']}", True),
+        'tradeflow_awaiting_other_party': (f'{tf}/awaiting-other-party', True),
+        'tradeflow_awaiting_other_party_detail': (
+            f"{tf}/awaiting-other-party/{ids['awaiting_other_party']}", True),
+        'tradeflow_ongoing_deals': (f'{tf}/ongoing-deals', True),
+        'tradeflow_ongoing_deal_detail': (f"{tf}/ongoing-deals/{ids['ongoing']}", True),
+        'tradeflow_completed_deals': (f'{tf}/completed-deals', True),
+        'tradeflow_completed_deal_detail': (f"{tf}/completed-deals/{ids['completed']}", True),
+    }
+
+
+def test_every_budgeted_page_is_benchmarked(fixture_ids):
+    assert set(_pages(fixture_ids)) == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize('name', sorted(QUERY_BUDGETS))
+def test_page_within_query_budget(name, fixture_ids, tradeflow, record_property):
+    path, logged_in = _pages(fixture_ids)[name]
+    client = tradeflow.client(fixture_ids['owner'], fixture_ids['home']) if logged_in else tradeflow.client()
+
+    for _ in range(WARMUP):
+        client.get(path)
+    times, queries = [], 0
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        response = client.get(path)
+        times.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, f'GET {path} returned {response.status_code}'
+        match = _SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        assert match, f'GET {path} sent no statement count in Server-Timing'
+        queries = max(queries, int(match.group(1)))
+
+    times.sort()
+    record_property('queries', queries)
+    record_property('median_ms', round(statistics.median(times), 2))
+    record_property('p95_ms', round(times[min(len(times) - 1, int(0.95 * len(times)))], 2))
+    assert queries <= QUERY_BUDGETS[name], f'{name}: {queries} queries, budget {QUERY_BUDGETS[name]}'
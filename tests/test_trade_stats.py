@@ -0,0 +1,26 @@
+"""Per-company trade statistics recorded by the tradeflow write routes."""
+from app.models import CompanyTradeStats, db
+
+
+def _match_samples(app, company_id):
+    with app.app_context():
+        stats = db.session.get(CompanyTradeStats, company_id)
+        return sum(stats.match_hours_histogram) if stats else 0
+
+
+def test_a_request_is_sampled_as_matched_once(app, tradeflow):
+    requester_user, requester, requester_services = tradeflow.company('stats_requester')
+    owner, home, home_services = tradeflow.company('stats_home')
+    home_client = tradeflow.client(owner, home)
+    request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+
+    tradeflow.match(home_client, home, request_id, requester_services[0])
+    assert _match_samples(app, home) == 1
+
+    # Resubmitting either match form must not add a second, later sample
+    tradeflow.post(home_client, f'/tradeflow/{home}/incoming-requests/{request_id}/select-return',
+                   {'selected_service_id': str(requester_services[1])})
+    tradeflow.post(home_client, f'/tradeflow/{home}/create-match',
+                   {'request_id': str(request_id), 'service_id': str(requester_services[2])})
+    assert _match_samples(app, home) == 1
+    assert _match_samples(app, requester) == 0
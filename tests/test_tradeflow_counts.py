@@ -0,0 +1,179 @@
+"""
+get_tradeflow_unread_counts() against the per-section COUNT queries it replaced.
+
+The counters count arrivals into a section since the user last opened it; the old queries
+counted rows that are in the section now and are newer than that visit. The scenario below
+opens each section after the transitions that pass through it, so every unread row is still
+where it arrived and both must agree, section by section.
+"""
+import datetime
+import uuid
+
+import pytest
+from flask import session
+
+from app.blueprints.helpers import TRADEFLOW_SECTIONS, get_tradeflow_unread_counts
+from app.models import ActiveDeal, DealProposal, TradeRequest, TradeflowView, db
+
+NEW_PER_SECTION = 2
+
+# Section -> the list page that marks it viewed
+SECTION_PAGES = {
+    'incoming': 'incoming-requests',
+    'you_requested': 'you-requested',
+    'archived': 'archived-requests',
+    'matches': 'match-made',
+    'awaiting_signature': 'awaiting-signature',
+    'awaiting_other_party': 'awaiting-other-party',
+    'ongoing': 'ongoing-deals',
+    'completed': 'completed-deals',
+}
+
+
+def _per_section_counts(company_id, user_id):
+    """The original implementation: one COUNT per section, newer than the user's last visit."""
+    never = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+    views = TradeflowView.query.filter_by(company_id=company_id, user_id=user_id).all()
+    last_viewed = {view.section: view.last_viewed_at for view in views}
+
+    def cutoff(section):
+        return last_viewed.get(section, never)
+
+    mine = (DealProposal.from_company_id == company_id) | (DealProposal.to_company_id == company_id)
+    return {
+        'incoming': TradeRequest.query.filter(
+            TradeRequest.requested_service.has(company_id=company_id),
+            TradeRequest.status == 'active',
+            TradeRequest.created_at > cutoff('incoming'),
+        ).count(),
+        'you_requested': TradeRequest.query.filter(
+            TradeRequest.requesting_company_id == company_id,
+            TradeRequest.status == 'active',
+            TradeRequest.created_at > cutoff('you_requested'),
+        ).count(),
+        'archived': TradeRequest.query.filter(
+            (TradeRequest.requesting_company_id == company_id)
+            | TradeRequest.requested_service.has(company_id=company_id),
+            TradeRequest.status == 'archived',
+            db.or_(
+                db.and_(TradeRequest.archived_at != None, TradeRequest.archived_at > cutoff('archived')),  # noqa: E711
+                db.and_(TradeRequest.archived_at == None, TradeRequest.created_at > cutoff('archived')),  # noqa: E711
+            ),
+        ).count(),
+        'matches': DealProposal.query.filter(
+            DealProposal.status == 'matched', mine, DealProposal.created_at > cutoff('matches'),
+        ).count(),
+        'awaiting_signature': DealProposal.query.filter(
+            DealProposal.to_company_id == company_id,
+            DealProposal.status == 'pending',
+            DealProposal.created_at > cutoff('awaiting_signature'),
+        ).count(),
+        'awaiting_other_party': DealProposal.query.filter(
+            DealProposal.from_company_id == company_id,
+            DealProposal.status == 'pending',
+            DealProposal.created_at > cutoff('awaiting_other_party'),
+        ).count(),
+        'ongoing': ActiveDeal.query.join(DealProposal).filter(
+            mine, ActiveDeal.status == 'in_progress', ActiveDeal.created_at > cutoff('ongoing'),
+        ).count(),
+        'completed': ActiveDeal.query.join(DealProposal).filter(
+            mine, ActiveDeal.status == 'completed', ActiveDeal.created_at > cutoff('completed'),
+        ).count(),
+    }
+
+
+@pytest.fixture(scope='module')
+def home(tradeflow):
+    """A company with history in every section that it has seen, then NEW_PER_SECTION unseen arrivals in each."""
+    owner, home_id, home_services = tradeflow.company('home')
+    home_client = tradeflow.client(owner, home_id)
+
+    def partners(role):
+        # One company per row: accepting a deal supersedes the other open proposals of its pair
+        rows = []
+        for i in range(NEW_PER_SECTION):
+            user, partner, services = tradeflow.company(f'{role}_{i}')
+            rows.append((tradeflow.client(user, partner), partner, services))
+        return rows
+
+    def view(*sections):
+        for section in sections:
+            response = home_client.get(f'/tradeflow/{home_id}/{SECTION_PAGES[section]}')
+            assert response.status_code == 200
+
+    # History: rows that the unseen transitions below start from
+    to_decline = [(client, partner, tradeflow.ask(home_client, home_id, services[0]))
+                  for client, partner, services in partners('decline')]
+    to_match = [(tradeflow.ask(client, partner, home_services[0]), services[0])
+                for client, partner, services in partners('match')]
+    offers_in_from = [(client, partner, tradeflow.match(
+                          client, partner, tradeflow.ask(home_client, home_id, services[0]), home_services[0]))
+                      for client, partner, services in partners('offer_in')]
+    offers_out_from = [tradeflow.match(
+                           home_client, home_id, tradeflow.ask(client, partner, home_services[0]), services[0])
+                       for client, partner, services in partners('offer_out')]
+    to_accept, to_complete = [], []
+    for role, pending in (('accept', to_accept), ('complete', to_complete)):
+        for client, partner, services in partners(role):
+            match_id = tradeflow.match(client, partner, tradeflow.ask(home_client, home_id, services[0]), home_services[0])
+            pending.append((client, partner, tradeflow.offer(client, partner, match_id)))
+    view(*TRADEFLOW_SECTIONS)
+
+    # Deals that complete must have been seen while ongoing, as they would be in the app
+    completing = [(client, partner, tradeflow.accept(home_client, home_id, offer_id))
+                  for client, partner, offer_id in to_complete]
+    view('ongoing')
+    for client, partner, deal_id in completing:
+        tradeflow.confirm(home_client, home_id, deal_id)
+        tradeflow.confirm(client, partner, deal_id)
+
+    # Unseen arrivals in every section
+    for client, partner, services in partners('new'):
+        tradeflow.ask(client, partner, home_services[1])  # incoming
+        tradeflow.ask(home_client, home_id, services[1])  # you_requested
+    for client, partner, request_id in to_decline:
+        tradeflow.decline(client, partner, request_id)  # archived
+    for request_id, return_service in to_match:
+        tradeflow.match(home_client, home_id, request_id, return_service)  # matches (and archived)
+    for client, partner, match_id in offers_in_from:
+        tradeflow.offer(client, partner, match_id)  # awaiting_signature
+    for match_id in offers_out_from:
+        tradeflow.offer(home_client, home_id, match_id)  # awaiting_other_party
+    for client, partner, offer_id in to_accept:
+        tradeflow.accept(home_client, home_id, offer_id)  # ongoing
+    return owner, home_id
+
+
+def _unread_counts(app, user_id, company_id):
+    with app.test_request_context():
+        session['user_id'] = str(user_id)
+        return get_tradeflow_unread_counts(company_id)
+
+
+def test_counters_match_per_section_queries(app, home):
+    owner, home_id = home
+    counts = _unread_counts(app, owner, home_id)
+    with app.app_context():
+        expected = _per_section_counts(home_id, owner)
+    assert counts == expected
+    # Declines and matches both archive a request
+    assert expected == {**dict.fromkeys(TRADEFLOW_SECTIONS, NEW_PER_SECTION), 'archived': 2 * NEW_PER_SECTION}
+
+
+def test_viewing_a_section_clears_only_its_badge(app, tradeflow, home):
+    owner, home_id = home
+    before = _unread_counts(app, owner, home_id)
+    response = tradeflow.client(owner, home_id).get(f'/tradeflow/{home_id}/awaiting-signature')
+    assert response.status_code == 200
+
+    counts = _unread_counts(app, owner, home_id)
+    with app.app_context():
+        assert counts == _per_section_counts(home_id, owner)
+    assert counts == {**before, 'awaiting_signature': 0}
+
+
+def test_logged_out_and_malformed_ids_have_no_counts(app):
+    with app.test_request_context():
+        assert get_tradeflow_unread_counts(uuid.uuid4()) == {}
+        session['user_id'] = 'not-a-uuid'
+        assert get_tradeflow_unread_counts(uuid.uuid4()) == {}
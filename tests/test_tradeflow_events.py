@@ -0,0 +1,99 @@
+"""The sidebar's Server-Sent Events stream: what write paths publish, and the per-worker stream limit."""
+import json
+import queue
+
+from flask import session
+
+from app.tradeflow_events import FULL_RETRY_SECONDS, broker
+
+
+def test_streams_over_the_limit_get_503(app, tradeflow, monkeypatch):
+    monkeypatch.setitem(app.config, 'TRADEFLOW_EVENTS_MAX_STREAMS', 2)
+    owner, home, _ = tradeflow.company('events_home')
+    client = tradeflow.client(owner, home)
+    path = f'/tradeflow/{home}/events'
+    open_before = broker.stream_count()
+
+    streams = [client.get(path, buffered=False) for _ in range(2)]
+    try:
+        assert [response.status_code for response in streams] == [200, 200]
+        assert next(streams[0].response).startswith(b'retry:')
+
+        refused = client.get(path, buffered=False)
+        assert refused.status_code == 503
+        assert refused.headers['Retry-After'] == str(FULL_RETRY_SECONDS)
+        assert broker.stream_count() == open_before + 2
+
+        # Closing a stream frees its slot
+        streams.pop().close()
+        streams.append(client.get(path, buffered=False))
+        assert streams[-1].status_code == 200
+    finally:
+        for response in streams:
+            response.close()
+    assert broker.stream_count() == open_before
+
+
+def test_stream_limit_defaults_to_half_the_threads(app):
+    assert app.config['TRADEFLOW_EVENTS_MAX_STREAMS'] == max(1, app.config['DB_WORKER_THREADS'] // 2)
+
+
+def test_a_stream_closed_before_it_starts_frees_its_slot(app, tradeflow):
+    owner, home, _ = tradeflow.company('events_unstarted')
+    open_before = broker.stream_count()
+    with app.test_request_context(f'/tradeflow/{home}/events'):
+        session['user_id'] = str(owner)
+        response = app.view_functions['main.tradeflow_events'](company_id=home)
+        assert broker.stream_count() == open_before + 1
+        response.close()
+    assert broker.stream_count() == open_before
+
+
+def _drain(subscription):
+    payloads = []
+    while True:
+        try:
+            payloads.append(subscription.get_nowait())
+        except queue.Empty:
+            return payloads
+
+
+def test_write_paths_publish_badges_and_items(app, tradeflow):
+    requester_user, requester, requester_services = tradeflow.company('events_items_requester')
+    owner, home, home_services = tradeflow.company('events_items_home')
+    subscription = broker.subscribe(home)
+    try:
+        request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+        assert _drain(subscription) == [
+            {'event': 'badge', 'company_id': str(home), 'deltas': {'incoming': 1}},
+            {'event': 'item', 'company_id': str(home), 'section': 'incoming', 'kind': 'request', 'id': str(request_id)},
+        ]
+
+        match_id = tradeflow.match(tradeflow.client(owner, home), home, request_id, requester_services[0])
+        items = [payload for payload in _drain(subscription) if payload['event'] == 'item']
+        assert [(item['section'], item['kind'], item['id']) for item in items] == [
+            ('archived', 'request', str(request_id)), ('matches', 'match', str(match_id)),
+        ]
+    finally:
+        broker.unsubscribe(home, subscription)
+
+
+def test_item_events_reach_the_stream_and_name_a_card_on_the_list(app, tradeflow):
+    requester_user, requester, _ = tradeflow.company('events_stream_requester')
+    owner, home, home_services = tradeflow.company('events_stream_home')
+    client = tradeflow.client(owner, home)
+    stream = client.get(f'/tradeflow/{home}/events', buffered=False)
+    try:
+        body = iter(stream.response)
+        assert next(body).startswith(b'retry:')
+        request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+        assert next(body).startswith(b'event: badge\n')
+        event, data = next(body).decode().strip().split('\n')
+        assert event == 'event: item'
+        assert json.loads(data[len('data: '):])['id'] == str(request_id)
+    finally:
+        stream.close()
+
+    page = client.get(f'/tradeflow/{home}/incoming-requests').get_data(as_text=True)
+    assert 'data-live-list' in page
+    assert f'data-item-id="{request_id}"' in page
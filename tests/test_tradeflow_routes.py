@@ -0,0 +1,85 @@
+"""Tradeflow write routes: state transitions and the badge counters they bump."""
+from app.models import DealProposal, TradeRequest, TradeflowCounter, db
+
+
+def _counters(app):
+    with app.app_context():
+        return {(row.company_id, row.section): row.seq for row in TradeflowCounter.query}
+
+
+def test_declining_a_processed_request_changes_nothing(app, tradeflow):
+    requester_user, requester, _ = tradeflow.company('decline_requester')
+    owner, home, home_services = tradeflow.company('decline_home')
+    home_client = tradeflow.client(owner, home)
+    request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+
+    tradeflow.decline(home_client, home, request_id)
+    with app.app_context():
+        archived_at = db.session.get(TradeRequest, request_id).archived_at
+    counters = _counters(app)
+
+    tradeflow.decline(home_client, home, request_id)
+    with app.app_context():
+        trade_request = db.session.get(TradeRequest, request_id)
+        assert (trade_request.status, trade_request.archived_at) == ('archived', archived_at)
+    assert _counters(app) == counters
+    assert counters[(home, 'archived')] == counters[(requester, 'archived')] == 1
+
+
+def _matches_of(app, request_id):
+    with app.app_context():
+        trade_request = db.session.get(TradeRequest, request_id)
+        matched = DealProposal.query.filter_by(
+            from_company_id=trade_request.requesting_company_id,
+            from_service_id=trade_request.requested_service_id,
+            status='matched',
+        ).count()
+        return trade_request.status, trade_request.archived_at, matched
+
+
+def test_repeating_select_return_changes_nothing(app, tradeflow):
+    requester_user, requester, requester_services = tradeflow.company('rematch_requester')
+    owner, home, home_services = tradeflow.company('rematch_home')
+    home_client = tradeflow.client(owner, home)
+    request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+
+    tradeflow.match(home_client, home, request_id, requester_services[0])
+    before, counters = _matches_of(app, request_id), _counters(app)
+
+    tradeflow.post(home_client, f'/tradeflow/{home}/incoming-requests/{request_id}/select-return',
+                   {'selected_service_id': str(requester_services[1])})
+    assert _matches_of(app, request_id) == before
+    assert (before[0], before[2]) == ('archived', 1)
+    assert _counters(app) == counters
+
+
+def test_repeating_create_match_changes_nothing(app, tradeflow):
+    requester_user, requester, requester_services = tradeflow.company('create_match_requester')
+    owner, home, home_services = tradeflow.company('create_match_home')
+    home_client = tradeflow.client(owner, home)
+    request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, home_services[0])
+    form = {'request_id': str(request_id), 'service_id': str(requester_services[0])}
+
+    tradeflow.post(home_client, f'/tradeflow/{home}/create-match', form)
+    before, counters = _matches_of(app, request_id), _counters(app)
+
+    tradeflow.post(home_client, f'/tradeflow/{home}/create-match', form)
+    assert _matches_of(app, request_id) == before
+    assert (before[0], before[2]) == ('archived', 1)
+    assert _counters(app) == counters
+
+
+def test_create_match_refuses_another_companys_request(app, tradeflow):
+    requester_user, requester, requester_services = tradeflow.company('foreign_match_requester')
+    _, target, target_services = tradeflow.company('foreign_match_target')
+    outsider, outsider_company, _ = tradeflow.company('foreign_match_outsider')
+    request_id = tradeflow.ask(tradeflow.client(requester_user, requester), requester, target_services[0])
+    counters = _counters(app)
+
+    response = tradeflow.client(outsider, outsider_company).post(
+        f'/tradeflow/{outsider_company}/create-match',
+        data={'request_id': str(request_id), 'service_id': str(requester_services[0])},
+    )
+    assert response.headers['Location'].endswith('/my-companies')
+    assert _matches_of(app, request_id) == ('active', None, 0)
+    assert _counters(app) == counters
@@ -0,0 +1,29 @@
+"""Workspace pages for a membership that is gone from the database but not from the cache."""
+from flask import get_flashed_messages, session
+
+from app import routes
+from app.blueprints import helpers
+
+
+def test_workspace_page_redirects_when_the_sidebar_lost_the_company(app, tradeflow, monkeypatch):
+    owner, home, _ = tradeflow.company('workspace_left')
+    client = tradeflow.client(owner, home)
+    assert client.get(f'/workspace/{home}').status_code == 200
+
+    # The membership check passed, but the sidebar query no longer sees the company
+    monkeypatch.setattr(routes, '_sidebar_companies', lambda user_id, company_id=None: [])
+    response = client.get(f'/workspace/{home}')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/my-companies')
+
+
+def test_workspace_context_returns_a_redirect_when_the_sidebar_lost_the_company(app, tradeflow, monkeypatch):
+    owner, home, _ = tradeflow.company('workspace_context_left')
+    monkeypatch.setattr(helpers, '_sidebar_companies', lambda user_id, company_id=None: [])
+    with app.test_request_context(f'/workspace/{home}'):
+        session['user_id'] = str(owner)
+        *context, response = helpers._workspace_context(home)
+        assert context == [None] * 6
+        assert response.status_code == 302
+        assert response.headers['Location'].endswith('/my-companies')
+        assert get_flashed_messages() == ['You are not a member of this company']
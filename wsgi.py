@@ -0,0 +1,7 @@
+# Productie-ingang voor gunicorn (instellingen staan in gunicorn.conf.py):
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Voor lokaal ontwikkelen blijft `python run.py` de development server.
+from app import create_app
+
+app = create_app()